@@ -0,0 +1,254 @@
+"""
+Append-only learning activity events (lesson opened, video played, ...).
+
+Clients post batches to ``/api/courses/activity/``. The view only validates
+them and hands them to ``activity_buffer``; a background thread per worker
+process writes them with ``bulk_create`` once ``ACTIVITY_BUFFER_SIZE`` events
+are waiting or every ``ACTIVITY_FLUSH_SECONDS``, so no request waits on an
+INSERT. Events still buffered when a worker is killed are lost, which is the
+accepted trade-off for telemetry.
+
+Storage is split by calendar month (UTC). On Postgres ``courses_activityevent``
+is range-partitioned with one partition per month; elsewhere every month is a
+table of its own with the same columns. Either way a month is created on first
+write and retired with a single DROP TABLE (``manage.py prune_activity_events``).
+"""
+import atexit
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connections, models, router
+from django.utils import timezone
+
+from .models import ActivityEvent, ActivityEventBase
+
+logger = logging.getLogger(__name__)
+
+TABLE_PREFIX = ActivityEvent._meta.db_table
+TABLE_NAME = re.compile(r'^%s_y(\d{4})m(\d{2})$' % TABLE_PREFIX)
+
+
+def month_of(moment):
+    moment = moment.astimezone(dt_timezone.utc)
+    return moment.year, moment.month
+
+
+def add_months(month, count):
+    index = month[0] * 12 + month[1] - 1 + count
+    return index // 12, index % 12 + 1
+
+
+def month_start(month):
+    return datetime(month[0], month[1], 1, tzinfo=dt_timezone.utc)
+
+
+def partition_table(month):
+    return '%s_y%04dm%02d' % (TABLE_PREFIX, *month)
+
+
+def stored_months(using=None):
+    """Months that currently have a table/partition, oldest first."""
+    connection = connections[using or router.db_for_write(ActivityEvent)]
+    months = []
+    for table in connection.introspection.table_names():
+        match = TABLE_NAME.match(table)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    return sorted(months)
+
+
+_models = {}
+_ready = set()
+_lock = threading.Lock()
+
+
+def partition_model(month):
+    """Unmanaged model for one month's table on databases without native partitioning."""
+    with _lock:
+        model = _models.get(month)
+        if model is None:
+            table = partition_table(month)
+            label = 'y%04dm%02d' % month
+            meta = type('Meta', (), {
+                'app_label': 'courses',
+                'db_table': table,
+                'managed': False,
+                'indexes': [
+                    models.Index(fields=['user_id', 'occurred_at'], name=f'activity_{label}_user'),
+                    models.Index(fields=['course_id', 'occurred_at'], name=f'activity_{label}_course'),
+                ],
+            })
+            model = type(f'ActivityEvent_{label}', (ActivityEventBase,), {
+                '__module__': __name__,
+                'Meta': meta,
+            })
+            _models[month] = model
+        return model
+
+
+def model_for(month, using):
+    if connections[using].vendor == 'postgresql':
+        return ActivityEvent
+    return partition_model(month)
+
+
+def ensure_partition(month, using=None):
+    using = using or router.db_for_write(ActivityEvent)
+    if (using, month) in _ready:
+        return
+    connection = connections[using]
+    table = partition_table(month)
+    if table not in connection.introspection.table_names():
+        try:
+            if connection.vendor == 'postgresql':
+                quote = connection.ops.quote_name
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'CREATE TABLE IF NOT EXISTS {quote(table)} PARTITION OF {quote(TABLE_PREFIX)} '
+                        f"FOR VALUES FROM ('{month_start(month).isoformat()}') "
+                        f"TO ('{month_start(add_months(month, 1)).isoformat()}')"
+                    )
+            else:
+                with connection.schema_editor() as editor:
+                    editor.create_model(partition_model(month))
+        except DatabaseError:
+            # Another worker may have created it first
+            if table not in connection.introspection.table_names():
+                raise
+    _ready.add((using, month))
+
+
+def drop_partition(month, using=None):
+    using = using or router.db_for_write(ActivityEvent)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(partition_table(month))}')
+    _ready.discard((using, month))
+
+
+def write_events(events, using=None):
+    """Insert event dicts (as produced by ``ActivityEventSerializer``) grouped by month."""
+    using = using or router.db_for_write(ActivityEvent)
+    by_month = {}
+    for event in events:
+        by_month.setdefault(month_of(event['occurred_at']), []).append(event)
+    for month, batch in sorted(by_month.items()):
+        ensure_partition(month, using)
+        model = model_for(month, using)
+        model.objects.using(using).bulk_create(
+            [model(**event) for event in batch], batch_size=settings.ACTIVITY_INSERT_BATCH_SIZE,
+        )
+    return len(events)
+
+
+def event_querysets(since, until, using=None):
+    """Querysets covering ``since <= occurred_at < until``, one per stored month off Postgres."""
+    using = using or router.db_for_read(ActivityEvent)
+    if connections[using].vendor == 'postgresql':
+        return [ActivityEvent.objects.using(using).filter(occurred_at__gte=since, occurred_at__lt=until)]
+    first, last = month_of(since), month_of(until)
+    return [
+        partition_model(month).objects.using(using).filter(occurred_at__gte=since, occurred_at__lt=until)
+        for month in stored_months(using) if first <= month <= last
+    ]
+
+
+def retention_cutoff(now=None, months=None):
+    """Start of the oldest month still kept."""
+    now = now or timezone.now()
+    months = months or settings.ACTIVITY_RETENTION_MONTHS
+    return month_start(add_months(month_of(now), 1 - months))
+
+
+class ActivityBuffer:
+    """
+    Per-process queue of events in front of ``write_events``. At most
+    ``max_pending`` events are held; beyond that (e.g. while the database is
+    unreachable) new events are dropped and counted rather than growing
+    memory without bound.
+    """
+
+    def __init__(self, size, interval, max_pending):
+        self.size = size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._stats = {'accepted': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    def _start(self):
+        # Called under the lock; (re)starts the writer after a fork
+        self._pid = os.getpid()
+        self._pending = []
+        threading.Thread(target=self._run, name='activity-writer', daemon=True).start()
+
+    def add(self, events):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            room = max(0, self.max_pending - len(self._pending))
+            self._pending.extend(events[:room])
+            self._stats['accepted'] += min(room, len(events))
+            self._stats['dropped'] += max(0, len(events) - room)
+            if len(self._pending) >= self.size:
+                self._wake.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                written = write_events(batch)
+            except DatabaseError:
+                logger.exception('Writing %d activity events failed', len(batch))
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                    # Retried with the next flush, oldest first
+                    room = max(0, self.max_pending - len(self._pending))
+                    self._stats['dropped'] += max(0, len(batch) - room)
+                    self._pending[:0] = batch[:room]
+                return 0
+            except Exception:
+                # Not transient; retrying the same batch would fail forever
+                logger.exception('Dropping %d activity events that could not be written', len(batch))
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                    self._stats['dropped'] += len(batch)
+                return 0
+            with self._lock:
+                self._stats['written'] += written
+                self._stats['flushes'] += 1
+            return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The writer must outlive any error, or every later event is dropped
+                logger.exception('Activity writer iteration failed')
+            finally:
+                connections.close_all()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending)}
+
+
+activity_buffer = ActivityBuffer(
+    size=settings.ACTIVITY_BUFFER_SIZE,
+    interval=settings.ACTIVITY_FLUSH_SECONDS,
+    max_pending=settings.ACTIVITY_BUFFER_MAX,
+)
+atexit.register(activity_buffer.flush)
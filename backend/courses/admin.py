@@ -1,18 +1,37 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Count
+from django.template.response import TemplateResponse
+from django.db.models.functions import Left
+from .admin_tools import AutocompleteFilterMixin, BackgroundDeleteAdminMixin, LargeTableAdminMixin, autocomplete_filter
+from .cohorts import bulk_enroll, read_emails
 from .models import (
     Course, Lesson, Enrollment, Progress, Certificate, Assignment, 
     AssignmentSubmission, Quiz, Question, Choice, QuizResult, Note, Video,
-    Article, Webinar, WebinarRegistration, ArticleLike
+    Article, Webinar, WebinarRegistration, ArticleLike, CourseReview, DeletionJob
 )
 
+class BulkEnrollForm(forms.Form):
+    file = forms.FileField(help_text="CSV with an 'email' column, or emails in the first column")
+    create_missing = forms.BooleanField(
+        required=False,
+        help_text="Create accounts for unknown emails (they set a password later)",
+    )
+    send_invites = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text="Email new accounts a link to choose their password",
+    )
+
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(BackgroundDeleteAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'instructor_name', 'price', 'level', 'students_count', 'rating', 'published', 'created_at']
     list_filter = ['level', 'published', 'created_at', 'category']
     search_fields = ['title', 'description', 'instructor_name']
-    list_editable = ['price', 'published', 'rating']
+    list_editable = ['price', 'published']
     prepopulated_fields = {'slug': ('title',)}
     ordering = ['-created_at']
+    autocomplete_fields = ['instructor']
     
     fieldsets = (
         ('Basic Information', {
@@ -25,7 +44,7 @@ class CourseAdmin(admin.ModelAdmin):
             'fields': ('price', 'duration', 'thumbnail_url', 'preview_video_url')
         }),
         ('Statistics', {
-            'fields': ('students_count', 'rating', 'published'),
+            'fields': ('students_count', 'rating', 'rating_count', 'published'),
             'classes': ('wide',)
         }),
         ('Timestamps', {
@@ -34,15 +53,62 @@ class CourseAdmin(admin.ModelAdmin):
         })
     )
     
-    readonly_fields = ['created_at']
+    # Ratings come from CourseReview; fix drift with manage.py reconcile_course_ratings
+    readonly_fields = ['created_at', 'rating', 'rating_count']
+    actions = ['bulk_enroll_from_csv']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('description')
+    
+    @admin.action(description='Bulk enroll learners from CSV')
+    def bulk_enroll_from_csv(self, request, queryset):
+        form = BulkEnrollForm(request.POST, request.FILES) if 'apply' in request.POST else BulkEnrollForm()
+        if 'apply' in request.POST and form.is_valid():
+            # Resolve the CSV once and reuse it for every selected course
+            emails = list(read_emails(form.cleaned_data['file']))
+            for course in queryset:
+                report = bulk_enroll(
+                    course, emails,
+                    create_missing=form.cleaned_data['create_missing'],
+                    send_invites=form.cleaned_data['send_invites'],
+                )
+                self.message_user(
+                    request,
+                    f"{course.title}: {report['enrolled']} enrolled, "
+                    f"{report['already_enrolled']} already enrolled, "
+                    f"{len(report['created_users'])} accounts created "
+                    f"({report['invites_queued']} invited), "
+                    f"{len(report['unknown_emails'])} unknown and "
+                    f"{len(report['invalid_emails'])} invalid emails skipped",
+                    messages.SUCCESS,
+                )
+                if report['errors']:
+                    self.message_user(
+                        request,
+                        f"{course.title}: no account could be created for "
+                        + ', '.join(error['email'] for error in report['errors'][:20])
+                        + ' (the address is already another account\'s username)',
+                        messages.WARNING,
+                    )
+            return None
+        return TemplateResponse(request, 'admin/courses/course/bulk_enroll.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk enroll learners',
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+        })
 
 @admin.register(Lesson)
-class LessonAdmin(admin.ModelAdmin):
+class LessonAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'course', 'order', 'duration']
-    list_filter = ['course']
+    list_filter = [autocomplete_filter('course')]
+    list_select_related = ['course']
     search_fields = ['title', 'content']
     list_editable = ['order']
     ordering = ['course', 'order']
+    autocomplete_fields = ['course']
     
     fieldsets = (
         ('Lesson Details', {
@@ -52,23 +118,27 @@ class LessonAdmin(admin.ModelAdmin):
             'fields': ('content',)
         })
     )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('content')
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'course', 'enrolled_at', 'last_accessed']
-    list_filter = ['enrolled_at', 'course']
+    list_filter = ['enrolled_at', autocomplete_filter('course')]
+    list_select_related = ['user', 'course']
     search_fields = ['user__email', 'user__username', 'course__title']
     readonly_fields = ['enrolled_at', 'last_accessed']
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user', 'course')
+    autocomplete_fields = ['user', 'course']
 
 @admin.register(Progress)
-class ProgressAdmin(admin.ModelAdmin):
+class ProgressAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['get_user', 'get_course', 'lesson', 'completed', 'completed_at']
-    list_filter = ['completed', 'completed_at', 'enrollment__course']
+    list_filter = ['completed', 'completed_at', autocomplete_filter('enrollment__course', 'course')]
+    list_select_related = ['enrollment__user', 'enrollment__course', 'lesson']
     search_fields = ['enrollment__user__email', 'lesson__title']
     readonly_fields = ['completed_at']
+    autocomplete_fields = ['enrollment', 'lesson']
     
     def get_user(self, obj):
         return obj.enrollment.user.email
@@ -81,16 +151,28 @@ class ProgressAdmin(admin.ModelAdmin):
     get_course.admin_order_field = 'enrollment__course__title'
 
 @admin.register(Certificate)
-class CertificateAdmin(admin.ModelAdmin):
+class CertificateAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['user', 'course', 'issued_date', 'verification_id']
-    list_filter = ['issued_date', 'course']
+    list_filter = ['issued_date', autocomplete_filter('course')]
+    list_select_related = ['user', 'course']
+    autocomplete_fields = ['user', 'course']
     search_fields = ['user__email', 'course__title', 'verification_id']
     readonly_fields = ['issued_date', 'verification_id']
 
+@admin.register(CourseReview)
+class CourseReviewAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'course', 'rating', 'created_at']
+    list_filter = ['rating', 'created_at', autocomplete_filter('course')]
+    list_select_related = ['user', 'course']
+    search_fields = ['user__email', 'course__title', 'comment']
+    readonly_fields = ['enrollment', 'course', 'user', 'created_at', 'updated_at']
+
 @admin.register(Assignment)
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'course', 'due_date', 'status_indicator', 'created_at']
-    list_filter = ['course', 'due_date', 'created_at']
+    list_filter = [autocomplete_filter('course'), 'due_date', 'created_at']
+    list_select_related = ['course']
+    autocomplete_fields = ['course']
     search_fields = ['title', 'description']
     date_hierarchy = 'due_date'
     
@@ -107,9 +189,12 @@ class AssignmentAdmin(admin.ModelAdmin):
     status_indicator.short_description = 'Status'
 
 @admin.register(AssignmentSubmission)
-class AssignmentSubmissionAdmin(admin.ModelAdmin):
+class AssignmentSubmissionAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['assignment', 'user', 'submitted_at', 'grade', 'graded_status']
-    list_filter = ['submitted_at', 'assignment__course', 'grade']
+    list_filter = ['submitted_at', autocomplete_filter('assignment__course', 'course'), 'grade']
+    list_select_related = ['assignment', 'user']
+    raw_id_fields = ['assignment']
+    autocomplete_fields = ['user']
     search_fields = ['user__email', 'assignment__title']
     readonly_fields = ['submitted_at']
     
@@ -120,58 +205,85 @@ class AssignmentSubmissionAdmin(admin.ModelAdmin):
     graded_status.short_description = 'Graded'
 
 @admin.register(Quiz)
-class QuizAdmin(admin.ModelAdmin):
+class QuizAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'course', 'order', 'question_count']
-    list_filter = ['course']
+    list_filter = [autocomplete_filter('course')]
+    list_select_related = ['course']
     search_fields = ['title', 'description']
     list_editable = ['order']
+    autocomplete_fields = ['course']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(num_questions=Count('questions'))
     
     def question_count(self, obj):
-        return obj.questions.count()
+        return obj.num_questions
     question_count.short_description = 'Questions'
+    question_count.admin_order_field = 'num_questions'
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['question_text_preview', 'quiz', 'type', 'choice_count']
-    list_filter = ['type', 'quiz__course']
+    list_filter = ['type', autocomplete_filter('quiz__course', 'course')]
+    list_select_related = ['quiz']
     search_fields = ['question_text']
+    raw_id_fields = ['quiz']
+    
+    def get_queryset(self, request):
+        return (
+            super().get_queryset(request)
+            .defer('question_text')
+            .annotate(num_choices=Count('choices'), text_head=Left('question_text', 51))
+        )
     
     def question_text_preview(self, obj):
-        return obj.question_text[:50] + "..." if len(obj.question_text) > 50 else obj.question_text
+        return obj.text_head[:50] + "..." if len(obj.text_head) > 50 else obj.text_head
     question_text_preview.short_description = 'Question'
     
     def choice_count(self, obj):
-        return obj.choices.count()
+        return obj.num_choices
     choice_count.short_description = 'Choices'
+    choice_count.admin_order_field = 'num_choices'
 
 @admin.register(Choice)
-class ChoiceAdmin(admin.ModelAdmin):
+class ChoiceAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['choice_text', 'question', 'is_correct']
-    list_filter = ['is_correct', 'question__quiz__course']
+    list_filter = ['is_correct', autocomplete_filter('question__quiz__course', 'course')]
+    raw_id_fields = ['question']
     search_fields = ['choice_text', 'question__question_text']
     list_editable = ['is_correct']
 
 @admin.register(QuizResult)
-class QuizResultAdmin(admin.ModelAdmin):
+class QuizResultAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['quiz', 'user', 'score', 'passed', 'taken_at']
-    list_filter = ['passed', 'taken_at', 'quiz__course']
+    list_filter = ['passed', 'taken_at', autocomplete_filter('quiz__course', 'course')]
+    list_select_related = ['quiz', 'user']
+    raw_id_fields = ['quiz']
+    autocomplete_fields = ['user']
     search_fields = ['user__email', 'quiz__title']
     readonly_fields = ['taken_at']
 
 @admin.register(Note)
-class NoteAdmin(admin.ModelAdmin):
+class NoteAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['content_preview', 'course']
-    list_filter = ['course']
+    list_filter = [autocomplete_filter('course')]
+    list_select_related = ['course']
     search_fields = ['content']
+    autocomplete_fields = ['course']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('content').annotate(content_head=Left('content', 101))
     
     def content_preview(self, obj):
-        return obj.content[:100] + "..." if len(obj.content) > 100 else obj.content
+        return obj.content_head[:100] + "..." if len(obj.content_head) > 100 else obj.content_head
     content_preview.short_description = 'Note Content'
 
 @admin.register(Video)
-class VideoAdmin(admin.ModelAdmin):
+class VideoAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'course', 'url_preview']
-    list_filter = ['course']
+    list_filter = [autocomplete_filter('course')]
+    list_select_related = ['course']
+    autocomplete_fields = ['course']
     search_fields = ['title', 'url']
     
     def url_preview(self, obj):
@@ -179,9 +291,10 @@ class VideoAdmin(admin.ModelAdmin):
     url_preview.short_description = 'Video URL'
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'author', 'category', 'status', 'views_count', 'likes_count', 'created_at']
-    list_filter = ['status', 'category', 'created_at', 'author']
+    list_filter = ['status', 'category', 'created_at', autocomplete_filter('author')]
+    list_select_related = ['author']
     search_fields = ['title', 'content', 'tags']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ['views_count', 'likes_count', 'created_at', 'updated_at', 'published_at']
@@ -204,15 +317,19 @@ class ArticleAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('content')
+    
     def save_model(self, request, obj, form, change):
         if not change:
             obj.author = request.user
         super().save_model(request, obj, form, change)
 
 @admin.register(Webinar)
-class WebinarAdmin(admin.ModelAdmin):
+class WebinarAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ['title', 'presenter', 'scheduled_date', 'status', 'registered_count', 'registration_status']
-    list_filter = ['status', 'registration_status', 'scheduled_date', 'presenter']
+    list_filter = ['status', 'registration_status', 'scheduled_date', autocomplete_filter('presenter')]
+    list_select_related = ['presenter']
     search_fields = ['title', 'description', 'tags']
     prepopulated_fields = {'slug': ('title',)}
     readonly_fields = ['registered_count', 'attended_count', 'created_at', 'updated_at']
@@ -256,19 +373,33 @@ class WebinarAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 @admin.register(WebinarRegistration)
-class WebinarRegistrationAdmin(admin.ModelAdmin):
+class WebinarRegistrationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['webinar', 'user', 'registered_at', 'attended', 'feedback_rating']
-    list_filter = ['attended', 'feedback_rating', 'registered_at', 'webinar']
+    list_filter = ['attended', 'feedback_rating', 'registered_at', autocomplete_filter('webinar')]
+    list_select_related = ['webinar', 'user']
+    autocomplete_fields = ['webinar', 'user']
     search_fields = ['webinar__title', 'user__email', 'user__first_name', 'user__last_name']
     readonly_fields = ['registered_at']
 
 @admin.register(ArticleLike)
-class ArticleLikeAdmin(admin.ModelAdmin):
+class ArticleLikeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['article', 'user', 'created_at']
     list_filter = ['created_at']
+    list_select_related = ['article', 'user']
+    autocomplete_fields = ['article', 'user']
     search_fields = ['article__title', 'user__email']
     readonly_fields = ['created_at']
 
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model_label', 'object_repr', 'status', 'step', 'steps_total', 'created_at', 'finished_at']
+    list_filter = ['status', 'model_label']
+    search_fields = ['object_repr']
+    readonly_fields = [field.name for field in DeletionJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
 # Customize the admin site
 admin.site.site_header = "Thinktank LMS Admin"
 admin.site.site_title = "Thinktank LMS"
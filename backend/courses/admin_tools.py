@@ -0,0 +1,162 @@
+"""
+Helpers that keep admin changelists cheap on very large tables.
+
+* ``EstimatedCountPaginator`` reads row estimates from the database
+  statistics instead of running ``COUNT(*)`` over an unfiltered table.
+* ``autocomplete_filter`` builds a sidebar filter backed by the admin's
+  select2 autocomplete widget, so related objects are searched on demand
+  rather than all loaded into the filter list.
+* ``BackgroundDeleteAdminMixin`` hands deletes to ``courses.deletion``
+  instead of collecting every related row in the request.
+"""
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .deletion import schedule_deletion
+
+# Below this many rows an exact COUNT(*) is cheap enough and more useful.
+ESTIMATE_THRESHOLD = 100_000
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Return the planner's row estimate for ``model``'s table, or ``None`` if
+    the backend doesn't expose one (or the table has never been analysed).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts table statistics when the queryset is unfiltered."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class RelatedAutocompleteFilter(admin.SimpleListFilter):
+    template = 'admin/courses/autocomplete_filter.html'
+    field_path = None
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        field = get_fields_from_path(model, self.field_path)[-1]
+        # The form field binds a lazy ModelChoiceIterator to the widget, so
+        # rendering only fetches the currently selected object.
+        form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.widget = form_field.widget
+        self.rendered_widget = self.widget.render(
+            name=self.parameter_name,
+            value=self.value(),
+            attrs={'id': f'autocomplete-filter-{self.parameter_name}', 'style': 'width: 100%'},
+        )
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+def autocomplete_filter(field_path, title=None):
+    """Return a ``RelatedAutocompleteFilter`` subclass for ``field_path``."""
+    name = ''.join(part.title() for part in field_path.split('__'))
+    return type(f'{name}AutocompleteFilter', (RelatedAutocompleteFilter,), {
+        'field_path': field_path,
+        'parameter_name': f'{field_path}__id__exact',
+        'title': title or field_path.split('__')[-1].replace('_', ' '),
+    })
+
+
+class AutocompleteFilterMixin:
+    """
+    Adds the select2 assets that ``autocomplete_filter`` widgets need and
+    whitelists their (possibly multi-level) lookup parameters.
+    """
+
+    def lookup_allowed(self, lookup, value, request):
+        for list_filter in self.list_filter:
+            if (
+                isinstance(list_filter, type)
+                and issubclass(list_filter, RelatedAutocompleteFilter)
+                and lookup == list_filter.parameter_name
+            ):
+                return True
+        return super().lookup_allowed(lookup, value, request)
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['courses/admin/autocomplete_filter.js'])
+        )
+
+
+class LargeTableAdminMixin(AutocompleteFilterMixin):
+    """
+    Changelist defaults for multi-million row tables: estimated counts, no
+    full-result count and no facet counts.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class BackgroundDeleteAdminMixin:
+    """
+    Deletes soft-mark the object and queue a DeletionJob. The confirmation
+    page lists only the selected objects rather than every dependent row.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        opts = self.model._meta
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        objs = list(objs)
+        return [str(obj) for obj in objs], {opts.verbose_name_plural: len(objs)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, [obj])
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj, requested_by=request.user)
+        self.message_user(
+            request, 'Related records are being removed in the background; see Deletion jobs for progress.',
+            messages.INFO,
+        )
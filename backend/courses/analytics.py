@@ -0,0 +1,140 @@
+"""
+Psychometric item analysis for quizzes.
+
+Attempts are read in keyset-paginated chunks and turned into dense NumPy
+matrices (attempts x questions), from which only running sums are kept.
+Difficulty, corrected point-biserial discrimination, KR-20 reliability and
+per-choice selection rates are all derived from those sums, so memory stays
+bounded by the chunk size regardless of how many attempts a quiz has.
+"""
+import numpy as np
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+
+from .models import Choice, Question, QuizAnalytics, QuizResponse, QuizResult, QuestionAnalytics
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _lookup(sorted_ids, values):
+    """Return positions of ``values`` in ``sorted_ids`` and a mask of hits."""
+    if not len(sorted_ids):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    return pos, sorted_ids[pos] == values
+
+
+def compute_quiz_analytics(quiz, chunk_size=DEFAULT_CHUNK_SIZE):
+    question_ids = np.array(
+        Question.objects.filter(quiz=quiz).order_by('id').values_list('id', flat=True),
+        dtype=np.int64,
+    )
+    choices = list(
+        Choice.objects.filter(question__quiz=quiz).order_by('id').values_list('id', 'question_id')
+    )
+    choice_ids = np.array([c[0] for c in choices], dtype=np.int64)
+    choice_questions = np.array([c[1] for c in choices], dtype=np.int64)
+
+    n_items = len(question_ids)
+    n_attempts = 0
+    item_correct = np.zeros(n_items, dtype=np.float64)      # sum(x_i)
+    item_answered = np.zeros(n_items, dtype=np.int64)
+    item_total = np.zeros(n_items, dtype=np.float64)        # sum(x_i * T)
+    total_sum = 0.0                                         # sum(T)
+    total_sq_sum = 0.0                                      # sum(T^2)
+    choice_counts = np.zeros(len(choice_ids), dtype=np.int64)
+
+    results = QuizResult.objects.filter(quiz=quiz).order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while n_items:
+        attempt_ids = np.array(list(results.filter(id__gt=last_id)[:chunk_size]), dtype=np.int64)
+        if not len(attempt_ids):
+            break
+        last_id = int(attempt_ids[-1])
+
+        rows = list(
+            QuizResponse.objects.filter(
+                result_id__gte=attempt_ids[0],
+                result_id__lte=attempt_ids[-1],
+                question_id__in=question_ids.tolist(),
+            ).values_list('result_id', 'question_id', Coalesce('choice_id', Value(-1)), 'is_correct')
+        )
+        matrix = np.zeros((len(attempt_ids), n_items), dtype=np.float64)
+        if rows:
+            data = np.array(rows, dtype=np.int64)
+            # The id range can interleave attempts from other quizzes; drop
+            # any response that isn't attached to one of this chunk's attempts.
+            attempt_pos, hit = _lookup(attempt_ids, data[:, 0])
+            data, attempt_pos = data[hit], attempt_pos[hit]
+            item_pos, _ = _lookup(question_ids, data[:, 1])
+            matrix[attempt_pos, item_pos] = data[:, 3]
+            item_answered += np.bincount(item_pos, minlength=n_items)
+
+            choice_pos, picked = _lookup(choice_ids, data[:, 2])
+            choice_counts += np.bincount(choice_pos[picked], minlength=len(choice_ids))
+
+        totals = matrix.sum(axis=1)
+        n_attempts += len(attempt_ids)
+        item_correct += matrix.sum(axis=0)
+        item_total += matrix.T @ totals
+        total_sum += totals.sum()
+        total_sq_sum += (totals ** 2).sum()
+
+    return _store(
+        quiz, question_ids, choice_ids, choice_questions, n_attempts,
+        item_correct, item_answered, item_total, total_sum, total_sq_sum, choice_counts,
+    )
+
+
+def _store(quiz, question_ids, choice_ids, choice_questions, n,
+           item_correct, item_answered, item_total, total_sum, total_sq_sum, choice_counts):
+    difficulty = np.full(len(question_ids), np.nan)
+    discrimination = np.full(len(question_ids), np.nan)
+    mean_score = reliability = None
+
+    if n:
+        p = item_correct / n
+        mean_t = total_sum / n
+        var_t = total_sq_sum / n - mean_t ** 2
+        var_x = p * (1 - p)
+        cov_xt = item_total / n - p * mean_t
+        # Correlate each item with the rest score (total minus the item) so
+        # an item doesn't inflate its own discrimination.
+        cov_rest = cov_xt - var_x
+        var_rest = var_t - 2 * cov_xt + var_x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discrimination = cov_rest / np.sqrt(var_x * var_rest)
+        difficulty = p
+        mean_score = float(mean_t)
+        k = len(question_ids)
+        if k > 1 and var_t > 0:
+            reliability = float(k / (k - 1) * (1 - var_x.sum() / var_t))
+
+    def clean(value):
+        return None if not np.isfinite(value) else float(value)
+
+    rates = {}
+    for cid, qid, count in zip(choice_ids.tolist(), choice_questions.tolist(), choice_counts.tolist()):
+        rates.setdefault(qid, {})[str(cid)] = (count / n) if n else None
+
+    QuestionAnalytics.objects.bulk_create(
+        [
+            QuestionAnalytics(
+                question_id=qid,
+                attempts=n,
+                responses=int(item_answered[i]),
+                difficulty=clean(difficulty[i]),
+                discrimination=clean(discrimination[i]),
+                choice_rates=rates.get(qid, {}),
+            )
+            for i, qid in enumerate(question_ids.tolist())
+        ],
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['attempts', 'responses', 'difficulty', 'discrimination', 'choice_rates', 'computed_at'],
+    )
+    analytics, _ = QuizAnalytics.objects.update_or_create(
+        quiz=quiz,
+        defaults={'attempts': n, 'mean_score': mean_score, 'reliability': reliability},
+    )
+    return analytics
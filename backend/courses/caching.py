@@ -0,0 +1,13 @@
+"""Shared ``TieredCache`` instances for course data."""
+from thinktank.cache import TieredCache
+
+# Published catalog pages; namespace 'courses' is bumped on any course change
+catalog_cache = TieredCache('catalog', ttl=300)
+# Learner dashboards; namespace 'user:<id>' is bumped on that user's changes
+dashboard_cache = TieredCache('dashboard', ttl=120)
+# Co-enrollment recommendations; namespace 'recommendations' is bumped by each rebuild
+recommendation_cache = TieredCache('recommendations', ttl=3600)
+# Rendered Markdown keyed by content hash; entries never go stale, only cold
+content_cache = TieredCache('content', ttl=86400)
+# TF-IDF document frequencies; replaced by each related-articles rebuild
+related_cache = TieredCache('related_articles', ttl=86400)
@@ -0,0 +1,125 @@
+"""
+Deep copies of a course for a new term.
+
+The tree is copied one level at a time: each model's source rows are read in
+one query and written with ``bulk_create``, and old ids are mapped to the new
+objects in memory so the next level can point at them. The number of queries
+therefore depends on the number of models, not on the size of the course.
+
+Learner data (enrollments, progress, submissions, quiz results, reviews) and
+derived data (rollups, recommendations) are not copied.
+"""
+import secrets
+
+from django.db import IntegrityError, router, transaction
+from django.utils.text import slugify
+
+from .models import Assignment, Choice, Course, Lesson, Note, Question, Quiz, Video
+
+COURSE_FIELDS = [
+    'description', 'instructor_id', 'instructor_name', 'price', 'duration', 'category', 'level',
+    'thumbnail_url', 'preview_video_url',
+]
+
+
+# Inserts tried with a random slug suffix after the first choice was taken
+SLUG_RETRIES = 3
+
+
+def unique_slug(title):
+    base = slugify(title)[:45] or 'course'
+    taken = set(Course.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+    slug, suffix = base, 2
+    while slug in taken:
+        slug, suffix = f'{base}-{suffix}', suffix + 1
+    return slug
+
+
+def _insert_with_unique_slug(course, using):
+    """
+    Save the new ``course`` under a free slug. Two clones of the same title
+    can pick the same slug concurrently, so the loser of the unique
+    constraint retries with a random suffix; re-reading the taken slugs
+    wouldn't help under REPEATABLE READ.
+    """
+    course.slug = unique_slug(course.title)
+    for attempt in range(SLUG_RETRIES + 1):
+        try:
+            with transaction.atomic(using=using):
+                course.save(force_insert=True)
+            return
+        except IntegrityError:
+            if attempt == SLUG_RETRIES:
+                raise
+            course.slug = f'{slugify(course.title)[:45] or "course"}-{secrets.token_hex(3)}'
+
+
+def _bulk_create(model, objs, **parent_filter):
+    """
+    ``bulk_create`` that leaves primary keys on ``objs`` even on backends that
+    can't return them (MySQL), by reading the new rows back in insert order.
+    """
+    objs = model.objects.bulk_create(objs)
+    if objs and objs[0].pk is None:
+        ids = model.objects.filter(**parent_filter).order_by('id').values_list('id', flat=True)
+        for obj, pk in zip(objs, ids):
+            obj.pk = pk
+    return objs
+
+
+def clone_course(course, title=None, published=False):
+    """Copy ``course`` with its lessons, quizzes, questions, choices, assignments, notes and videos."""
+    using = router.db_for_write(Course)
+    with transaction.atomic(using=using):
+        title = title or f'{course.title} (copy)'
+        copy = Course(
+            title=title, published=published,
+            **{field: getattr(course, field) for field in COURSE_FIELDS},
+        )
+        _insert_with_unique_slug(copy, using)
+
+        # Ordinals are handed out afresh by LessonManager in the same order
+        lessons = Lesson.objects.bulk_create([
+            Lesson(course=copy, title=lesson.title, content=lesson.content, content_hash=lesson.content_hash,
+                   duration=lesson.duration, order=lesson.order)
+            for lesson in Lesson.objects.filter(course=course).order_by('ordinal')
+        ])
+
+        quizzes = {}
+        source_quizzes = list(Quiz.objects.filter(course=course).order_by('id'))
+        for quiz, new in zip(source_quizzes, _bulk_create(Quiz, [
+            Quiz(course=copy, title=quiz.title, description=quiz.description, order=quiz.order)
+            for quiz in source_quizzes
+        ], course=copy)):
+            quizzes[quiz.id] = new
+
+        questions = {}
+        source_questions = list(Question.objects.filter(quiz__course=course).order_by('id'))
+        for question, new in zip(source_questions, _bulk_create(Question, [
+            Question(quiz=quizzes[question.quiz_id], question_text=question.question_text, type=question.type)
+            for question in source_questions
+        ], quiz__course=copy)):
+            questions[question.id] = new
+
+        choices = Choice.objects.bulk_create([
+            Choice(question=questions[choice.question_id], choice_text=choice.choice_text, is_correct=choice.is_correct)
+            for choice in Choice.objects.filter(question__quiz__course=course).order_by('id')
+        ])
+
+        assignments = Assignment.objects.bulk_create([
+            Assignment(course=copy, title=assignment.title, description=assignment.description,
+                       due_date=assignment.due_date)
+            for assignment in Assignment.objects.filter(course=course).order_by('id')
+        ])
+        notes = Note.objects.bulk_create([
+            Note(course=copy, content=note.content) for note in Note.objects.filter(course=course).order_by('id')
+        ])
+        videos = Video.objects.bulk_create([
+            Video(course=copy, url=video.url, title=video.title)
+            for video in Video.objects.filter(course=course).order_by('id')
+        ])
+
+    return copy, {
+        'lessons': len(lessons), 'quizzes': len(quizzes), 'questions': len(questions), 'choices': len(choices),
+        'assignments': len(assignments), 'notes': len(notes), 'videos': len(videos),
+    }
@@ -0,0 +1,162 @@
+"""
+Bulk cohort enrollment.
+
+Emails are resolved to users with batched ``IN`` queries, enrollments are
+written with ``bulk_create(ignore_conflicts=True)`` and the course's
+``students_count`` is adjusted with a single UPDATE, so a cohort of tens of
+thousands of learners costs a handful of queries per batch instead of
+several per learner.
+
+Addresses are matched case-insensitively (served by the ``Lower('email')``
+index on users), so ``Ada@Example.com`` in a CSV finds the account
+registered as ``ada@example.com`` instead of creating a second one.
+
+The bulk writes send no model signals, so the catalog and the enrolled
+learners' dashboards are invalidated explicitly once the import commits.
+"""
+import csv
+import io
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from users.emails import queue_password_setup_emails
+
+from .caching import catalog_cache, dashboard_cache
+from .models import Course, Enrollment
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def read_emails(uploaded_file):
+    """
+    Yield the email column of a CSV upload. A header row with an ``email``
+    column is honoured; otherwise the first column is used.
+    """
+    text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    column = 0
+    for line_number, row in enumerate(reader):
+        if not row:
+            continue
+        if line_number == 0:
+            header = [cell.strip().lower() for cell in row]
+            if 'email' in header:
+                column = header.index('email')
+                continue
+        if column < len(row):
+            yield row[column]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _user_ids(emails):
+    """{lowercased email: user id} for accounts matching ``emails`` (lowercased) in any case."""
+    matches = (
+        User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        .order_by('-id').values_list('email_lower', 'id')
+    )
+    # Ordered so the oldest account wins if case variants already exist
+    return dict(matches)
+
+
+def _invalidate_caches(user_ids):
+    catalog_cache.bump('courses')
+    for user_id in user_ids:
+        dashboard_cache.bump(f'user:{user_id}')
+
+
+def bulk_enroll(course, emails, create_missing=False, send_invites=False, batch_size=BATCH_SIZE):
+    """
+    Enroll every address in ``emails`` into ``course``.
+
+    Returns a report dict describing what was created and what was skipped;
+    ``errors`` lists addresses whose account could not be created (their
+    address is already some other account's username). Newly created
+    accounts get an unusable password; with ``send_invites`` their owners
+    are emailed a password-setup link after the import commits
+    (``invites_queued``).
+    """
+    seen = set()
+    valid, invalid = [], []
+    for raw in emails:
+        email = User.objects.normalize_email(raw.strip())
+        if not email or email.lower() in seen:
+            continue
+        seen.add(email.lower())
+        try:
+            validate_email(email)
+        except ValidationError:
+            invalid.append(raw)
+            continue
+        valid.append(email)
+
+    report = {
+        'course_id': course.id,
+        'enrolled': 0,
+        'already_enrolled': 0,
+        'created_users': [],
+        'unknown_emails': [],
+        'invalid_emails': invalid,
+        'errors': [],
+        'invites_queued': 0,
+    }
+    enrolled_ids = []
+
+    with transaction.atomic():
+        for batch in _chunks(valid, batch_size):
+            user_ids = _user_ids([email.lower() for email in batch])
+            missing = [email for email in batch if email.lower() not in user_ids]
+
+            if missing and create_missing:
+                unusable = make_password(None)
+                User.objects.bulk_create(
+                    [
+                        User(email=email, username=email[:150], password=unusable)
+                        for email in missing
+                    ],
+                    ignore_conflicts=True,
+                )
+                created = dict(User.objects.filter(email__in=missing).values_list('email', 'id'))
+                user_ids.update((email.lower(), user_id) for email, user_id in created.items())
+                report['created_users'].extend(created)
+                # ignore_conflicts skipped these: the username is taken
+                report['errors'].extend(
+                    {'email': email, 'error': 'Could not create an account: the username is already in use'}
+                    for email in missing if email not in created
+                )
+            else:
+                report['unknown_emails'].extend(missing)
+
+            existing = set(
+                Enrollment.objects.filter(course=course, user_id__in=user_ids.values())
+                .values_list('user_id', flat=True)
+            )
+            new_ids = [uid for uid in user_ids.values() if uid not in existing]
+            Enrollment.objects.bulk_create(
+                [Enrollment(user_id=uid, course=course) for uid in new_ids],
+                ignore_conflicts=True,
+            )
+            enrolled_ids.extend(new_ids)
+            report['enrolled'] += len(new_ids)
+            report['already_enrolled'] += len(existing)
+
+        if report['enrolled']:
+            Course.objects.filter(pk=course.pk).update(
+                students_count=F('students_count') + report['enrolled']
+            )
+            transaction.on_commit(lambda: _invalidate_caches(enrolled_ids))
+        if send_invites:
+            report['invites_queued'] = queue_password_setup_emails(report['created_users'])
+
+    return report
@@ -0,0 +1,191 @@
+"""
+Background deletion of courses and users.
+
+Letting Django's collector delete a large course or an active learner loads
+every dependent row (enrollments, progress, quiz responses, submissions, ...)
+into memory and removes them all in one long transaction. Instead,
+``schedule_deletion`` only soft-marks the object (a course gets ``deleted_at``
+and drops out of ``Course.objects``, a user is deactivated) and records a
+``DeletionJob``.
+
+The job walks the ``on_delete`` graph below the object, leaves first, and
+removes each dependent model ``DELETION_BATCH_SIZE`` rows at a time. A batch
+is a plain ``DELETE ... WHERE id IN (...)``, unless the model has delete
+signal receivers (review ratings, cache invalidation), in which case the
+batch goes through the ORM so they still run. ``SET_NULL`` relations are
+cleared the same way. The object itself is deleted last with the ORM, which
+also catches rows added while the job ran.
+
+Every batch commits together with the job's ``progress``, and each finished
+step's label is added to ``completed_steps``. A job that was interrupted
+resumes by running every step of the current plan that isn't completed yet,
+so a deploy that adds, removes or reorders relations in between can't make
+it skip or repeat the wrong step. Jobs run on a thread after
+the request commits (``DELETION_BACKGROUND_THREAD``) and can be resumed or run
+by ``manage.py run_deletion_jobs``.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, models, router, transaction
+from django.db.models import Q, signals
+from django.utils import timezone
+
+from .models import Course, DeletionJob
+
+logger = logging.getLogger(__name__)
+
+
+def plan(model, path='pk', _seen=()):
+    """
+    The steps that clear everything pointing at one ``model`` row, children
+    before parents. Each step is ``('delete', model, lookup)`` or
+    ``('null', model, lookup, field_name)`` where ``lookup`` filters the
+    affected rows by the root's primary key.
+    """
+    steps = []
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not (relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one)):
+            continue
+        related, field = relation.related_model, relation.field
+        lookup = f'{field.name}__{path}'
+        if relation.on_delete is models.CASCADE:
+            if related in _seen:
+                continue
+            steps += plan(related, lookup, _seen + (model,))
+            steps.append(('delete', related, lookup))
+        elif relation.on_delete is models.SET_NULL:
+            steps.append(('null', related, lookup, field.name))
+        # PROTECT/RESTRICT are left to the final ORM delete to enforce
+    return steps
+
+
+def _label(step):
+    return f'{step[1]._meta.label} via {step[2].removesuffix("__pk")}'
+
+
+def _has_receivers(model):
+    return signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model)
+
+
+def _raw_delete(model, pks, using):
+    connection = connections[using]
+    opts = model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM %s WHERE %s IN (%s)' % (
+                connection.ops.quote_name(opts.db_table),
+                connection.ops.quote_name(opts.pk.column),
+                ', '.join(['%s'] * len(pks)),
+            ),
+            pks,
+        )
+
+
+def _run_batch(job, step, using, batch_size):
+    """Clear up to ``batch_size`` rows for ``step``. Returns how many were affected."""
+    kind, model, lookup = step[:3]
+    with transaction.atomic(using=using):
+        pks = list(
+            model._base_manager.using(using).filter(**{lookup: job.object_id})
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        label = _label(step)
+        if pks:
+            if kind == 'null':
+                model._base_manager.using(using).filter(pk__in=pks).update(**{step[3]: None})
+            elif _has_receivers(model):
+                model._base_manager.using(using).filter(pk__in=pks).delete()
+            else:
+                _raw_delete(model, pks, using)
+            job.progress[label] = job.progress.get(label, 0) + len(pks)
+        else:
+            job.completed_steps.append(label)
+            job.step = len(job.completed_steps)
+        job.save(update_fields=['step', 'completed_steps', 'progress', 'updated_at'])
+    return len(pks)
+
+
+def _claim(job_id):
+    """Mark the job running if it is waiting, failed or abandoned. Returns the job or None."""
+    stale = timezone.now() - timedelta(seconds=settings.DELETION_STALE_SECONDS)
+    claimed = DeletionJob.objects.filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=stale), id=job_id,
+    ).update(status='running', error='', updated_at=timezone.now())
+    return DeletionJob.objects.get(id=job_id) if claimed else None
+
+
+def run_job(job_id, progress=None):
+    """
+    Run (or resume) one deletion job to completion. ``progress`` is called as
+    ``progress(job, label, rows_done)`` after each batch. Returns the job, or
+    None when another worker holds it or it has already finished.
+    """
+    job = _claim(job_id)
+    if job is None:
+        return None
+    model = apps.get_model(job.model_label)
+    using = router.db_for_write(model)
+    batch_size = settings.DELETION_BATCH_SIZE
+    steps = [step for step in plan(model) if _label(step) not in job.completed_steps]
+    job.steps_total = len(job.completed_steps) + len(steps)
+    job.save(update_fields=['steps_total', 'updated_at'])
+    try:
+        for step in steps:
+            while _run_batch(job, step, using, batch_size):
+                if progress:
+                    progress(job, _label(step), job.progress[_label(step)])
+        with transaction.atomic(using=using):
+            model._base_manager.using(using).filter(pk=job.object_id).delete()
+            job.status, job.finished_at = 'done', timezone.now()
+            job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    except Exception as e:
+        logger.exception('Deletion job %s failed', job.id)
+        DeletionJob.objects.filter(id=job.id).update(status='failed', error=str(e), updated_at=timezone.now())
+        job.status, job.error = 'failed', str(e)
+    return job
+
+
+def _run_in_background(job_id):
+    def work():
+        try:
+            run_job(job_id)
+        finally:
+            connections.close_all()
+    threading.Thread(target=work, name=f'deletion-job-{job_id}', daemon=True).start()
+
+
+def schedule_deletion(obj, requested_by=None):
+    """
+    Soft-delete a Course or User and queue the removal of its rows. Returns
+    the DeletionJob (an unfinished job for the same object is reused).
+    """
+    model = type(obj)
+    label = model._meta.label_lower
+    with transaction.atomic(using=router.db_for_write(model)):
+        job = DeletionJob.objects.filter(
+            model_label=label, object_id=obj.pk, status__in=['pending', 'running', 'failed'],
+        ).first()
+        if job is None:
+            if isinstance(obj, Course):
+                obj.deleted_at = timezone.now()
+                obj.published = False
+                # Frees the slug for a new course
+                obj.slug = f'deleted-{obj.pk}'
+                obj.save(update_fields=['deleted_at', 'published', 'slug'])
+            elif isinstance(obj, get_user_model()):
+                obj.is_active = False
+                obj.save(update_fields=['is_active'])
+            else:
+                raise TypeError(f'Background deletion is not supported for {label}')
+            job = DeletionJob.objects.create(
+                model_label=label, object_id=obj.pk, object_repr=str(obj)[:200],
+                steps_total=len(plan(model)), requested_by=requested_by,
+            )
+        if settings.DELETION_BACKGROUND_THREAD:
+            transaction.on_commit(lambda: _run_in_background(job.id))
+    return job
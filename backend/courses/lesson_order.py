@@ -0,0 +1,72 @@
+"""
+Gap-based lesson ordering.
+
+Lessons are numbered ``ORDER_GAP`` apart, so moving one lesson only needs a
+value between its new neighbours and touches a single row. When two
+neighbours have run out of room the course is renumbered with fresh gaps in
+one ``bulk_update`` (a single CASE UPDATE). Both operations lock the course
+row first, so concurrent reorders of the same course queue up instead of
+interleaving into duplicate values.
+"""
+from django.db import transaction
+
+from .models import Course, Lesson
+
+ORDER_GAP = 1024
+
+
+class LessonOrderError(ValueError):
+    pass
+
+
+def _lock_course(course_id):
+    Course.objects.select_for_update().filter(id=course_id).values_list('id', flat=True).get()
+
+
+def _renumber(course_id, lesson_ids):
+    """Give ``lesson_ids`` (the course's full order) fresh gaps. Returns {id: order}."""
+    orders = {lesson_id: (position + 1) * ORDER_GAP for position, lesson_id in enumerate(lesson_ids)}
+    current = dict(Lesson.objects.filter(course_id=course_id).values_list('id', 'order'))
+    changed = [Lesson(id=lesson_id, order=order) for lesson_id, order in orders.items() if current[lesson_id] != order]
+    if changed:
+        Lesson.objects.bulk_update(changed, ['order'])
+    return orders
+
+
+def reorder_lessons(course_id, lesson_ids):
+    """Apply a complete new order for a course's lessons. Returns {id: order}."""
+    with transaction.atomic():
+        _lock_course(course_id)
+        existing = set(Lesson.objects.filter(course_id=course_id).values_list('id', flat=True))
+        if len(lesson_ids) != len(set(lesson_ids)) or set(lesson_ids) != existing:
+            raise LessonOrderError('lessons must list every lesson of the course exactly once')
+        return _renumber(course_id, lesson_ids)
+
+
+def move_lesson(course_id, lesson_id, after_id=None):
+    """Place one lesson right after ``after_id`` (first when None). Returns its new order."""
+    with transaction.atomic():
+        _lock_course(course_id)
+        siblings = list(
+            Lesson.objects.filter(course_id=course_id).order_by('order', 'id').values_list('id', 'order')
+        )
+        if lesson_id not in {sibling for sibling, _ in siblings}:
+            raise LessonOrderError('Lesson not found in this course')
+        siblings = [(sibling, order) for sibling, order in siblings if sibling != lesson_id]
+        ids = [sibling for sibling, _ in siblings]
+        if after_id is None:
+            position = 0
+        elif after_id in ids:
+            position = ids.index(after_id) + 1
+        else:
+            raise LessonOrderError('after must be another lesson of this course')
+
+        low = siblings[position - 1][1] if position else 0
+        high = siblings[position][1] if position < len(siblings) else low + 2 * ORDER_GAP
+        if high - low < 2:
+            # No room between the neighbours
+            renumbered = _renumber(course_id, ids[:position] + [lesson_id] + ids[position:])
+            return renumbered[lesson_id]
+        order = (low + high) // 2
+        Lesson.objects.filter(id=lesson_id).update(order=order)
+        return order
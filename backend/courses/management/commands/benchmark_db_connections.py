@@ -0,0 +1,78 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from thinktank.db.pool import pool_stats
+
+SERVER_CONNECTIONS = {
+    'postgresql': 'SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()',
+    'mysql': "SELECT variable_value FROM performance_schema.global_status WHERE variable_name = 'Threads_connected'",
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure query throughput and server connection count at increasing request concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,4,16,32',
+                            help='Comma-separated concurrency levels to run')
+        parser.add_argument('--seconds', type=float, default=10.0, help='Duration of each level')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--query', default='SELECT 1')
+
+    def _server_connections(self, alias):
+        sql = SERVER_CONNECTIONS.get(connections[alias].vendor)
+        if sql is None:
+            return None
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql)
+            return int(cursor.fetchone()[0])
+
+    def _worker(self, alias, query, stop, results):
+        done = errors = 0
+        connection = connections[alias]
+        while not stop.is_set():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+                    cursor.fetchall()
+                done += 1
+            except Exception:
+                errors += 1
+            # What the request_finished handler does at the end of a request
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
+        results.append((done, errors))
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        levels = [int(level) for level in options['threads'].split(',')]
+        self.stdout.write(f'{"threads":>8} {"queries/s":>10} {"errors":>7} {"server conns":>13}')
+        for threads in levels:
+            stop = threading.Event()
+            results = []
+            workers = [
+                threading.Thread(target=self._worker, args=(alias, options['query'], stop, results))
+                for _ in range(threads)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            time.sleep(options['seconds'] / 2)
+            peak = self._server_connections(alias)
+            time.sleep(options['seconds'] / 2)
+            stop.set()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+            done = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            self.stdout.write(
+                f'{threads:>8} {done / elapsed:>10.0f} {errors:>7} {"n/a" if peak is None else peak:>13}'
+            )
+        connections[alias].close()
+        stats = pool_stats().get(alias)
+        if stats:
+            self.stdout.write(f'Pool counters: {stats}')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,158 @@
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from courses.models import Course, Enrollment, Lesson, Progress
+
+User = get_user_model()
+
+# Django's stock SQLite settings. journal_mode persists in the file, so it
+# is reset explicitly rather than left at whatever the last run chose.
+BASELINE_OPTIONS = {'init_command': 'PRAGMA journal_mode=DELETE'}
+
+
+class Command(BaseCommand):
+    help = 'Measure enroll/progress write throughput and lock errors on SQLite with concurrent writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,4,16',
+                            help='Comma-separated concurrency levels to run')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each level')
+        parser.add_argument('--mode', choices=['baseline', 'performance', 'both'], default='both')
+        parser.add_argument('--learners', type=int, default=200)
+        parser.add_argument('--lessons', type=int, default=20)
+        parser.add_argument('--database', default='default')
+
+    def _setup(self, learners, lessons):
+        tag = uuid.uuid4().hex[:8]
+        instructor = User.objects.create(username=f'bench-sqlite-{tag}', email=f'bench-{tag}@example.com')
+        course = Course.objects.create(
+            title=f'SQLite benchmark {tag}', description='', instructor=instructor,
+            instructor_name=instructor.username, price=0, duration='', published=False,
+        )
+        Lesson.objects.bulk_create(
+            Lesson(course=course, title=f'Lesson {i}', content='', order=i) for i in range(lessons)
+        )
+        User.objects.bulk_create(
+            User(username=f'bench-sqlite-{tag}-{i}', email=f'bench-{tag}-{i}@example.com', password='!')
+            for i in range(learners)
+        )
+        learner_ids = list(User.objects.filter(username__startswith=f'bench-sqlite-{tag}-').values_list('id', flat=True))
+        return instructor, course, list(course.lessons.all()), learner_ids
+
+    def _enroll(self, course, user_id):
+        # Alternates enroll/unenroll so every call writes, as enroll_course does
+        with transaction.atomic():
+            enrollment, created = Enrollment.objects.get_or_create(user_id=user_id, course=course)
+            if created:
+                Course.objects.filter(pk=course.pk).update(students_count=F('students_count') + 1)
+            else:
+                enrollment.delete()
+                Course.objects.filter(pk=course.pk).update(students_count=F('students_count') - 1)
+
+    def _progress(self, course, user_id, lesson, ordinals):
+        # The reads and writes of update_progress, in one transaction
+        with transaction.atomic():
+            enrollment, _ = Enrollment.objects.select_for_update().get_or_create(user_id=user_id, course=course)
+            progress, created = Progress.objects.get_or_create(
+                enrollment=enrollment, lesson=lesson, defaults={'completed': True},
+            )
+            if not created:
+                progress.completed = not progress.completed
+                progress.completed_at = timezone.now()
+                progress.save()
+            enrollment.mark_lesson(lesson, progress.completed)
+            enrollment.save()
+        return enrollment.progress_percent(ordinals)
+
+    def _worker(self, alias, course, lessons, learner_ids, stop, results):
+        done = locked = failed = 0
+        latencies = []
+        rng = random.Random()
+        ordinals = [lesson.ordinal for lesson in lessons]
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                if rng.random() < 0.3:
+                    self._enroll(course, rng.choice(learner_ids))
+                else:
+                    self._progress(course, rng.choice(learner_ids), rng.choice(lessons), ordinals)
+                done += 1
+                latencies.append(time.perf_counter() - started)
+            except OperationalError as exc:
+                if 'locked' in str(exc):
+                    locked += 1
+                else:
+                    failed += 1
+        connections[alias].close()
+        results.append((done, locked, failed, latencies))
+
+    def _run_level(self, alias, threads, seconds, fixtures):
+        _, course, lessons, learner_ids = fixtures
+        stop = threading.Event()
+        results = []
+        workers = [
+            threading.Thread(target=self._worker, args=(alias, course, lessons, learner_ids, stop, results))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        time.sleep(seconds)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        done = sum(r[0] for r in results)
+        locked = sum(r[1] for r in results)
+        failed = sum(r[2] for r in results)
+        latencies = sorted(latency for r in results for latency in r[3])
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        median = statistics.median(latencies) * 1000 if latencies else 0
+        attempts = done + locked + failed
+        self.stdout.write(
+            f'{threads:>8} {done / elapsed:>8.0f} {locked:>7} {locked / attempts * 100 if attempts else 0:>8.2f}%'
+            f' {failed:>7} {median:>8.1f} {p95:>8.1f}'
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if connections[alias].vendor != 'sqlite':
+            raise CommandError(f'Database "{alias}" is not SQLite')
+        modes = ['baseline', 'performance'] if options['mode'] == 'both' else [options['mode']]
+        levels = [int(level) for level in options['threads'].split(',')]
+        database = connections.settings[alias]
+        original = database.get('OPTIONS', {})
+
+        fixtures = self._setup(options['learners'], options['lessons'])
+        try:
+            for mode in modes:
+                connections[alias].close()
+                database['OPTIONS'] = (
+                    BASELINE_OPTIONS if mode == 'baseline'
+                    else {**original, **settings.SQLITE_OPTIONS}
+                )
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{mode}: {database["OPTIONS"]}'))
+                self.stdout.write(
+                    f'{"threads":>8} {"ops/s":>8} {"locked":>7} {"lock rate":>9} {"errors":>7}'
+                    f' {"p50 ms":>8} {"p95 ms":>8}'
+                )
+                for threads in levels:
+                    self._run_level(alias, threads, options['seconds'], fixtures)
+        finally:
+            connections[alias].close()
+            database['OPTIONS'] = original
+            instructor, course, _, learner_ids = fixtures
+            course.delete()
+            User.objects.filter(id__in=learner_ids).delete()
+            instructor.delete()
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,78 @@
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from courses.models import Assignment, Course, UploadSession
+from courses.uploads import READ_BLOCK_SIZE, complete_session, store_chunk
+from users.models import User
+
+MB = 1024 * 1024
+
+
+class _Body:
+    """A request body of ``size`` bytes that is generated as it is read."""
+
+    def __init__(self, size, pattern):
+        self.remaining = size
+        self.pattern = pattern
+
+    def read(self, size=-1):
+        size = min(self.remaining, len(self.pattern) if size is None or size < 0 else size)
+        self.remaining -= size
+        return self.pattern[:size]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Measure chunked upload throughput and peak memory against local filesystem storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=500, help='Size of the uploaded file')
+        parser.add_argument('--chunk-mb', type=int, default=8, help='Chunk size')
+
+    def handle(self, *args, **options):
+        size, chunk_size = options['size_mb'] * MB, options['chunk_mb'] * MB
+        if size < 1 or chunk_size < 1:
+            raise CommandError('--size-mb and --chunk-mb must be positive')
+        pattern = os.urandom(READ_BLOCK_SIZE)
+        media_root = tempfile.mkdtemp(prefix='upload-benchmark-')
+        baseline = _peak_rss_mb()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, UPLOAD_MAX_FILE_SIZE=size), transaction.atomic():
+                user = User.objects.create_user(username='upload-benchmark', email='upload-benchmark@example.invalid')
+                course = Course.objects.create(
+                    title='Upload benchmark', slug='upload-benchmark', description='-', instructor=user,
+                    instructor_name='-', price=0, duration='-',
+                )
+                assignment = Assignment.objects.create(course=course, title='Upload benchmark', description='-')
+                session = UploadSession.objects.create(
+                    user=user, assignment=assignment, filename='benchmark.bin', total_size=size,
+                    chunk_size=chunk_size,
+                )
+
+                started = time.perf_counter()
+                for index in range(session.total_chunks):
+                    length = min(chunk_size, size - index * chunk_size)
+                    store_chunk(session, index, _Body(length, pattern))
+                uploaded = time.perf_counter()
+                complete_session(session)
+                finished = time.perf_counter()
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f'{options["size_mb"]} MB in {session.total_chunks} chunks of {options["chunk_mb"]} MB')
+        self.stdout.write(f'  chunks stored  {uploaded - started:6.2f}s  {options["size_mb"] / (uploaded - started):7.1f} MB/s')
+        self.stdout.write(f'  assembled      {finished - uploaded:6.2f}s  {options["size_mb"] / (finished - uploaded):7.1f} MB/s')
+        self.stdout.write(f'  peak RSS       {_peak_rss_mb():6.1f} MB (before the upload: {baseline:.1f} MB)')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
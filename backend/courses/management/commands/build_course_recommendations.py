@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.recommendations import DEFAULT_CHUNK_SIZE, CoEnrollmentState, cooccurrence, store_neighbours
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "learners also took" course neighbours from co-enrollments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild from every enrollment instead of applying new ones to the saved matrix')
+        parser.add_argument('--top-k', type=int, help='Neighbours kept per course (default RECOMMENDATION_TOP_K)')
+        parser.add_argument('--min-support', type=int,
+                            help='Ignore pairs with fewer co-enrollments (default RECOMMENDATION_MIN_SUPPORT)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Enrollments read per query')
+        parser.add_argument('--state', help='Matrix file (default RECOMMENDATION_STATE_PATH)')
+        parser.add_argument('--benchmark', type=int, metavar='ENROLLMENTS',
+                            help='Time the matrix build and top-k on this many synthetic enrollments; touches no data')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['top_k'] or 20, options['min_support'] or 2)
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        started = time.perf_counter()
+        state = None if options['full'] else CoEnrollmentState.load(options['state'])
+        if state is None:
+            state = CoEnrollmentState.build(options['chunk_size'])
+            self.stdout.write(f'Built co-enrollment matrix for {len(state.course_ids)} courses')
+        else:
+            added = state.update(options['chunk_size'])
+            self.stdout.write(f'Applied {added} new enrollments to the saved matrix')
+        state.save(options['state'])
+        rows = store_neighbours(state, options['top_k'], options['min_support'])
+        self.stdout.write(f'Stored {rows} course neighbours in {time.perf_counter() - started:.2f}s')
+        self.stdout.write(self.style.SUCCESS('Course recommendations updated'))
+
+    def benchmark(self, enrollments, k, min_support):
+        # Popularity-skewed courses, ~4 enrollments per learner
+        rng = np.random.default_rng(0)
+        courses = ((rng.zipf(1.3, enrollments) - 1) % 2000 + 1).astype(np.int64)
+        users = rng.integers(0, max(enrollments // 4, 1), enrollments, dtype=np.int64)
+        pairs = np.unique(np.stack([users, courses], axis=1), axis=0)
+
+        started = time.perf_counter()
+        course_ids = np.unique(pairs[:, 1])
+        state = CoEnrollmentState(course_ids, cooccurrence(pairs[:, 0], pairs[:, 1], course_ids), 0)
+        built = time.perf_counter()
+        neighbours = state.neighbours(k, min_support)
+        done = time.perf_counter()
+        self.stdout.write(
+            f'{len(pairs)} enrollments, {len(course_ids)} courses: matrix {built - started:.2f}s, '
+            f'top-{k} {done - built:.2f}s, {len(neighbours[0])} neighbours'
+        )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from thinktank.schema import code_version, write_artifacts
+
+class Command(BaseCommand):
+    help = 'Render the OpenAPI schema to static, precompressed artifacts served by /api/schema/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help='Directory to write to (defaults to SCHEMA_ARTIFACT_DIR)')
+
+    def handle(self, *args, **options):
+        directory, artifacts = write_artifacts(options['output'])
+        sizes = ', '.join(
+            f'{kind} {len(artifact.body) // 1024} KB ({len(artifact.gzipped) // 1024} KB gzipped)'
+            for kind, artifact in artifacts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote schema for code version {code_version()} to {directory}: {sizes}'
+        ))
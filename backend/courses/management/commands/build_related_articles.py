@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.related_articles import rebuild_related
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TF-IDF related-article index for all published articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, help='Neighbours kept per article (default RELATED_ARTICLES_TOP_N)')
+
+    def handle(self, *args, **options):
+        if options['top_n'] is not None and options['top_n'] < 1:
+            raise CommandError('--top-n must be positive')
+        started = time.perf_counter()
+        rows = rebuild_related(options['top_n'])
+        self.stdout.write(f'Stored {rows} related-article links in {time.perf_counter() - started:.2f}s')
+        self.stdout.write(self.style.SUCCESS('Related articles rebuilt'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from courses.analytics import DEFAULT_CHUNK_SIZE, compute_quiz_analytics
+from courses.models import Quiz
+
+class Command(BaseCommand):
+    help = 'Compute item difficulty, discrimination and distractor rates for quizzes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', dest='quiz_ids',
+                            help='Quiz id to analyse (repeatable). Defaults to every quiz with attempts.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Number of attempts loaded per batch')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(id__in=options['quiz_ids'])
+        else:
+            quizzes = quizzes.filter(quizresult__isnull=False).distinct()
+
+        for quiz in quizzes.order_by('id'):
+            started = time.perf_counter()
+            analytics = compute_quiz_analytics(quiz, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Quiz {quiz.id} "{quiz.title}": {analytics.attempts} attempts in {elapsed:.2f}s'
+            )
+        self.stdout.write(self.style.SUCCESS('Quiz analytics updated'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.models import Course
+from courses.packages import export_package
+
+
+class Command(BaseCommand):
+    help = 'Write a course and its content to a package zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slug', help='Slug of the course to export')
+        parser.add_argument('--output', '-o', help='Destination file (default <slug>.zip)')
+
+    def handle(self, *args, **options):
+        course = Course.objects.filter(slug=options['slug']).first()
+        if course is None:
+            raise CommandError(f'No course with slug {options["slug"]!r}')
+        path = options['output'] or f'{course.slug}.zip'
+        written = 0
+        with open(path, 'wb') as handle:
+            for chunk in export_package(course):
+                handle.write(chunk)
+                written += len(chunk)
+                if chunk:
+                    self.stdout.write(f'\r{written // 1024} KiB written', ending='')
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'Exported {course.slug} to {path}'))
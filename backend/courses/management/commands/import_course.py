@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.packages import PackageError, import_package
+
+
+class Command(BaseCommand):
+    help = 'Create or update (matched on slug) the course in a package zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Package zip to import')
+        parser.add_argument('--instructor', help='Email of the instructor for a course that does not exist yet')
+
+    def handle(self, *args, **options):
+        instructor = None
+        if options['instructor']:
+            instructor = get_user_model().objects.filter(email=options['instructor']).first()
+            if instructor is None:
+                raise CommandError(f'No user with email {options["instructor"]!r}')
+
+        def progress(stage, done):
+            self.stdout.write(f'{stage}: {done}')
+
+        try:
+            with open(options['path'], 'rb') as handle:
+                course, created, counts = import_package(handle, instructor, progress=progress)
+        except (OSError, PackageError) as e:
+            raise CommandError(str(e))
+        summary = ', '.join(f'{count} {stage}' for stage, count in counts.items())
+        verb = 'Created' if created else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {course.slug}: {summary}'))
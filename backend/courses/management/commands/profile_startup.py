@@ -0,0 +1,174 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+MARKER = '@@startup-profile@@'
+
+# Runs in a fresh interpreter so nothing is already imported. With
+# ``memory`` set, allocations are traced and attributed to the module whose
+# file made them; tracing slows imports, so timings come from a separate run.
+PROBE = r'''
+import json, resource, sys, time
+memory = sys.argv[1] == 'memory'
+if memory:
+    import tracemalloc
+    tracemalloc.start()
+started = time.perf_counter()
+import django
+django.setup()
+setup_seconds = time.perf_counter() - started
+from django.conf import settings
+from django.utils.module_loading import import_string
+middleware = []
+for path in settings.MIDDLEWARE:
+    t = time.perf_counter()
+    import_string(path)
+    middleware.append([path, time.perf_counter() - t])
+t = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_seconds = time.perf_counter() - t
+result = {
+    'apps': list(settings.INSTALLED_APPS),
+    'setup_seconds': setup_seconds,
+    'urls_seconds': urls_seconds,
+    'middleware': middleware,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}
+if memory:
+    files = {getattr(m, '__file__', None): name for name, m in list(sys.modules.items())}
+    sizes = {}
+    for stat in tracemalloc.take_snapshot().statistics('filename'):
+        name = files.get(stat.traceback[0].filename)
+        if name:
+            sizes[name] = sizes.get(name, 0) + stat.size
+    result['module_bytes'] = sizes
+print(%r + json.dumps(result))
+''' % MARKER
+
+IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)')
+
+
+def _owner(module, owners):
+    best = None
+    for owner in owners:
+        if (module == owner or module.startswith(owner + '.')) and (best is None or len(owner) > len(best)):
+            best = owner
+    return best or f'{module.split(".")[0]} (not an app)'
+
+
+def _app_module(entry):
+    # "pkg.apps.PkgConfig" -> "pkg"
+    parts = entry.split('.')
+    if len(parts) > 2 and parts[-2] == 'apps' and parts[-1][:1].isupper():
+        return '.'.join(parts[:-2])
+    return entry
+
+
+class Command(BaseCommand):
+    help = 'Report cold-start import time and memory per installed app and middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', default=None,
+                            help='Settings module to measure (defaults to the active one)')
+        parser.add_argument('--compare', default=None,
+                            help='Second settings module to measure for a before/after summary')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Cold starts per profile; medians are reported')
+        parser.add_argument('--limit', type=int, default=25)
+
+    def _run(self, module, mode, importtime=False):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=module)
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        started = time.perf_counter()
+        proc = subprocess.run(
+            command + ['-c', PROBE, mode], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - started
+        if proc.returncode:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        line = next(line for line in proc.stdout.splitlines() if line.startswith(MARKER))
+        result = json.loads(line[len(MARKER):])
+        result['wall_seconds'] = wall
+        result['importtime'] = proc.stderr if importtime else ''
+        return result
+
+    def measure(self, module, repeat):
+        runs = [self._run(module, 'time') for _ in range(repeat)]
+        detail = self._run(module, 'time', importtime=True)
+        memory = self._run(module, 'memory')
+
+        owners = [_app_module(app) for app in detail['apps']]
+        owners += [path.rsplit('.', 1)[0] for path, _ in detail['middleware']]
+        import_us = defaultdict(int)
+        for line in detail['importtime'].splitlines():
+            match = IMPORTTIME.match(line)
+            if match:
+                import_us[_owner(match.group(2), owners)] += int(match.group(1))
+        memory_bytes = defaultdict(int)
+        for name, size in memory['module_bytes'].items():
+            memory_bytes[_owner(name, owners)] += size
+
+        return {
+            'module': module,
+            'wall_ms': statistics.median(r['wall_seconds'] for r in runs) * 1000,
+            'setup_ms': statistics.median(r['setup_seconds'] for r in runs) * 1000,
+            'urls_ms': statistics.median(r['urls_seconds'] for r in runs) * 1000,
+            'maxrss_mb': statistics.median(r['maxrss_kb'] for r in runs) / 1024,
+            'traced_mb': sum(memory_bytes.values()) / 2 ** 20,
+            'apps': [_app_module(app) for app in detail['apps']],
+            'import_ms': {owner: us / 1000 for owner, us in import_us.items()},
+            'memory_kb': {owner: size / 1024 for owner, size in memory_bytes.items()},
+            'middleware_ms': [(path, seconds * 1000) for path, seconds in detail['middleware']],
+        }
+
+    def report(self, result, limit):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Startup profile: {result["module"]}'))
+        self.stdout.write(
+            f'  cold start {result["wall_ms"]:.0f} ms (django.setup {result["setup_ms"]:.0f} ms, '
+            f'URLconf {result["urls_ms"]:.0f} ms), max RSS {result["maxrss_mb"]:.1f} MB'
+        )
+        self.stdout.write(f'  {"import ms":>10} {"alloc KB":>10}  package')
+        owners = sorted(result['import_ms'], key=result['import_ms'].get, reverse=True)
+        for owner in owners[:limit]:
+            marker = '' if owner in result['apps'] else '  '
+            self.stdout.write(
+                f'  {result["import_ms"][owner]:10.1f} {result["memory_kb"].get(owner, 0):10.0f}  {marker}{owner}'
+            )
+        self.stdout.write(f'  {"ms":>10}  middleware (incremental import)')
+        for path, ms in result['middleware_ms']:
+            self.stdout.write(f'  {ms:10.2f}  {path}')
+
+    def handle(self, *args, **options):
+        profiles = [options['profile'] or settings.SETTINGS_MODULE]
+        if options['compare']:
+            profiles.append(options['compare'])
+        results = [self.measure(module, options['repeat']) for module in profiles]
+        for result in results:
+            self.report(result, options['limit'])
+            self.stdout.write('')
+
+        if len(results) == 2:
+            before, after = results
+            self.stdout.write(self.style.MIGRATE_HEADING('Comparison (medians)'))
+            for label, key, unit in (
+                ('cold start', 'wall_ms', 'ms'), ('django.setup', 'setup_ms', 'ms'),
+                ('URLconf', 'urls_ms', 'ms'), ('max RSS', 'maxrss_mb', 'MB'),
+                ('traced allocations', 'traced_mb', 'MB'),
+            ):
+                self.stdout.write(
+                    f'  {label:<20} {before[key]:8.1f} -> {after[key]:8.1f} {unit}'
+                    f'  ({(after[key] - before[key]) / before[key] * 100:+.0f}%)'
+                )
+        self.stdout.write(self.style.SUCCESS('Startup profile complete'))
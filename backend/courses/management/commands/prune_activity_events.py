@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from courses.activity import (
+    add_months, drop_partition, ensure_partition, month_of, partition_table, retention_cutoff, stored_months,
+)
+
+
+class Command(BaseCommand):
+    help = 'Drop activity event months past retention and create upcoming months ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.ACTIVITY_RETENTION_MONTHS,
+                            help='Months to keep, including the current one')
+        parser.add_argument('--ahead', type=int, default=1,
+                            help='Future months to create so the first write of a month does no DDL')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        oldest = month_of(retention_cutoff(months=options['months']))
+        current = month_of(timezone.now())
+
+        expired = [month for month in stored_months() if month < oldest]
+        for month in expired:
+            self.stdout.write(f'Dropping {partition_table(month)}')
+            if not options['dry_run']:
+                drop_partition(month)
+
+        for offset in range(options['ahead'] + 1):
+            month = add_months(current, offset)
+            if not options['dry_run']:
+                ensure_partition(month)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dropped {len(expired)} month(s) older than {oldest[0]}-{oldest[1]:02d}'
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from courses.models import UploadSession
+from courses.uploads import discard_chunks
+
+class Command(BaseCommand):
+    help = 'Delete stored chunks of upload sessions that were abandoned before completion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-hours', type=int, default=48,
+                            help='Only purge sessions idle for at least this long')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        stale = UploadSession.objects.filter(status='pending', updated_at__lt=cutoff)
+        purged = 0
+        for session in stale.iterator():
+            discard_chunks(session)
+            session.status = 'aborted'
+            session.save(update_fields=['status', 'updated_at'])
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} stale upload sessions'))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from courses.models import RATING_STARS, Course, CourseReview
+
+HISTOGRAM_FIELDS = [f'ratings_{stars}' for stars in RATING_STARS]
+AGGREGATE_FIELDS = ['rating', 'rating_count', 'rating_sum', *HISTOGRAM_FIELDS]
+
+
+class Command(BaseCommand):
+    help = 'Recompute course ratings and rating histograms from CourseReview, fixing any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Courses locked and recomputed per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted courses without writing')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        last_id, checked, fixed = 0, 0, 0
+        while True:
+            with transaction.atomic():
+                # Locking the courses first means a review committed while we
+                # aggregate applies its delta after our write, not before it
+                courses = list(
+                    Course.objects.select_for_update().filter(id__gt=last_id).order_by('id')
+                    .only('id', *AGGREGATE_FIELDS)[:options['chunk_size']]
+                )
+                if not courses:
+                    break
+                last_id = courses[-1].id
+                histograms = {course.id: dict.fromkeys(RATING_STARS, 0) for course in courses}
+                for row in (
+                    CourseReview.objects.filter(course_id__in=histograms)
+                    .values('course_id', 'rating').annotate(reviews=Count('id')).order_by()
+                ):
+                    histograms[row['course_id']][row['rating']] = row['reviews']
+
+                drifted = []
+                for course in courses:
+                    histogram = histograms[course.id]
+                    truth = {f'ratings_{stars}': histogram[stars] for stars in RATING_STARS}
+                    truth['rating_count'] = sum(histogram.values())
+                    truth['rating_sum'] = sum(stars * count for stars, count in histogram.items())
+                    truth['rating'] = truth['rating_sum'] / truth['rating_count'] if truth['rating_count'] else 0.0
+                    if any(
+                        abs(getattr(course, field) - value) > 1e-9 for field, value in truth.items()
+                    ):
+                        for field, value in truth.items():
+                            setattr(course, field, value)
+                        drifted.append(course)
+                checked += len(courses)
+                fixed += len(drifted)
+                if drifted and not options['dry_run']:
+                    Course.objects.bulk_update(drifted, AGGREGATE_FIELDS)
+
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(f'Checked {checked} courses, {fixed} {verb}')
+        self.stdout.write(self.style.SUCCESS('Course ratings reconciled'))
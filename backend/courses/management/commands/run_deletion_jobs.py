@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from courses.deletion import run_job
+from courses.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Run pending course and user deletions, resuming failed or abandoned ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help='Only run this job')
+
+    def handle(self, *args, **options):
+        if options['job'] is not None:
+            if not DeletionJob.objects.filter(id=options['job']).exists():
+                raise CommandError(f'Deletion job {options["job"]} does not exist')
+            job_ids = [options['job']]
+        else:
+            stale = timezone.now() - timedelta(seconds=settings.DELETION_STALE_SECONDS)
+            job_ids = list(
+                DeletionJob.objects.filter(
+                    Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=stale)
+                ).order_by('id').values_list('id', flat=True)
+            )
+
+        def progress(job, label, done):
+            self.stdout.write(f'  job {job.id} step {job.step + 1}/{job.steps_total}: {label} {done} rows')
+
+        failed = 0
+        for job_id in job_ids:
+            job = run_job(job_id, progress=progress)
+            if job is None:
+                self.stdout.write(f'Job {job_id} is finished or held by another worker, skipped')
+            elif job.status == 'failed':
+                failed += 1
+                self.stderr.write(f'Job {job_id} ({job.model_label} {job.object_repr}) failed: {job.error}')
+            else:
+                self.stdout.write(f'Job {job_id} ({job.model_label} {job.object_repr}): '
+                                  f'{sum(job.progress.values())} related rows deleted')
+        if failed:
+            raise CommandError(f'{failed} deletion job(s) failed; re-run to resume them')
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(job_ids)} deletion job(s)'))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint the WAL and run PRAGMA optimize on every SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Repeat every N seconds instead of running once')
+        parser.add_argument('--checkpoint', default='TRUNCATE',
+                            choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+                            help='wal_checkpoint mode; TRUNCATE also shrinks the -wal file')
+
+    def maintain(self, alias, checkpoint):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute('PRAGMA optimize')
+            if journal_mode.lower() != 'wal':
+                return f'{alias}: optimized ({journal_mode} journal, no checkpoint)'
+            # busy is 1 when readers or a writer prevented a complete checkpoint
+            cursor.execute(f'PRAGMA wal_checkpoint({checkpoint})')
+            busy, wal_pages, checkpointed = cursor.fetchone()
+        return f'{alias}: optimized, checkpointed {checkpointed}/{wal_pages} WAL pages' + (' (busy)' if busy else '')
+
+    def handle(self, *args, **options):
+        aliases = [alias for alias in connections if connections[alias].vendor == 'sqlite']
+        if not aliases:
+            self.stdout.write('No SQLite databases configured')
+            return
+        while True:
+            for alias in aliases:
+                self.stdout.write(self.maintain(alias, options['checkpoint']))
+                connections[alias].close()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('SQLite maintenance complete'))
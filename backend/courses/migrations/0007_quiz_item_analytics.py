@@ -0,0 +1,52 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_alter_course_options_alter_course_category_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('difficulty', models.FloatField(blank=True, help_text='Proportion of attempts answering correctly', null=True)),
+                ('discrimination', models.FloatField(blank=True, help_text='Corrected item-total point-biserial correlation', null=True)),
+                ('choice_rates', models.JSONField(blank=True, default=dict, help_text='Selection rate per choice id')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='courses.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('mean_score', models.FloatField(blank=True, help_text='Mean number of correct items per attempt', null=True)),
+                ('reliability', models.FloatField(blank=True, help_text='KR-20 internal consistency', null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='courses.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_text', models.TextField(blank=True)),
+                ('is_correct', models.BooleanField(default=False)),
+                ('choice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='responses', to='courses.choice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='courses.question')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='courses.quizresult')),
+            ],
+            options={
+                'unique_together': {('result', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:36
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_quiz_item_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmission',
+            name='file',
+            field=models.FileField(blank=True, max_length=500, null=True, upload_to='submissions/'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(blank=True, help_text='Optional checksum of the whole file', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('aborted', 'Aborted')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='courses.assignment')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='courses.assignmentsubmission')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('received_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='courses.uploadsession')),
+            ],
+            options={
+                'unique_together': {('session', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_chunked_submission_uploads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(condition=models.Q(('grade__isnull', True)), fields=['assignment', 'submitted_at', 'id'], name='submission_ungraded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['user', 'assignment'], name='submission_user_assign_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_submission_grading_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='next_lesson_ordinal',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='ordinal',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def assign_ordinals(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    for course_id in Course.objects.values_list('id', flat=True).iterator():
+        lessons = list(Lesson.objects.filter(course_id=course_id).order_by('order', 'id').only('id'))
+        for ordinal, lesson in enumerate(lessons):
+            lesson.ordinal = ordinal
+        Lesson.objects.bulk_update(lessons, ['ordinal'], batch_size=BATCH_SIZE)
+        Course.objects.filter(id=course_id).update(next_lesson_ordinal=len(lessons))
+
+
+def build_bitmaps(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Progress = apps.get_model('courses', 'Progress')
+    rows = (
+        Progress.objects.filter(completed=True)
+        .order_by('enrollment_id')
+        .values_list('enrollment_id', 'lesson__ordinal')
+        .iterator(chunk_size=10000)
+    )
+    pending = []
+    current, bits = None, 0
+
+    def flush():
+        Enrollment.objects.bulk_update(pending, ['completed_lessons'])
+        pending.clear()
+
+    for enrollment_id, ordinal in rows:
+        if enrollment_id != current:
+            if current is not None:
+                pending.append(Enrollment(id=current, completed_lessons=bits.to_bytes((bits.bit_length() + 7) // 8, 'little')))
+                if len(pending) >= BATCH_SIZE:
+                    flush()
+            current, bits = enrollment_id, 0
+        bits |= 1 << ordinal
+    if current is not None:
+        pending.append(Enrollment(id=current, completed_lessons=bits.to_bytes((bits.bit_length() + 7) // 8, 'little')))
+    if pending:
+        flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_lesson_ordinal_enrollment_bitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_ordinals, migrations.RunPython.noop),
+        # Progress rows stay as they are, so reversing just drops the derived bitmaps
+        migrations.RunPython(build_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_backfill_completion_bitmaps'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='ordinal',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'ordinal'), name='lesson_course_ordinal_unique'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.2 on 2026-10-19 13:59
+
+from django.db import migrations, models
+
+# Postgres keeps events in one range-partitioned table; partitions for each
+# month are created on demand by courses.activity. Other databases get a
+# separate table per month from the same module, so there is no parent table.
+CREATE_PARENT = [
+    """
+CREATE TABLE courses_activityevent (
+    id bigserial NOT NULL,
+    user_id bigint NOT NULL,
+    course_id bigint NULL,
+    lesson_id bigint NULL,
+    event_type varchar(32) NOT NULL,
+    occurred_at timestamp with time zone NOT NULL,
+    received_at timestamp with time zone NOT NULL,
+    metadata jsonb NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at)
+""",
+    'CREATE INDEX activity_user_occurred_idx ON courses_activityevent (user_id, occurred_at)',
+    'CREATE INDEX activity_course_occurred_idx ON courses_activityevent (course_id, occurred_at)',
+]
+
+
+def create_parent(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_PARENT:
+            schema_editor.execute(statement)
+
+
+def drop_tables(apps, schema_editor):
+    from courses.activity import drop_partition, stored_months
+
+    for month in stored_months(schema_editor.connection.alias):
+        drop_partition(month, schema_editor.connection.alias)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS courses_activityevent')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_lesson_ordinal_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField()),
+                ('course_id', models.BigIntegerField(blank=True, null=True)),
+                ('lesson_id', models.BigIntegerField(blank=True, null=True)),
+                ('event_type', models.CharField(choices=[('lesson_opened', 'Lesson opened'), ('lesson_closed', 'Lesson closed'), ('video_played', 'Video played'), ('video_paused', 'Video paused'), ('video_completed', 'Video completed'), ('quiz_started', 'Quiz started'), ('quiz_submitted', 'Quiz submitted'), ('assignment_opened', 'Assignment opened'), ('article_read', 'Article read')], max_length=32)),
+                ('occurred_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField()),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'db_table': 'courses_activityevent',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_parent, drop_tables),
+    ]
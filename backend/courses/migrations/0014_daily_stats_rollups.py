@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_activity_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('processed_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='issued_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='enrolled_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='taken_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='CourseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('enrollments', models.PositiveIntegerField(default=0)),
+                ('completions', models.PositiveIntegerField(default=0)),
+                ('certificates', models.PositiveIntegerField(default=0)),
+                ('quiz_attempts', models.PositiveIntegerField(default=0)),
+                ('quiz_passes', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'date'],
+                'unique_together': {('course', 'date')},
+            },
+        ),
+    ]
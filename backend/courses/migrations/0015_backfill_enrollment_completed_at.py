@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+
+
+def backfill_completed_at(apps, schema_editor):
+    # Certificates are issued when a course is completed, so the earliest
+    # one is the best record of when that happened
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Certificate = apps.get_model('courses', 'Certificate')
+    Lesson = apps.get_model('courses', 'Lesson')
+    issued = (
+        Certificate.objects.filter(user_id=OuterRef('user_id'), course_id=OuterRef('course_id'))
+        .order_by('issued_date')
+        .values('issued_date')[:1]
+    )
+    Enrollment.objects.filter(completed_at__isnull=True).update(completed_at=Subquery(issued))
+
+    # Completions without a certificate (deleted, or never issued) fall back
+    # to the progress rows: every lesson completed means the course was, at
+    # the latest lesson's completion. First completions left that timestamp
+    # empty, so last_accessed (bumped by each progress update) stands in.
+    lesson_counts = dict(
+        Lesson.objects.values('course_id').annotate(lessons=Count('id')).values_list('course_id', 'lessons')
+    )
+    completed = Q(progress__completed=True)
+    candidates = (
+        Enrollment.objects.filter(completed_at__isnull=True, progress__completed=True)
+        .annotate(done=Count('progress', filter=completed), last_done=Max('progress__completed_at', filter=completed))
+        .values_list('id', 'course_id', 'done', 'last_done', 'last_accessed')
+    )
+    backfilled = [
+        Enrollment(id=enrollment_id, completed_at=last_done or last_accessed)
+        for enrollment_id, course_id, done, last_done, last_accessed in candidates.iterator()
+        if done >= lesson_counts.get(course_id, 0) > 0
+    ]
+    Enrollment.objects.bulk_update(backfilled, ['completed_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_daily_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
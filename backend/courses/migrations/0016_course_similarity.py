@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_backfill_enrollment_completed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text="Cosine similarity of the two courses' learner sets")),
+                ('co_enrollments', models.PositiveIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_courses', to='courses.course')),
+                ('similar_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', '-score'], name='similarity_course_score_idx')],
+                'unique_together': {('course', 'similar_course')},
+            },
+        ),
+    ]
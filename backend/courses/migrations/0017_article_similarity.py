@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_course_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleVector',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='courses.article')),
+                ('terms', models.JSONField(default=dict)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_articles', to='courses.article')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.article')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['article', '-score'], name='article_similarity_score_idx')],
+                'unique_together': {('article', 'related')},
+            },
+        ),
+    ]
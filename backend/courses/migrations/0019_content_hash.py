@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_course_reviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
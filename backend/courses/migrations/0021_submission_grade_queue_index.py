@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0020_deletion_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentsubmission',
+            index=models.Index(fields=['assignment', 'grade', 'submitted_at', 'id'], name='submission_grade_queue_idx'),
+        ),
+    ]
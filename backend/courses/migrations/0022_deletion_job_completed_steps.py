@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0021_submission_grade_queue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='completed_steps',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+INSTRUCTOR_GROUP = 'Instructors'
+
+
+def create_group(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    Group.objects.get_or_create(name=INSTRUCTOR_GROUP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('courses', '0022_deletion_job_completed_steps'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_group, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,34 @@
-from django.db import models
+import uuid
+
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, router, transaction
+from django.db.models.functions import Cast, Greatest
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings  # Add this missing import
 
+from .rendering import content_hash
+
 User = get_user_model()
 
+RATING_STARS = range(1, 6)
+
+def refresh_content_hash(instance, kwargs):
+    """Keep ``content_hash`` in step with ``content`` for a save() about to run with ``kwargs``."""
+    update_fields = kwargs.get('update_fields')
+    if 'content' in instance.get_deferred_fields() or (update_fields is not None and 'content' not in update_fields):
+        return
+    instance.content_hash = content_hash(instance.content)
+    if update_fields is not None:
+        kwargs['update_fields'] = {*update_fields, 'content_hash'}
+
+class CourseManager(models.Manager):
+    """Hides courses that are waiting for their background deletion."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Course(models.Model):
     LEVEL_CHOICES = [
         ('beginner', 'Beginner'),
@@ -36,10 +59,25 @@ class Course(models.Model):
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='other')
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='beginner')
     published = models.BooleanField(default=True)
+    # Maintained from CourseReview by apply_rating_change; don't edit by hand
     rating = models.FloatField(default=0.0, help_text="Rating out of 5")
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    ratings_1 = models.PositiveIntegerField(default=0)
+    ratings_2 = models.PositiveIntegerField(default=0)
+    ratings_3 = models.PositiveIntegerField(default=0)
+    ratings_4 = models.PositiveIntegerField(default=0)
+    ratings_5 = models.PositiveIntegerField(default=0)
     students_count = models.IntegerField(default=0)
+    # Next bit position handed to a new lesson; see Lesson.ordinal
+    next_lesson_ordinal = models.PositiveIntegerField(default=0, editable=False)
     thumbnail_url = models.URLField(blank=True, null=True)
     preview_video_url = models.URLField(blank=True, null=True)
+    # Set when deletion is requested; a DeletionJob removes the row later
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = CourseManager()
+    all_objects = models.Manager()
     
     class Meta:
         ordering = ['-created_at']
@@ -52,28 +90,137 @@ class Course(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    @property
+    def rating_histogram(self):
+        return {stars: getattr(self, f'ratings_{stars}') for stars in RATING_STARS}
+
+def apply_rating_change(course_id, old=None, new=None, using=None):
+    """
+    Move one review's stars from ``old`` to ``new`` (None for a created or
+    deleted review) with a single UPDATE of relative deltas, so concurrent
+    reviews never overwrite each other's counts.
+    """
+    if old == new:
+        return
+    count_delta = (new is not None) - (old is not None)
+    sum_delta = (new or 0) - (old or 0)
+    updates = {
+        'rating_count': models.F('rating_count') + count_delta,
+        'rating_sum': models.F('rating_sum') + sum_delta,
+        'rating': Cast(models.F('rating_sum') + sum_delta, models.FloatField()) / Greatest(models.F('rating_count') + count_delta, 1),
+    }
+    if old is not None:
+        updates[f'ratings_{old}'] = models.F(f'ratings_{old}') - 1
+    if new is not None:
+        updates[f'ratings_{new}'] = models.F(f'ratings_{new}') + 1
+    Course.objects.using(using).filter(id=course_id).update(**updates)
+
+class LessonManager(models.Manager):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        by_course = {}
+        for lesson in objs:
+            if lesson.ordinal is None:
+                by_course.setdefault(lesson.course_id, []).append(lesson)
+        with transaction.atomic(using=self.db):
+            for course_id, lessons in by_course.items():
+                first = reserve_lesson_ordinals(course_id, len(lessons), using=self.db)
+                for offset, lesson in enumerate(lessons):
+                    lesson.ordinal = first + offset
+            return super().bulk_create(objs, *args, **kwargs)
+
+
+def reserve_lesson_ordinals(course_id, count=1, using=None):
+    """Claim ``count`` consecutive ordinals for new lessons; returns the first."""
+    courses = Course.objects.using(using).filter(pk=course_id)
+    with transaction.atomic(using=using):
+        # The UPDATE row-locks the course until the surrounding transaction ends
+        courses.update(next_lesson_ordinal=models.F('next_lesson_ordinal') + count)
+        return courses.values_list('next_lesson_ordinal', flat=True).get() - count
+
+
 class Lesson(models.Model):
     course = models.ForeignKey('Course', related_name='lessons', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
     content = models.TextField()
+    # Cache key of the rendered HTML; see courses.rendering
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     duration = models.CharField(max_length=20, blank=True)  # e.g., "45 minutes"
     order = models.PositiveIntegerField(default=0)
+    # Bit position in Enrollment.completed_lessons. Assigned once from the
+    # course's counter and never reused, so reordering or deleting lessons
+    # leaves every learner's bitmap valid.
+    ordinal = models.PositiveIntegerField(editable=False)
+
+    objects = LessonManager()
 
     class Meta:
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'ordinal'], name='lesson_course_ordinal_unique'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        refresh_content_hash(self, kwargs)
+        if self.ordinal is None:
+            with transaction.atomic(using=kwargs.get('using')):
+                self.ordinal = reserve_lesson_ordinals(self.course_id, using=kwargs.get('using'))
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+
+def lesson_ordinals(course_ids):
+    """{course_id: [ordinal, ...]} for the current lessons of each course, in one query."""
+    ordinals = {course_id: [] for course_id in course_ids}
+    for course_id, ordinal in Lesson.objects.filter(course_id__in=ordinals).values_list('course_id', 'ordinal'):
+        ordinals[course_id].append(ordinal)
+    return ordinals
+
+
 class Enrollment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='enrollments')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
-    enrolled_at = models.DateTimeField(auto_now_add=True)
+    enrolled_at = models.DateTimeField(auto_now_add=True, db_index=True)
     last_accessed = models.DateTimeField(auto_now=True)
+    # First time every lesson was completed; feeds the daily rollups
+    completed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Lesson completion as a little-endian bitset indexed by Lesson.ordinal.
+    # Progress rows are still written as the audit trail, but reads use this.
+    completed_lessons = models.BinaryField(default=b'', editable=False)
 
     class Meta:
         unique_together = ('user', 'course')
 
+    @property
+    def completed_bits(self):
+        return int.from_bytes(self.completed_lessons, 'little')
+
+    def has_completed(self, lesson):
+        return bool(self.completed_bits >> lesson.ordinal & 1)
+
+    def mark_lesson(self, lesson, completed=True):
+        bits = self.completed_bits
+        if completed:
+            bits |= 1 << lesson.ordinal
+        else:
+            bits &= ~(1 << lesson.ordinal)
+        self.completed_lessons = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+    def completed_count(self, ordinals):
+        """Completed lessons among ``ordinals`` (the course's current lessons)."""
+        mask = 0
+        for ordinal in ordinals:
+            mask |= 1 << ordinal
+        return (self.completed_bits & mask).bit_count()
+
+    def progress_percent(self, ordinals):
+        return (self.completed_count(ordinals) / len(ordinals) * 100) if ordinals else 0
+
 class Progress(models.Model):
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='progress')
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
@@ -86,7 +233,7 @@ class Progress(models.Model):
 class Certificate(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='certificates')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='certificates')
-    issued_date = models.DateTimeField(auto_now_add=True)
+    issued_date = models.DateTimeField(auto_now_add=True, db_index=True)
     verification_id = models.CharField(max_length=50, unique=True)
     certificate_url = models.URLField(blank=True)
 
@@ -102,9 +249,64 @@ class AssignmentSubmission(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     submitted_at = models.DateTimeField(auto_now_add=True)
     file_url = models.URLField(blank=True, null=True)
+    file = models.FileField(upload_to='submissions/', max_length=500, blank=True, null=True)
     grade = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     feedback = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Grading queue: ungraded submissions per assignment, oldest first
+            models.Index(
+                fields=['assignment', 'submitted_at', 'id'],
+                condition=models.Q(grade__isnull=True),
+                name='submission_ungraded_idx',
+            ),
+            # The same queue where partial indexes aren't supported (MySQL
+            # skips the one above): grade IS NULL is an equality prefix here
+            models.Index(fields=['assignment', 'grade', 'submitted_at', 'id'], name='submission_grade_queue_idx'),
+            # A student's own submissions, optionally for one assignment
+            models.Index(fields=['user', 'assignment'], name='submission_user_assign_idx'),
+        ]
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload that is assembled into a submission file."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='upload_sessions')
+    submission = models.ForeignKey(AssignmentSubmission, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Optional checksum of the whole file")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    def chunk_name(self, index):
+        return f'uploads/{self.id}/{index:06d}.part'
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('session', 'index')
+
 class Quiz(models.Model):
     course = models.ForeignKey('Course', related_name='quizzes', on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -127,7 +329,107 @@ class QuizResult(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     score = models.DecimalField(max_digits=5, decimal_places=2)
     passed = models.BooleanField(default=False)
-    taken_at = models.DateTimeField(auto_now_add=True)
+    taken_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+class QuizResponse(models.Model):
+    """A learner's answer to a single question within a quiz attempt."""
+    result = models.ForeignKey(QuizResult, related_name='responses', on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name='responses', on_delete=models.CASCADE)
+    choice = models.ForeignKey(Choice, related_name='responses', on_delete=models.SET_NULL, null=True, blank=True)
+    answer_text = models.TextField(blank=True)
+    is_correct = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('result', 'question')
+
+class QuizAnalytics(models.Model):
+    quiz = models.OneToOneField(Quiz, related_name='analytics', on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    mean_score = models.FloatField(null=True, blank=True, help_text="Mean number of correct items per attempt")
+    reliability = models.FloatField(null=True, blank=True, help_text="KR-20 internal consistency")
+    computed_at = models.DateTimeField(auto_now=True)
+
+class QuestionAnalytics(models.Model):
+    question = models.OneToOneField(Question, related_name='analytics', on_delete=models.CASCADE)
+    attempts = models.PositiveIntegerField(default=0)
+    responses = models.PositiveIntegerField(default=0)
+    difficulty = models.FloatField(null=True, blank=True, help_text="Proportion of attempts answering correctly")
+    discrimination = models.FloatField(null=True, blank=True, help_text="Corrected item-total point-biserial correlation")
+    choice_rates = models.JSONField(default=dict, blank=True, help_text="Selection rate per choice id")
+    computed_at = models.DateTimeField(auto_now=True)
+
+class CourseDailyStats(models.Model):
+    """Per-course daily counts maintained by ``manage.py rollup_course_stats``."""
+    course = models.ForeignKey(Course, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+    completions = models.PositiveIntegerField(default=0)
+    certificates = models.PositiveIntegerField(default=0)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_passes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('course', 'date')
+        ordering = ['course', 'date']
+
+class RollupWatermark(models.Model):
+    """How far a rollup job has processed its source tables."""
+    name = models.CharField(max_length=50, unique=True)
+    processed_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+class DeletionJob(models.Model):
+    """
+    Background removal of a course or user and everything that depends on it
+    (courses.deletion). ``completed_steps`` and ``progress`` are committed
+    with every batch, so an interrupted job resumes where it stopped, even if
+    a deploy in between changed the deletion plan.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    model_label = models.CharField(max_length=100, help_text="e.g. courses.course")
+    object_id = models.BigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Steps finished so far, of steps_total
+    step = models.PositiveIntegerField(default=0)
+    steps_total = models.PositiveIntegerField(default=0)
+    # Labels ("model via lookup") of the finished steps; resuming goes by
+    # these rather than by position in the plan
+    completed_steps = models.JSONField(default=list)
+    # Rows removed so far, per "model via lookup" step
+    progress = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also the heartbeat: a running job that stops updating is taken over
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'], name='deletionjob_status_idx')]
+
+    def __str__(self):
+        return f"Delete {self.model_label} {self.object_repr} ({self.status})"
+
+class CourseSimilarity(models.Model):
+    """
+    Top-k "learners who took this also took" neighbours per course, written
+    by ``manage.py build_course_recommendations``.
+    """
+    course = models.ForeignKey(Course, related_name='similar_courses', on_delete=models.CASCADE)
+    similar_course = models.ForeignKey(Course, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField(help_text="Cosine similarity of the two courses' learner sets")
+    co_enrollments = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('course', 'similar_course')
+        indexes = [models.Index(fields=['course', '-score'], name='similarity_course_score_idx')]
 
 class Note(models.Model):
     course = models.ForeignKey(Course, related_name='notes', on_delete=models.CASCADE)
@@ -161,6 +463,8 @@ class Article(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other')
     excerpt = models.TextField(max_length=300, help_text="Brief description of the article")
     content = models.TextField()
+    # Cache key of the rendered HTML; see courses.rendering
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     featured_image = models.URLField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     tags = models.CharField(max_length=200, blank=True, help_text="Comma-separated tags")
@@ -184,7 +488,8 @@ class Article(models.Model):
         
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
-            
+
+        refresh_content_hash(self, kwargs)
         super().save(*args, **kwargs)
 
 class Webinar(models.Model):
@@ -284,3 +589,94 @@ class ArticleLike(models.Model):
         
     def __str__(self):
         return f"{self.user.email} likes {self.article.title}"
+
+class CourseReview(models.Model):
+    """A learner's rating of a course; at most one per enrollment."""
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='review')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='reviews')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_reviews')
+    rating = models.PositiveSmallIntegerField(
+        choices=[(stars, stars) for stars in RATING_STARS],
+        validators=[MinValueValidator(1), MaxValueValidator(5)],
+    )
+    comment = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['course', '-created_at', '-id'], name='review_course_created_idx')]
+
+    def __str__(self):
+        return f"{self.user.email} rated {self.course.title} {self.rating}/5"
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(CourseReview, instance=self)
+        with transaction.atomic(using=using):
+            previous = None
+            if self.pk:
+                previous = (
+                    CourseReview.objects.using(using).select_for_update()
+                    .filter(pk=self.pk).values_list('rating', flat=True).first()
+                )
+            super().save(*args, **kwargs)
+            apply_rating_change(self.course_id, previous, self.rating, using=using)
+
+class ArticleVector(models.Model):
+    """
+    Weighted term counts of a published article, kept so the related-article
+    index can be refreshed without re-tokenizing every article's content.
+    """
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='vector')
+    terms = models.JSONField(default=dict)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+class ArticleSimilarity(models.Model):
+    """Top-N TF-IDF neighbours per published article (courses.related_articles)."""
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_articles')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('article', 'related')
+        indexes = [models.Index(fields=['article', '-score'], name='article_similarity_score_idx')]
+
+class ActivityEventBase(models.Model):
+    """
+    Columns shared by the activity event table and its monthly partitions.
+    Ids are plain integers rather than foreign keys so inserts do no lookups
+    and old months can be dropped without touching other tables.
+    """
+    EVENT_CHOICES = [
+        ('lesson_opened', 'Lesson opened'),
+        ('lesson_closed', 'Lesson closed'),
+        ('video_played', 'Video played'),
+        ('video_paused', 'Video paused'),
+        ('video_completed', 'Video completed'),
+        ('quiz_started', 'Quiz started'),
+        ('quiz_submitted', 'Quiz submitted'),
+        ('assignment_opened', 'Assignment opened'),
+        ('article_read', 'Article read'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.BigIntegerField()
+    course_id = models.BigIntegerField(null=True, blank=True)
+    lesson_id = models.BigIntegerField(null=True, blank=True)
+    event_type = models.CharField(max_length=32, choices=EVENT_CHOICES)
+    occurred_at = models.DateTimeField()
+    received_at = models.DateTimeField()
+    metadata = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        abstract = True
+
+class ActivityEvent(ActivityEventBase):
+    """
+    Append-only learner telemetry, written in batches by
+    ``courses.activity``. On Postgres this is the month-partitioned parent
+    table; other databases keep one table per month instead.
+    """
+
+    class Meta:
+        managed = False
+        db_table = 'courses_activityevent'
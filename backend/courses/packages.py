@@ -0,0 +1,344 @@
+"""
+Course packages: a versioned zip for moving a course between environments.
+
+A package holds ``manifest.json`` (format, version, course fields, row
+counts) and one JSON-lines file per model. Rows refer to their parents by
+the ids they had in the source database (``key``), never by primary keys of
+the target.
+
+Export writes the archive through a small pipe and yields it piece by piece,
+so the response starts immediately and only one block is ever held in
+memory. Import reads each member line by line from the uploaded file and
+writes ``IMPORT_BATCH_SIZE`` rows per transaction.
+
+Import is idempotent on the course slug. An existing course is updated in
+place. Lessons are matched on ``ordinal``, so learners' completion bitmaps
+stay valid. Other rows are matched by their position under their parent.
+Matched rows are updated, missing ones are created and leftovers are
+deleted. Importing the same package twice leaves the course unchanged, and
+re-running an import that failed partway completes it.
+"""
+import io
+import json
+import zipfile
+from collections import defaultdict, deque
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Assignment, Choice, Course, Lesson, Note, Question, Quiz, Video
+from .rendering import content_hash
+
+FORMAT = 'thinktank-course'
+VERSION = 1
+IMPORT_BATCH_SIZE = 500
+FLUSH_BYTES = 64 * 1024
+# Longest JSON line accepted on import; guards against hostile archives
+MAX_LINE_BYTES = 8 * 1024 * 1024
+MAX_MANIFEST_BYTES = 1024 * 1024
+# Ordinals are bit positions in every learner's completion bitmap
+MAX_LESSON_ORDINAL = 100_000
+
+COURSE_FIELDS = [
+    'slug', 'title', 'description', 'instructor_name', 'price', 'duration', 'category', 'level', 'published',
+    'thumbnail_url', 'preview_video_url',
+]
+
+
+class PackageError(Exception):
+    pass
+
+
+def _members(course):
+    """(file name, queryset, row builder) per model, in import order."""
+    return [
+        ('lessons.jsonl', Lesson.objects.filter(course=course).order_by('ordinal'), lambda lesson: {
+            'ordinal': lesson.ordinal, 'title': lesson.title, 'content': lesson.content,
+            'duration': lesson.duration, 'order': lesson.order,
+        }),
+        ('quizzes.jsonl', Quiz.objects.filter(course=course).order_by('order', 'id'), lambda quiz: {
+            'key': quiz.id, 'title': quiz.title, 'description': quiz.description, 'order': quiz.order,
+        }),
+        ('questions.jsonl', Question.objects.filter(quiz__course=course).order_by('quiz_id', 'id'), lambda question: {
+            'key': question.id, 'quiz': question.quiz_id, 'question_text': question.question_text,
+            'type': question.type,
+        }),
+        ('choices.jsonl', Choice.objects.filter(question__quiz__course=course).order_by('question_id', 'id'),
+         lambda choice: {
+            'question': choice.question_id, 'choice_text': choice.choice_text, 'is_correct': choice.is_correct,
+        }),
+        ('assignments.jsonl', Assignment.objects.filter(course=course).order_by('id'), lambda assignment: {
+            'title': assignment.title, 'description': assignment.description,
+            'due_date': assignment.due_date.isoformat() if assignment.due_date else None,
+        }),
+        ('notes.jsonl', Note.objects.filter(course=course).order_by('id'), lambda note: {'content': note.content}),
+        ('videos.jsonl', Video.objects.filter(course=course).order_by('id'), lambda video: {
+            'title': video.title, 'url': video.url,
+        }),
+    ]
+
+
+# Export
+
+class _Pipe(io.RawIOBase):
+    """Unseekable sink for ZipFile; whatever was written is taken with ``drain``."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def pending(self):
+        return len(self._buffer)
+
+    def drain(self):
+        data, self._buffer = bytes(self._buffer), bytearray()
+        return data
+
+
+def export_package(course):
+    """Yield the package for ``course`` as byte chunks."""
+    members = _members(course)
+    manifest = {
+        'format': FORMAT,
+        'version': VERSION,
+        'exported_at': timezone.now().isoformat(),
+        'course': {field: getattr(course, field) for field in COURSE_FIELDS} | {'price': str(course.price)},
+        'counts': {name.split('.')[0]: queryset.count() for name, queryset, _ in members},
+    }
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        for name, queryset, build in members:
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for row in queryset.iterator(chunk_size=IMPORT_BATCH_SIZE):
+                    member.write(json.dumps(build(row)).encode() + b'\n')
+                    if pipe.pending() >= FLUSH_BYTES:
+                        yield pipe.drain()
+            yield pipe.drain()
+    yield pipe.drain()
+
+
+# Import
+
+def _rows(archive, name):
+    try:
+        member = archive.open(name)
+    except KeyError:
+        return
+    with member:
+        for number, line in enumerate(iter(lambda: member.readline(MAX_LINE_BYTES + 1), b''), 1):
+            if len(line) > MAX_LINE_BYTES:
+                raise PackageError(f'{name} line {number} is too long')
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                raise PackageError(f'{name} line {number} is not valid JSON')
+
+
+def _create(model, objs):
+    # bulk_create can't hand back primary keys on every backend (MySQL)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+class _Level:
+    """
+    Positional sync of one model under its parents: the n-th incoming row for
+    a parent updates that parent's n-th existing row, or is created.
+    """
+
+    def __init__(self, model, fields, existing, parent_field):
+        self.model = model
+        self.fields = fields
+        self.parent_field = parent_field
+        self.existing = defaultdict(deque)
+        for parent_id, pk in existing:
+            self.existing[parent_id].append(pk)
+        self.keys = {}
+        self.count = 0
+        self._updates, self._creates = [], []
+
+    def add(self, parent_id, values, key=None):
+        obj = self.model(**{self.parent_field: parent_id}, **values)
+        try:
+            obj.clean_fields(exclude=[self.parent_field.removesuffix('_id')])
+        except ValidationError as e:
+            raise PackageError(f'Invalid {self.model._meta.verbose_name}: {"; ".join(e.messages)}')
+        slot = self.existing.get(parent_id)
+        if slot:
+            obj.pk = slot.popleft()
+            self._updates.append((key, obj))
+        else:
+            self._creates.append((key, obj))
+        self.count += 1
+        if len(self._updates) + len(self._creates) >= IMPORT_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            if self._updates:
+                self.model.objects.bulk_update([obj for _, obj in self._updates], self.fields)
+            if self._creates:
+                _create(self.model, [obj for _, obj in self._creates])
+        for key, obj in self._updates + self._creates:
+            if key is not None:
+                self.keys[key] = obj.pk
+        self._updates, self._creates = [], []
+
+    def finish(self):
+        self.flush()
+        leftovers = [pk for pks in self.existing.values() for pk in pks]
+        for start in range(0, len(leftovers), IMPORT_BATCH_SIZE):
+            self.model.objects.filter(pk__in=leftovers[start:start + IMPORT_BATCH_SIZE]).delete()
+        return self.count
+
+
+def _parent(keys, key, name, number):
+    try:
+        return keys[key]
+    except KeyError:
+        raise PackageError(f'{name} line {number} refers to an unknown parent {key!r}')
+
+
+def _values(row, fields, name, number):
+    try:
+        return {field: row[field] for field in fields}
+    except (KeyError, TypeError):
+        raise PackageError(f'{name} line {number} must be an object with {", ".join(fields)}')
+
+
+def _manifest(archive):
+    try:
+        member = archive.open('manifest.json')
+    except KeyError:
+        raise PackageError('manifest.json is missing or invalid')
+    with member:
+        # The size in the zip header can't be trusted, so bound the read itself
+        data = member.read(MAX_MANIFEST_BYTES + 1)
+    if len(data) > MAX_MANIFEST_BYTES:
+        raise PackageError('manifest.json is too large')
+    try:
+        return json.loads(data)
+    except ValueError:
+        raise PackageError('manifest.json is missing or invalid')
+
+
+def _ordinal(value, seen, number):
+    if type(value) is not int or not 0 <= value <= MAX_LESSON_ORDINAL:
+        raise PackageError(
+            f'lessons.jsonl line {number}: ordinal must be an integer from 0 to {MAX_LESSON_ORDINAL}'
+        )
+    if value in seen:
+        raise PackageError(f'lessons.jsonl line {number}: ordinal {value} is repeated')
+    seen.add(value)
+    return value
+
+
+def import_package(file, instructor, progress=None):
+    """
+    Create or update the course in the package read from ``file`` (a seekable
+    binary file). New courses belong to ``instructor``. ``progress`` is called
+    as ``progress(stage, rows_done)``. Returns ``(course, created, counts)``.
+    """
+    progress = progress or (lambda stage, done: None)
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise PackageError('Not a zip archive')
+    with archive:
+        manifest = _manifest(archive)
+        if not isinstance(manifest, dict):
+            raise PackageError('manifest.json is missing or invalid')
+        if manifest.get('format') != FORMAT or manifest.get('version') != VERSION:
+            raise PackageError(f'Unsupported package: expected {FORMAT} version {VERSION}')
+        fields = _values(manifest.get('course'), COURSE_FIELDS, 'manifest.json', 1)
+
+        with transaction.atomic():
+            course = Course.objects.select_for_update().filter(slug=fields['slug']).first()
+            created = course is None
+            if created:
+                if instructor is None:
+                    raise PackageError('An instructor is required to create a new course')
+                course = Course(instructor=instructor)
+            for field, value in fields.items():
+                setattr(course, field, value)
+            try:
+                course.full_clean(exclude=['instructor'], validate_unique=False)
+            except ValidationError as e:
+                raise PackageError(f'Invalid course: {"; ".join(e.messages)}')
+            course.save()
+        progress('course', 1)
+        counts = {}
+
+        # Lessons are matched on ordinal rather than position
+        lesson_fields = ['title', 'content', 'duration', 'order']
+        existing = dict(Lesson.objects.filter(course=course).values_list('ordinal', 'id'))
+        lessons = _Level(Lesson, lesson_fields + ['content_hash'], [], 'course_id')
+        highest = -1
+        seen = set()
+        for number, row in _rows(archive, 'lessons.jsonl'):
+            values = _values(row, ['ordinal'] + lesson_fields, 'lessons.jsonl', number)
+            _ordinal(values['ordinal'], seen, number)
+            values['content_hash'] = content_hash(values['content'])
+            pk = existing.pop(values['ordinal'], None)
+            if pk is not None:
+                lessons.existing[course.id].append(pk)
+            highest = max(highest, values['ordinal'])
+            lessons.add(course.id, values)
+            if lessons.count % IMPORT_BATCH_SIZE == 0:
+                progress('lessons', lessons.count)
+        lessons.existing[course.id].extend(existing.values())
+        counts['lessons'] = lessons.finish()
+        Course.objects.filter(id=course.id, next_lesson_ordinal__lte=highest).update(next_lesson_ordinal=highest + 1)
+        progress('lessons', counts['lessons'])
+
+        levels = [
+            ('quizzes.jsonl', Quiz, ['title', 'description', 'order'], 'course_id', None,
+             Quiz.objects.filter(course=course).order_by('order', 'id').values_list('course_id', 'id')),
+            ('questions.jsonl', Question, ['question_text', 'type'], 'quiz_id', 'quiz',
+             Question.objects.filter(quiz__course=course).order_by('quiz_id', 'id').values_list('quiz_id', 'id')),
+            ('choices.jsonl', Choice, ['choice_text', 'is_correct'], 'question_id', 'question',
+             Choice.objects.filter(question__quiz__course=course).order_by('question_id', 'id')
+             .values_list('question_id', 'id')),
+            ('assignments.jsonl', Assignment, ['title', 'description', 'due_date'], 'course_id', None,
+             Assignment.objects.filter(course=course).order_by('id').values_list('course_id', 'id')),
+            ('notes.jsonl', Note, ['content'], 'course_id', None,
+             Note.objects.filter(course=course).order_by('id').values_list('course_id', 'id')),
+            ('videos.jsonl', Video, ['title', 'url'], 'course_id', None,
+             Video.objects.filter(course=course).order_by('id').values_list('course_id', 'id')),
+        ]
+        keys = {}
+        for name, model, model_fields, parent_field, parent_ref, existing in levels:
+            stage = name.split('.')[0]
+            level = _Level(model, model_fields, existing, parent_field)
+            for number, row in _rows(archive, name):
+                values = _values(row, model_fields, name, number)
+                if 'due_date' in values and values['due_date']:
+                    values['due_date'] = parse_datetime(values['due_date'])
+                parent_id = course.id if parent_ref is None else _parent(keys, row.get(parent_ref), name, number)
+                level.add(parent_id, values, key=row.get('key'))
+                if level.count % IMPORT_BATCH_SIZE == 0:
+                    progress(stage, level.count)
+            counts[stage] = level.finish()
+            keys = level.keys
+            progress(stage, counts[stage])
+    course.refresh_from_db()
+    return course, created, counts
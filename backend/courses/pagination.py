@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+class GradingQueuePagination(CursorPagination):
+    """Keyset pagination over (submitted_at, id), oldest submission first."""
+    ordering = ('submitted_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+class ReviewPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), newest review first."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
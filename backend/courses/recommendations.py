@@ -0,0 +1,197 @@
+"""
+"Learners who took this also took" recommendations.
+
+Enrollments are streamed in keyset-paginated chunks into a sparse binary
+learner x course matrix X. ``C = X.T @ X`` counts co-enrollments (its
+diagonal is each course's enrollment count), and item-item cosine similarity
+is ``C[i, j] / sqrt(C[i, i] * C[j, j])``. The top-k neighbours of every course
+are stored in ``CourseSimilarity`` and served from cache.
+
+C is also saved to ``RECOMMENDATION_STATE_PATH`` with the highest enrollment
+id it covers, so incremental runs only read enrollments past that id plus
+the other enrollments of the learners involved, and apply the difference to
+C. Unenrollments are only picked up by a full rebuild.
+"""
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .caching import recommendation_cache
+from .models import Course, CourseSimilarity, Enrollment
+
+DEFAULT_CHUNK_SIZE = 100000
+USER_BATCH_SIZE = 1000
+
+
+def stream_enrollments(after_id=0, chunk_size=DEFAULT_CHUNK_SIZE, user_ids=None):
+    """Yield (ids, user_ids, course_ids) arrays for enrollments with id > ``after_id``, in id order."""
+    queryset = Enrollment.objects.order_by('id')
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    last_id = after_id
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list('id', 'user_id', 'course_id')[:chunk_size])
+        if not rows:
+            return
+        chunk = np.array(rows, dtype=np.int64)
+        last_id = int(chunk[-1, 0])
+        yield chunk[:, 0], chunk[:, 1], chunk[:, 2]
+
+
+def _collect(chunks):
+    ids, users, courses = [], [], []
+    for chunk_ids, chunk_users, chunk_courses in chunks:
+        ids.append(chunk_ids)
+        users.append(chunk_users)
+        courses.append(chunk_courses)
+    if not ids:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    return np.concatenate(ids), np.concatenate(users), np.concatenate(courses)
+
+
+def cooccurrence(users, courses, course_ids):
+    """Course x course co-enrollment counts for the given (user, course) pairs."""
+    _, rows = np.unique(users, return_inverse=True)
+    cols = np.searchsorted(course_ids, courses)
+    x = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(rows.max() + 1 if len(rows) else 0, len(course_ids)),
+    )
+    return (x.T @ x).tocsr()
+
+
+class CoEnrollmentState:
+    """Co-enrollment matrix ``matrix`` over ``course_ids`` (sorted), covering enrollments up to ``last_id``."""
+
+    def __init__(self, course_ids, matrix, last_id):
+        self.course_ids = course_ids
+        self.matrix = matrix
+        self.last_id = last_id
+
+    @classmethod
+    def build(cls, chunk_size=DEFAULT_CHUNK_SIZE):
+        ids, users, courses = _collect(stream_enrollments(chunk_size=chunk_size))
+        course_ids = np.unique(courses)
+        return cls(course_ids, cooccurrence(users, courses, course_ids), int(ids.max()) if len(ids) else 0)
+
+    def update(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Fold in enrollments created since ``last_id``. Returns how many were added."""
+        new_ids, new_users, new_courses = _collect(stream_enrollments(self.last_id, chunk_size))
+        if not len(new_ids):
+            return 0
+        new_last_id = int(new_ids.max())
+
+        # Everything the affected learners are enrolled in, before and after
+        affected = np.unique(new_users).tolist()
+        ids, users, courses = _collect(
+            chunk
+            for start in range(0, len(affected), USER_BATCH_SIZE)
+            for chunk in stream_enrollments(user_ids=affected[start:start + USER_BATCH_SIZE], chunk_size=chunk_size)
+        )
+        current = ids <= new_last_id
+        ids, users, courses = ids[current], users[current], courses[current]
+
+        course_ids = np.union1d(self.course_ids, courses)
+        if len(course_ids) != len(self.course_ids):
+            # Re-index the stored matrix onto the grown course list
+            position = np.searchsorted(course_ids, self.course_ids)
+            old = self.matrix.tocoo()
+            self.matrix = sparse.csr_matrix(
+                (old.data, (position[old.row], position[old.col])), shape=(len(course_ids), len(course_ids)),
+            )
+            self.course_ids = course_ids
+
+        before = ids <= self.last_id
+        delta = cooccurrence(users, courses, course_ids)
+        if before.any():
+            delta = delta - cooccurrence(users[before], courses[before], course_ids)
+        self.matrix = (self.matrix + delta).tocsr()
+        self.matrix.eliminate_zeros()
+        self.last_id = new_last_id
+        return len(new_ids)
+
+    def neighbours(self, k, min_support):
+        """Top-k (course, neighbour, score, co_enrollments) arrays by cosine similarity."""
+        counts = self.matrix.diagonal().astype(np.float64)
+        coo = self.matrix.tocoo()
+        keep = (coo.row != coo.col) & (coo.data >= min_support)
+        rows, cols, together = coo.row[keep], coo.col[keep], coo.data[keep]
+        scores = together / np.sqrt(counts[rows] * counts[cols])
+
+        # Sort by course, best first, then keep the first k of each run
+        order = np.lexsort((-scores, rows))
+        rows, cols, together, scores = rows[order], cols[order], together[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+        top = rank < k
+        return (
+            self.course_ids[rows[top]], self.course_ids[cols[top]], scores[top], together[top],
+        )
+
+    def save(self, path=None):
+        path = Path(path or settings.RECOMMENDATION_STATE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        matrix = self.matrix.tocsr()
+        with open(path, 'wb') as handle:
+            np.savez_compressed(
+                handle, course_ids=self.course_ids, data=matrix.data, indices=matrix.indices,
+                indptr=matrix.indptr, last_id=np.array([self.last_id]),
+            )
+
+    @classmethod
+    def load(cls, path=None):
+        path = Path(path or settings.RECOMMENDATION_STATE_PATH)
+        try:
+            stored = np.load(path)
+        except (OSError, ValueError):
+            return None
+        course_ids = stored['course_ids']
+        matrix = sparse.csr_matrix(
+            (stored['data'], stored['indices'], stored['indptr']), shape=(len(course_ids), len(course_ids)),
+        )
+        return cls(course_ids, matrix, int(stored['last_id'][0]))
+
+
+def store_neighbours(state, k=None, min_support=None):
+    """Replace ``CourseSimilarity`` with the state's top-k neighbours. Returns rows written."""
+    courses, similar, scores, together = state.neighbours(
+        k or settings.RECOMMENDATION_TOP_K, min_support or settings.RECOMMENDATION_MIN_SUPPORT,
+    )
+    existing = set(Course.objects.values_list('id', flat=True))
+    rows = [
+        CourseSimilarity(course_id=course, similar_course_id=other, score=score, co_enrollments=count)
+        for course, other, score, count in zip(courses.tolist(), similar.tolist(), scores.tolist(), together.tolist())
+        if course in existing and other in existing
+    ]
+    with transaction.atomic():
+        CourseSimilarity.objects.all().delete()
+        CourseSimilarity.objects.bulk_create(rows, batch_size=5000)
+    recommendation_cache.bump('recommendations')
+    return len(rows)
+
+
+def recommended_courses(course_id):
+    """Neighbours of a course as response dicts, best first, from cache."""
+    def compute():
+        similar = (
+            CourseSimilarity.objects.filter(course_id=course_id, similar_course__published=True)
+            .select_related('similar_course')
+            .order_by('-score')
+        )
+        return [
+            {
+                'id': row.similar_course.id,
+                'title': row.similar_course.title,
+                'instructor': row.similar_course.instructor_name,
+                'thumbnail': row.similar_course.thumbnail_url,
+                'rating': row.similar_course.rating,
+                'score': round(row.score, 4),
+                'co_enrollments': row.co_enrollments,
+            }
+            for row in similar
+        ]
+    return recommendation_cache.get_or_set(course_id, compute, namespace='recommendations')
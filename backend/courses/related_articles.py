@@ -0,0 +1,227 @@
+"""
+Related articles from TF-IDF similarity.
+
+Each published article's title, tags, excerpt and content are tokenized once
+into weighted term counts (``ArticleVector``). The index turns those into
+sublinear-TF x IDF vectors, L2-normalized so a dot product is the cosine
+similarity, and keeps the top ``RELATED_ARTICLES_TOP_N`` neighbours of each
+article in ``ArticleSimilarity`` so the detail view needs one indexed lookup.
+
+Saving an article refreshes its own neighbours and slots it into other
+articles' lists where it now ranks (``refresh_article``), on a background
+thread after the save commits. The refresh only reads the vectors that share
+one of the article's ``CANDIDATE_TERMS`` strongest distinctive terms (found
+in at most ``CANDIDATE_MAX_DF`` of articles) and weights them with the
+document frequencies cached by the last rebuild, so its cost follows the
+overlap rather than the size of the corpus. IDF weights drift as articles are
+added and an article that drops out of a list is not replaced by the next
+best, so ``manage.py build_related_articles`` should still rebuild
+everything periodically.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from scipy import sparse
+
+from .caching import related_cache
+from .models import Article, ArticleSimilarity, ArticleVector
+
+logger = logging.getLogger(__name__)
+
+FIELD_WEIGHTS = (('title', 3), ('tags', 3), ('excerpt', 2), ('content', 1))
+INDEXED_FIELDS = {'title', 'tags', 'excerpt', 'content', 'status'}
+# Terms kept per article; the long tail of a long post adds size, not signal
+MAX_TERMS = 400
+BLOCK_SIZE = 500
+# Terms of a saved article used to find the articles it is compared with.
+# Terms in more than CANDIDATE_MAX_DF of all articles (and more than
+# CANDIDATE_MIN_DF, so small sites compare everything) carry little weight and
+# would make nearly every article a candidate, so they are not used to find them.
+CANDIDATE_TERMS = 50
+CANDIDATE_MAX_DF = 0.05
+CANDIDATE_MIN_DF = 200
+
+MARKUP = re.compile(r'<[^>]+>|&\w+;|https?://\S+')
+TOKEN = re.compile(r'[a-z][a-z0-9+#]+')
+STOP_WORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers herself
+    him himself his how however into its itself just more most much must nor not now off once only other our
+    ours ourselves out over own same she should some such than that the their theirs them themselves then
+    there these they this those through too under until very was way were what when where which while who
+    whom why will with within without would you your yours yourself yourselves
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall(MARKUP.sub(' ', text).lower()) if token not in STOP_WORDS]
+
+
+def term_counts(article):
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(article, field) or ''):
+            counts[token] += weight
+    return dict(counts.most_common(MAX_TERMS))
+
+
+def load_index():
+    """(article ids, normalized TF-IDF matrix) over every stored vector."""
+    vectors = list(ArticleVector.objects.order_by('article_id').values_list('article_id', 'terms'))
+    ids = np.array([article_id for article_id, _ in vectors], dtype=np.int64)
+    vocabulary, rows, columns, counts = {}, [], [], []
+    for row, (_, terms) in enumerate(vectors):
+        for term, count in terms.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+    shape = (len(ids), len(vocabulary))
+    if not counts:
+        return ids, sparse.csr_matrix(shape)
+
+    columns = np.array(columns)
+    tf = sparse.csr_matrix((1 + np.log(np.array(counts, dtype=np.float64)), (rows, columns)), shape=shape)
+    df = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + len(ids)) / (1 + df)) + 1
+    matrix = (tf @ sparse.diags(idf)).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return ids, (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def document_frequencies(vectors=None):
+    """``{'documents': N, 'df': {term: articles containing it}}`` over ``vectors`` (all stored ones by default)."""
+    if vectors is None:
+        vectors = ArticleVector.objects.values_list('article_id', 'terms').iterator(chunk_size=500)
+    documents, df = 0, Counter()
+    for _, terms in vectors:
+        documents += 1
+        df.update(terms.keys())
+    return {'documents': documents, 'df': dict(df)}
+
+
+def _cached_frequencies():
+    return related_cache.get_or_set('frequencies', document_frequencies)
+
+
+def _weights(terms, frequencies):
+    """L2-normalized sublinear-TF x IDF weights of one vector, as in ``load_index``."""
+    documents, df = frequencies['documents'], frequencies['df']
+    weights = {
+        term: (1 + math.log(count)) * (math.log((1 + documents) / (1 + df.get(term, 0))) + 1)
+        for term, count in terms.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1
+    return {term: weight / norm for term, weight in weights.items()}
+
+
+def _neighbours(ids, scores, top_n):
+    """(article id, score) pairs of the best ``top_n`` positive scores, best first."""
+    count = min(top_n, int((scores > 0).sum()))
+    if not count:
+        return []
+    best = np.argpartition(-scores, count - 1)[:count]
+    best = best[np.argsort(-scores[best])]
+    return list(zip(ids[best].tolist(), scores[best].tolist()))
+
+
+def sync_vectors():
+    """Vectorize published articles that changed since they were indexed and drop the rest."""
+    ArticleVector.objects.exclude(article__status='published').delete()
+    stale = Article.objects.filter(status='published').filter(
+        Q(vector__isnull=True) | Q(updated_at__gt=F('vector__indexed_at'))
+    ).only('id', *dict(FIELD_WEIGHTS))
+    for article in stale.iterator(chunk_size=200):
+        ArticleVector.objects.update_or_create(article=article, defaults={'terms': term_counts(article)})
+
+
+def rebuild_related(top_n=None):
+    """Recompute every article's neighbours. Returns rows written."""
+    top_n = top_n or settings.RELATED_ARTICLES_TOP_N
+    sync_vectors()
+    ids, matrix = load_index()
+    related_cache.set('frequencies', document_frequencies())
+    rows = []
+    for start in range(0, len(ids), BLOCK_SIZE):
+        block = (matrix[start:start + BLOCK_SIZE] @ matrix.T).toarray()
+        block[np.arange(len(block)), np.arange(start, start + len(block))] = 0
+        for offset, scores in enumerate(block):
+            rows.extend(
+                ArticleSimilarity(article_id=int(ids[start + offset]), related_id=related, score=score)
+                for related, score in _neighbours(ids, scores, top_n)
+            )
+    with transaction.atomic():
+        ArticleSimilarity.objects.all().delete()
+        ArticleSimilarity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_article(article, top_n=None):
+    """Re-index one article after it was saved."""
+    top_n = top_n or settings.RELATED_ARTICLES_TOP_N
+    with transaction.atomic():
+        ArticleSimilarity.objects.filter(Q(article=article) | Q(related=article)).delete()
+        if article.status != 'published':
+            ArticleVector.objects.filter(article=article).delete()
+            return
+        terms = term_counts(article)
+        ArticleVector.objects.update_or_create(article=article, defaults={'terms': terms})
+
+        frequencies = _cached_frequencies()
+        weights = _weights(terms, frequencies)
+        common = max(CANDIDATE_MAX_DF * frequencies['documents'], CANDIDATE_MIN_DF)
+        strongest = sorted(
+            (term for term in weights if frequencies['df'].get(term, 0) <= common), key=weights.get, reverse=True,
+        )[:CANDIDATE_TERMS]
+        candidates = {}
+        if strongest:
+            for other, other_terms in (
+                ArticleVector.objects.filter(terms__has_any_keys=strongest).exclude(article=article)
+                .values_list('article_id', 'terms').iterator(chunk_size=500)
+            ):
+                other_weights = _weights(other_terms, frequencies)
+                score = sum(weight * other_weights.get(term, 0) for term, weight in weights.items())
+                if score > 0:
+                    candidates[other] = score
+        ids = np.array(list(candidates), dtype=np.int64)
+        own = _neighbours(ids, np.array(list(candidates.values())), top_n)
+
+        # Other articles take this one if it beats the weakest of their current neighbours
+        lists = {}
+        for entry_id, other, entry_score in ArticleSimilarity.objects.filter(article_id__in=candidates).values_list(
+            'id', 'article_id', 'score'
+        ):
+            lists.setdefault(other, []).append((entry_score, entry_id))
+        rows = [ArticleSimilarity(article=article, related_id=related, score=score) for related, score in own]
+        evicted = []
+        for other, score in candidates.items():
+            entries = lists.get(other, [])
+            if len(entries) < top_n:
+                rows.append(ArticleSimilarity(article_id=other, related=article, score=score))
+                continue
+            weakest_score, weakest_id = min(entries)
+            if score > weakest_score:
+                evicted.append(weakest_id)
+                rows.append(ArticleSimilarity(article_id=other, related=article, score=score))
+        ArticleSimilarity.objects.filter(id__in=evicted).delete()
+        ArticleSimilarity.objects.bulk_create(rows, batch_size=1000)
+
+
+def refresh_article_later(article):
+    """Run ``refresh_article`` on a background thread once the current transaction commits."""
+    def work():
+        try:
+            refresh_article(article)
+        except Exception:
+            logger.exception('Refreshing related articles for article %s failed', article.pk)
+        finally:
+            connections.close_all()
+
+    transaction.on_commit(lambda: threading.Thread(target=work, name='related-articles', daemon=True).start())
@@ -0,0 +1,56 @@
+"""
+Server-side Markdown rendering for lesson and article content.
+
+Rendered HTML is cached under the SHA-256 of the source (plus a renderer
+version), which the models store in ``content_hash`` on save. Readers can
+therefore look the HTML up without loading ``content`` at all, identical
+content shares one cache entry, and an edit never has to invalidate
+anything. Rows saved without a hash (older rows, ``bulk_create``) are hashed
+and rendered on first read.
+
+Raw HTML in the source is escaped rather than passed through and markdown-it
+refuses ``javascript:``/``vbscript:``/``file:``/``data:`` link targets, so the
+output is safe to insert into a page as is.
+"""
+import hashlib
+
+from markdown_it import MarkdownIt
+
+from .caching import content_cache
+
+# Bump when the parser options change so old renders are not served
+RENDERER_VERSION = 1
+
+_markdown = MarkdownIt('commonmark', {'html': False}).enable(['table', 'strikethrough'])
+
+
+def content_hash(text):
+    return hashlib.sha256(f'{RENDERER_VERSION}:{text}'.encode()).hexdigest()
+
+
+def render_markdown(text):
+    return _markdown.render(text or '')
+
+
+def warm(text, digest=None):
+    """Render ``text`` into the cache unless it is already there."""
+    digest = digest or content_hash(text)
+    if content_cache.get(digest) is None:
+        content_cache.set(digest, render_markdown(text))
+    return digest
+
+
+def rendered_content(instance):
+    """
+    ``(content_hash, html)`` for a Lesson or Article. ``content`` may be
+    deferred; it is only fetched on a cache miss.
+    """
+    model = type(instance)
+    if not instance.content_hash:
+        instance.content_hash = content_hash(instance.content)
+        model.objects.filter(pk=instance.pk).update(content_hash=instance.content_hash)
+
+    def render():
+        return render_markdown(instance.content)
+
+    return instance.content_hash, content_cache.get_or_set(instance.content_hash, render)
@@ -1,7 +1,12 @@
+import json
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Course, Lesson, Enrollment, Progress, Certificate, Assignment, AssignmentSubmission, Quiz, QuizResult, Article, Webinar, WebinarRegistration, ArticleLike
+from django.conf import settings
+from django.db import transaction
+from .models import Course, Lesson, Enrollment, Progress, Certificate, Assignment, AssignmentSubmission, UploadSession, Quiz, QuizResult, QuizResponse, QuizAnalytics, QuestionAnalytics, Article, Webinar, WebinarRegistration, ArticleLike, ActivityEvent, CourseReview, lesson_ordinals
 from users.serializers import UserSerializer
+from .uploads import missing_ranges
 
 User = get_user_model()
 
@@ -10,21 +15,20 @@ class LessonSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Lesson
-        fields = ['id', 'title', 'duration', 'is_completed']
+        fields = ['id', 'title', 'duration', 'content_hash', 'is_completed']
     
     def get_is_completed(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            enrollment = Enrollment.objects.filter(
-                user=request.user, 
-                course=obj.course
-            ).first()
+            # One enrollment lookup per course for the whole lesson list
+            enrollments = self.context.setdefault('_enrollments', {})
+            if obj.course_id not in enrollments:
+                enrollments[obj.course_id] = Enrollment.objects.filter(
+                    user_id=request.user.id, course_id=obj.course_id
+                ).first()
+            enrollment = enrollments[obj.course_id]
             if enrollment:
-                return Progress.objects.filter(
-                    enrollment=enrollment, 
-                    lesson=obj, 
-                    completed=True
-                ).exists()
+                return enrollment.has_completed(obj)
         return False
 
 class CourseListSerializer(serializers.ModelSerializer):
@@ -40,7 +44,7 @@ class CourseListSerializer(serializers.ModelSerializer):
     def get_is_enrolled(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Enrollment.objects.filter(user=request.user, course=obj).exists()
+            return Enrollment.objects.filter(user_id=request.user.id, course=obj).exists()
         return False
 
 class CourseDetailSerializer(serializers.ModelSerializer):
@@ -53,25 +57,22 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ['id', 'title', 'description', 'instructor', 'duration', 
-                 'students_count', 'rating', 'level', 'thumbnail', 'price', 
+                 'students_count', 'rating', 'rating_count', 'rating_histogram', 'level', 'thumbnail', 'price', 
                  'is_enrolled', 'progress', 'lessons']
     
     def get_is_enrolled(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Enrollment.objects.filter(user=request.user, course=obj).exists()
+            return Enrollment.objects.filter(user_id=request.user.id, course=obj).exists()
         return False
     
     def get_progress(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            enrollment = Enrollment.objects.filter(user=request.user, course=obj).first()
+            enrollment = Enrollment.objects.filter(user_id=request.user.id, course=obj).first()
             if enrollment:
-                total_lessons = obj.lessons.count()
-                completed_lessons = Progress.objects.filter(
-                    enrollment=enrollment, completed=True
-                ).count()
-                return (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+                self.context.setdefault('_enrollments', {})[obj.id] = enrollment
+                return enrollment.progress_percent([lesson.ordinal for lesson in obj.lessons.all()])
         return 0
 
 class EnrollmentSerializer(serializers.ModelSerializer):
@@ -87,16 +88,29 @@ class EnrollmentSerializer(serializers.ModelSerializer):
                  'enrolled_at', 'last_accessed', 'progress', 'status']
     
     def get_progress(self, obj):
-        total_lessons = obj.course.lessons.count()
-        completed_lessons = Progress.objects.filter(
-            enrollment=obj, completed=True
-        ).count()
-        return (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+        ordinals = self.context.setdefault('_lesson_ordinals', {})
+        if obj.course_id not in ordinals:
+            ordinals.update(lesson_ordinals([obj.course_id]))
+        return obj.progress_percent(ordinals[obj.course_id])
     
     def get_status(self, obj):
         progress = self.get_progress(obj)
         return 'completed' if progress == 100 else 'in_progress'
 
+class BulkEnrollSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="CSV with an 'email' column (or emails in the first column)")
+    create_missing = serializers.BooleanField(default=False)
+    send_invites = serializers.BooleanField(default=False)
+
+class ProgressUpdateSerializer(serializers.Serializer):
+    lesson_id = serializers.IntegerField()
+    # Accepts true/false, 1/0 and their string forms; "false" must not count as done
+    completed = serializers.BooleanField(default=True)
+
+class CourseCloneSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    published = serializers.BooleanField(default=False)
+
 class CertificateSerializer(serializers.ModelSerializer):
     course_title = serializers.CharField(source='course.title', read_only=True)
     
@@ -129,17 +143,149 @@ class AssignmentSerializer(serializers.ModelSerializer):
 class AssignmentSubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssignmentSubmission
-        fields = ['id', 'assignment', 'submitted_at', 'file_url', 'grade', 'feedback']
+        fields = ['id', 'assignment', 'submitted_at', 'file_url', 'file', 'grade', 'feedback']
+        # Grades are written by instructors through the bulk-grade endpoint
+        read_only_fields = ['file', 'grade', 'feedback']
+
+class GradingQueueSerializer(serializers.ModelSerializer):
+    assignment_title = serializers.CharField(source='assignment.title', read_only=True)
+    course_id = serializers.IntegerField(source='assignment.course_id', read_only=True)
+    student = serializers.EmailField(source='user.email', read_only=True)
+
+    class Meta:
+        model = AssignmentSubmission
+        fields = ['id', 'assignment', 'assignment_title', 'course_id', 'student',
+                 'submitted_at', 'file_url', 'file']
+
+class GradeEntrySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    grade = serializers.DecimalField(max_digits=5, decimal_places=2)
+    feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class BulkGradeSerializer(serializers.Serializer):
+    grades = GradeEntrySerializer(many=True, allow_empty=False)
+
+    def validate_grades(self, value):
+        ids = [entry['id'] for entry in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Each submission may only be graded once per request')
+        return value
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    received_chunks = serializers.SerializerMethodField()
+    missing_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'assignment', 'submission', 'filename', 'content_type', 'total_size',
+                 'chunk_size', 'sha256', 'status', 'total_chunks', 'received_chunks',
+                 'missing_chunks', 'created_at', 'completed_at']
+        read_only_fields = ['status', 'created_at', 'completed_at']
+        extra_kwargs = {'chunk_size': {'min_value': 1}}
+
+    def get_received_chunks(self, obj):
+        return sorted(obj.chunks.values_list('index', flat=True))
+
+    def get_missing_chunks(self, obj):
+        # Inclusive [first, last] ranges, so the payload stays small for any session
+        return missing_ranges(obj.total_chunks, self.get_received_chunks(obj))
+
+    def validate(self, data):
+        if data['chunk_size'] > settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f'chunk_size may not exceed {settings.UPLOAD_MAX_CHUNK_SIZE} bytes'
+            )
+        if data['chunk_size'] < min(settings.UPLOAD_MIN_CHUNK_SIZE, data['total_size']):
+            raise serializers.ValidationError(
+                {'chunk_size': f'chunk_size must be at least {settings.UPLOAD_MIN_CHUNK_SIZE} bytes'}
+            )
+        if data['total_size'] > settings.UPLOAD_MAX_FILE_SIZE:
+            raise serializers.ValidationError(
+                f'total_size may not exceed {settings.UPLOAD_MAX_FILE_SIZE} bytes'
+            )
+        submission = data.get('submission')
+        request = self.context['request']
+        if submission and (submission.user_id != request.user.id or submission.assignment_id != data['assignment'].id):
+            raise serializers.ValidationError('Submission does not belong to you or to this assignment')
+        return data
 
 class QuizSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quiz
         fields = ['id', 'title', 'description', 'order']
 
+class QuizResponseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QuizResponse
+        fields = ['question', 'choice', 'answer_text', 'is_correct']
+        read_only_fields = ['is_correct']
+
+    def validate(self, data):
+        choice = data.get('choice')
+        if choice and choice.question_id != data['question'].id:
+            raise serializers.ValidationError('Choice does not belong to this question')
+        return data
+
 class QuizResultSerializer(serializers.ModelSerializer):
+    responses = QuizResponseSerializer(many=True, required=False)
+
     class Meta:
         model = QuizResult
-        fields = ['id', 'quiz', 'score', 'passed', 'taken_at']
+        fields = ['id', 'quiz', 'score', 'passed', 'taken_at', 'responses']
+
+    def validate(self, data):
+        quiz = data.get('quiz') or getattr(self.instance, 'quiz', None)
+        for response in data.get('responses', []):
+            if response['question'].quiz_id != quiz.id:
+                raise serializers.ValidationError('Response question does not belong to this quiz')
+        return data
+
+    def create(self, validated_data):
+        responses = validated_data.pop('responses', [])
+        with transaction.atomic():
+            result = QuizResult.objects.create(**validated_data)
+            QuizResponse.objects.bulk_create([
+                QuizResponse(
+                    result=result,
+                    is_correct=bool(response.get('choice') and response['choice'].is_correct),
+                    **response
+                )
+                for response in responses
+            ])
+        return result
+
+    def update(self, instance, validated_data):
+        # Responses are an immutable record of the attempt
+        validated_data.pop('responses', None)
+        return super().update(instance, validated_data)
+
+class QuestionAnalyticsSerializer(serializers.ModelSerializer):
+    question_text = serializers.CharField(source='question.question_text', read_only=True)
+
+    class Meta:
+        model = QuestionAnalytics
+        fields = ['question', 'question_text', 'attempts', 'responses', 'difficulty',
+                 'discrimination', 'choice_rates', 'computed_at']
+
+class QuizAnalyticsSerializer(serializers.ModelSerializer):
+    questions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuizAnalytics
+        fields = ['quiz', 'attempts', 'mean_score', 'reliability', 'computed_at', 'questions']
+
+    def get_questions(self, obj):
+        items = QuestionAnalytics.objects.filter(question__quiz=obj.quiz).select_related('question').order_by('question_id')
+        return QuestionAnalyticsSerializer(items, many=True).data
+
+class CourseReviewSerializer(serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+
+    class Meta:
+        model = CourseReview
+        fields = ['id', 'course', 'user_name', 'rating', 'comment', 'created_at', 'updated_at']
+        read_only_fields = ['course', 'created_at', 'updated_at']
 
 class ArticleSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -166,6 +312,12 @@ class ArticleSerializer(serializers.ModelSerializer):
     def get_tags_list(self, obj):
         return [tag.strip() for tag in obj.tags.split(',') if tag.strip()]
 
+class ArticleListSerializer(ArticleSerializer):
+    """Article without its body, for list pages."""
+
+    class Meta(ArticleSerializer.Meta):
+        fields = [field for field in ArticleSerializer.Meta.fields if field != 'content'] + ['content_hash']
+
 class WebinarSerializer(serializers.ModelSerializer):
     presenter = UserSerializer(read_only=True)
     presenter_name = serializers.CharField(source='presenter.get_full_name', read_only=True)
@@ -205,3 +357,18 @@ class WebinarRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = WebinarRegistration
         fields = ['id', 'webinar', 'user', 'registered_at', 'attended', 'feedback_rating', 'feedback_comment']
+
+class ActivityEventSerializer(serializers.Serializer):
+    """One client-reported event; validated into a dict for ``courses.activity``."""
+    event_type = serializers.ChoiceField(choices=ActivityEvent.EVENT_CHOICES)
+    course_id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    lesson_id = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    occurred_at = serializers.DateTimeField(required=False)
+    metadata = serializers.JSONField(required=False, default=dict)
+
+    def validate_metadata(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('Expected an object.')
+        if len(json.dumps(value)) > 2048:
+            raise serializers.ValidationError('Metadata is limited to 2 KB.')
+        return value
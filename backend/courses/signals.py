@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import catalog_cache, dashboard_cache
+from .models import Article, Certificate, Course, CourseReview, Enrollment, Lesson, Progress, apply_rating_change
+from .related_articles import INDEXED_FIELDS, refresh_article_later
+from .rendering import warm
+
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog_cache.bump('courses')
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Certificate)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    dashboard_cache.bump(f'user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Progress)
+def invalidate_progress_dashboard(sender, instance, **kwargs):
+    # Progress rows are only deleted along with their enrollment, which
+    # already bumps the namespace.
+    dashboard_cache.bump(f'user:{instance.enrollment.user_id}')
+
+
+@receiver(post_save, sender=Article)
+def reindex_related_articles(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Counter updates (likes) don't change what the article is about
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    refresh_article_later(instance)
+
+
+@receiver(post_delete, sender=CourseReview)
+def remove_review_rating(sender, instance, using, **kwargs):
+    # Also runs for reviews removed by cascade when a learner unenrolls
+    apply_rating_change(instance.course_id, instance.rating, None, using=using)
+
+
+@receiver([post_save, post_delete], sender=CourseReview)
+def invalidate_catalog_ratings(sender, instance, using, **kwargs):
+    # apply_rating_change updates the course with .update(), which sends no
+    # Course signals; bump after commit so no reader re-caches the old rating
+    transaction.on_commit(lambda: catalog_cache.bump('courses'), using=using)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Article)
+def render_content(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or 'content' in instance.get_deferred_fields() or (update_fields is not None and 'content' not in update_fields):
+        return
+    transaction.on_commit(lambda: warm(instance.content, instance.content_hash))
@@ -0,0 +1,18 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(document).ready(function() {
+        $('.autocomplete-filter select').on('change', function() {
+            const parameter = $(this).closest('.autocomplete-filter').data('parameter');
+            const params = new URLSearchParams(window.location.search);
+            params.delete('p');
+            if (this.value) {
+                params.set(parameter, this.value);
+            } else {
+                params.delete(parameter);
+            }
+            window.location.search = params.toString();
+        });
+    });
+}
@@ -0,0 +1,1078 @@
+import hashlib
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from users.models import User
+
+from . import activity, deletion, rollups
+from .analytics import DEFAULT_CHUNK_SIZE, compute_quiz_analytics
+from .caching import catalog_cache, content_cache, dashboard_cache, recommendation_cache, related_cache
+from .deletion import schedule_deletion
+from .models import (
+    Article, ArticleLike, Assignment, AssignmentSubmission, Certificate, Choice, Course, CourseDailyStats, CourseReview,
+    ArticleSimilarity, ArticleVector, CourseSimilarity,
+    Enrollment, Lesson, Note, Progress, Question, QuestionAnalytics, Quiz, QuizResponse, QuizResult, UploadSession, Video,
+    Webinar, WebinarRegistration,
+)
+from .permissions import INSTRUCTOR_GROUP
+from .recommendations import CoEnrollmentState, store_neighbours
+from .related_articles import rebuild_related, refresh_article, tokenize
+from .rendering import content_hash
+
+
+def create_course(instructor, slug='course', **fields):
+    return Course.objects.create(**{
+        'title': slug.replace('-', ' ').title(), 'slug': slug, 'description': 'd', 'instructor': instructor,
+        'instructor_name': 'Teacher', 'price': 0, 'duration': '1h', **fields,
+    })
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Changelist pages must not run extra queries per row."""
+
+    CHANGELISTS = [
+        'course', 'lesson', 'enrollment', 'progress', 'certificate', 'coursereview', 'assignment',
+        'assignmentsubmission', 'quiz', 'question', 'choice', 'quizresult', 'note', 'video', 'article',
+        'webinar', 'webinarregistration', 'articlelike',
+    ]
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        """One row for every changelist per iteration, each with its own related objects."""
+        for _ in range(count):
+            n = self.rows = self.rows + 1
+            user = User.objects.create_user(username=f'learner{n}', email=f'learner{n}@example.com', password='x')
+            course = Course.objects.create(
+                title=f'Course {n}', slug=f'course-{n}', description='d', instructor=user,
+                instructor_name='Teacher', price=0, duration='1h',
+            )
+            lesson = Lesson.objects.create(course=course, title=f'Lesson {n}', content='Body', duration='5m', order=n)
+            enrollment = Enrollment.objects.create(user=user, course=course)
+            Progress.objects.create(enrollment=enrollment, lesson=lesson)
+            Certificate.objects.create(user=user, course=course, verification_id=f'cert-{n}')
+            CourseReview.objects.create(enrollment=enrollment, course=course, user=user, rating=4)
+            assignment = Assignment.objects.create(course=course, title=f'Assignment {n}', description='d')
+            AssignmentSubmission.objects.create(assignment=assignment, user=user)
+            quiz = Quiz.objects.create(course=course, title=f'Quiz {n}')
+            question = Question.objects.create(quiz=quiz, question_text='Why?')
+            Choice.objects.create(question=question, choice_text='Because', is_correct=True)
+            Choice.objects.create(question=question, choice_text='No reason')
+            QuizResult.objects.create(quiz=quiz, user=user, score=50)
+            Note.objects.create(course=course, content='Note')
+            Video.objects.create(course=course, title=f'Video {n}', url='https://example.com/video')
+            article = Article.objects.create(
+                title=f'Article {n}', author=user, excerpt='e', content='c', status='published',
+            )
+            ArticleLike.objects.create(article=article, user=user)
+            webinar = Webinar.objects.create(
+                title=f'Webinar {n}', presenter=user, description='d',
+                scheduled_date=timezone.now() + timedelta(days=n),
+            )
+            WebinarRegistration.objects.create(webinar=webinar, user=user)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        counts = {}
+        for name in self.CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(f'/admin/courses/{name}/').status_code, 200)
+            counts[name] = len(queries)
+
+        self.add_rows(6)
+        for name in self.CHANGELISTS:
+            with self.subTest(changelist=name), self.assertNumQueries(counts[name]):
+                self.client.get(f'/admin/courses/{name}/')
+
+
+class ChunkedUploadTests(APITestCase):
+    """The resumable upload API against the local filesystem storage."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root, UPLOAD_MIN_CHUNK_SIZE=4096)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        course = Course.objects.create(
+            title='Course', slug='course', description='d', instructor=instructor, instructor_name='Teacher',
+            price=0, duration='1h',
+        )
+        self.assignment = Assignment.objects.create(course=course, title='Essay', description='d')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='x')
+        self.client.force_authenticate(self.student)
+
+    def start(self, data, chunk_size):
+        return self.client.post('/api/courses/api/uploads/', {
+            'assignment': self.assignment.id, 'filename': 'essay.pdf', 'total_size': len(data),
+            'chunk_size': chunk_size, 'sha256': hashlib.sha256(data).hexdigest(),
+        }, format='json')
+
+    def put_chunk(self, session_id, index, body, checksum=None):
+        headers = {'HTTP_X_CHUNK_SHA256': checksum or hashlib.sha256(body).hexdigest()}
+        return self.client.generic(
+            'PUT', f'/api/courses/api/uploads/{session_id}/chunks/{index}/', body,
+            content_type='application/octet-stream', **headers,
+        )
+
+    def test_chunks_in_any_order_assemble_into_the_submission(self):
+        data = bytes(range(256)) * 40  # 10240 bytes, three chunks of 4096
+        response = self.start(data, 4096)
+        self.assertEqual(response.status_code, 201)
+        session_id = response.data['id']
+        self.assertEqual(response.data['missing_chunks'], [[0, 2]])
+
+        self.assertEqual(self.put_chunk(session_id, 1, data[4096:8192]).status_code, 200)
+        response = self.client.get(f'/api/courses/api/uploads/{session_id}/')
+        self.assertEqual(response.data['missing_chunks'], [[0, 0], [2, 2]])
+        for index in (2, 0):
+            response = self.put_chunk(session_id, index, data[index * 4096:(index + 1) * 4096])
+            self.assertEqual(response.status_code, 200)
+        # A retried chunk with the same bytes is accepted again
+        self.assertEqual(self.put_chunk(session_id, 1, data[4096:8192]).status_code, 200)
+
+        response = self.client.post(f'/api/courses/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 200)
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.status, 'complete')
+        with default_storage.open(session.submission.file.name, 'rb') as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertFalse(session.chunks.exists())
+
+    def test_rejects_bad_chunks(self):
+        data = b'x' * 5000
+        session_id = self.start(data, 4096).data['id']
+        self.assertEqual(self.put_chunk(session_id, 0, data[:4096], checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.put_chunk(session_id, 1, data[:4096]).status_code, 400)
+        self.assertEqual(self.put_chunk(session_id, 2, data[:10]).status_code, 400)
+
+        response = self.client.post(f'/api/courses/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing chunks', response.data['error'])
+
+    def test_chunk_size_must_be_positive(self):
+        response = self.start(b'x' * 10, 0)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('chunk_size', response.data)
+
+    def test_rejects_tiny_chunks(self):
+        # 1-byte chunks would turn a large file into millions of chunks
+        response = self.start(b'x' * 10240, 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('chunk_size', response.data)
+        self.assertEqual(self.start(b'x' * 10240, 4095).status_code, 400)
+        # A file smaller than the minimum is fine as a single chunk
+        response = self.start(b'x' * 10, 10)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_chunks'], 1)
+
+
+class GradingQueueTests(APITestCase):
+    """The instructor's queue of ungraded submissions and bulk grading."""
+
+    url = '/api/courses/api/assignment-submissions/grading-queue/'
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        self.course = create_course(self.instructor)
+        self.assignment = Assignment.objects.create(course=self.course, title='Essay', description='d')
+        other_assignment = Assignment.objects.create(course=create_course(other, 'other'), title='Other', description='d')
+        self.submissions = []
+        for n in range(3):
+            student = User.objects.create_user(username=f's{n}', email=f's{n}@example.com', password='x')
+            self.submissions.append(AssignmentSubmission.objects.create(assignment=self.assignment, user=student))
+            AssignmentSubmission.objects.create(assignment=other_assignment, user=student)
+        self.submissions[1].grade = 90
+        self.submissions[1].save()
+        self.client.force_authenticate(self.instructor)
+
+    def test_lists_ungraded_submissions_of_own_courses_oldest_first(self):
+        response = self.client.get(self.url, {'course': self.course.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['id'] for row in response.data['results']], [self.submissions[0].id, self.submissions[2].id],
+        )
+
+    def test_non_numeric_filters_are_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'course': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'assignment': 'abc'}).status_code, 400)
+        response = self.client.get('/api/courses/api/assignment-submissions/', {'assignment': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_grade_only_touches_own_submissions(self):
+        foreign = AssignmentSubmission.objects.exclude(assignment=self.assignment).first()
+        response = self.client.post('/api/courses/api/assignment-submissions/bulk-grade/', {'grades': [
+            {'id': self.submissions[0].id, 'grade': '75.00'}, {'id': foreign.id, 'grade': '10.00'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ids'], [foreign.id])
+        self.submissions[0].refresh_from_db()
+        self.assertIsNone(self.submissions[0].grade)
+
+        response = self.client.post('/api/courses/api/assignment-submissions/bulk-grade/', {'grades': [
+            {'id': self.submissions[0].id, 'grade': '75.00', 'feedback': 'Good'},
+        ]}, format='json')
+        self.assertEqual(response.data, {'graded': 1})
+        self.assertEqual(self.client.get(self.url).data['results'][0]['id'], self.submissions[2].id)
+
+
+class CohortEnrollmentTests(APITestCase):
+    """Bulk enrollment from a CSV, through the API and the admin action."""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor)
+        self.ada = User.objects.create_user(username='ada', email='ada@example.com', password='x')
+
+    def csv(self, *emails):
+        return SimpleUploadedFile('cohort.csv', ('email\n' + '\n'.join(emails)).encode(), content_type='text/csv')
+
+    def test_api_matches_case_insensitively_and_invites_new_accounts(self):
+        self.client.force_authenticate(self.instructor)
+        version = catalog_cache.version('courses')
+        dashboard = dashboard_cache.version(f'user:{self.ada.id}')
+        with mock.patch('courses.cohorts.queue_password_setup_emails', return_value=1) as invite, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/courses/{self.course.id}/bulk-enroll/', {
+                'file': self.csv('Ada@Example.com', 'new@example.com', 'NEW@example.com', 'not-an-email'),
+                'create_missing': True, 'send_invites': True,
+            }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrolled'], 2)
+        self.assertEqual(response.data['created_users'], ['new@example.com'])
+        self.assertEqual(response.data['invalid_emails'], ['not-an-email'])
+        self.assertEqual(response.data['invites_queued'], 1)
+        invite.assert_called_once_with(['new@example.com'])
+        self.assertEqual(User.objects.filter(email__iexact='ada@example.com').count(), 1)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.students_count, 2)
+        # The bulk writes send no signals, so the caches are bumped explicitly
+        self.assertNotEqual(catalog_cache.version('courses'), version)
+        self.assertNotEqual(dashboard_cache.version(f'user:{self.ada.id}'), dashboard)
+
+    def test_admin_action_sends_invites_too(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(admin)
+        with mock.patch('courses.cohorts.queue_password_setup_emails', return_value=1) as invite:
+            response = self.client.post('/admin/courses/course/', {
+                'action': 'bulk_enroll_from_csv', '_selected_action': [self.course.id], 'apply': '1',
+                'file': self.csv('learner@example.com'), 'create_missing': 'on', 'send_invites': 'on',
+            })
+        self.assertEqual(response.status_code, 302)
+        invite.assert_called_once_with(['learner@example.com'])
+        self.assertTrue(Enrollment.objects.filter(course=self.course, user__email='learner@example.com').exists())
+
+
+class LessonProgressTests(APITestCase):
+    """Lesson ordinals and the per-enrollment completion bitmap."""
+
+    def setUp(self):
+        self.learner = User.objects.create_user(username='learner', email='learner@example.com', password='x')
+        self.course = create_course(self.learner, published=True)
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f'Lesson {n}', content='Body', order=n) for n in range(3)
+        ]
+        self.enrollment = Enrollment.objects.create(user=self.learner, course=self.course)
+        self.client.force_authenticate(self.learner)
+
+    def put(self, lesson, completed):
+        return self.client.put(f'/api/courses/{self.course.id}/progress/', {
+            'lesson_id': lesson.id, 'completed': completed,
+        }, format='json')
+
+    def test_ordinals_are_never_reused(self):
+        self.assertEqual([lesson.ordinal for lesson in self.lessons], [0, 1, 2])
+        self.lessons[2].delete()
+        added = Lesson.objects.create(course=self.course, title='Added', content='Body')
+        bulk = Lesson.objects.bulk_create([
+            Lesson(course=self.course, title=f'Bulk {n}', content='Body') for n in range(2)
+        ])
+        self.assertEqual(added.ordinal, 3)
+        self.assertEqual([lesson.ordinal for lesson in bulk], [4, 5])
+
+    def test_setting_and_clearing_bits(self):
+        self.enrollment.mark_lesson(self.lessons[0])
+        self.enrollment.mark_lesson(self.lessons[2])
+        self.assertEqual(self.enrollment.completed_lessons, bytes([0b101]))
+        self.enrollment.mark_lesson(self.lessons[2], completed=False)
+        self.assertEqual(self.enrollment.completed_lessons, bytes([0b1]))
+        self.assertTrue(self.enrollment.has_completed(self.lessons[0]))
+        self.assertFalse(self.enrollment.has_completed(self.lessons[1]))
+        self.enrollment.mark_lesson(self.lessons[0], completed=False)
+        self.assertEqual(self.enrollment.completed_lessons, b'')
+
+    def test_progress_percent_counts_only_current_lessons(self):
+        self.assertAlmostEqual(self.put(self.lessons[0], True).data['course_progress'], 100 / 3)
+        # A string "false" clears the lesson rather than counting as truthy
+        response = self.put(self.lessons[0], 'false')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['course_progress'], 0)
+        self.assertIs(response.data['lesson_completed'], False)
+        self.assertEqual(self.put(self.lessons[0], 'maybe').status_code, 400)
+
+        self.put(self.lessons[0], True)
+        self.put(self.lessons[1], True)
+        # Deleting a completed lesson leaves the other bits valid
+        self.lessons[1].delete()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percent([0, 2]), 50)
+
+        self.assertEqual(self.put(self.lessons[2], 'true').data['course_progress'], 100)
+        self.enrollment.refresh_from_db()
+        self.assertIsNotNone(self.enrollment.completed_at)
+        self.assertTrue(Certificate.objects.filter(user=self.learner, course=self.course).exists())
+
+
+class CoursePackageTests(APITestCase):
+    """Export and re-import of a course package."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        self.course = create_course(self.staff, 'packaged')
+        for n in range(3):
+            Lesson.objects.create(course=self.course, title=f'Lesson {n}', content=f'# Lesson {n}', order=n)
+        quiz = Quiz.objects.create(course=self.course, title='Quiz')
+        for n in range(2):
+            question = Question.objects.create(quiz=quiz, question_text=f'Question {n}')
+            Choice.objects.create(question=question, choice_text='Yes', is_correct=True)
+            Choice.objects.create(question=question, choice_text='No')
+        Assignment.objects.create(course=self.course, title='Essay', description='d', due_date=timezone.now())
+        Note.objects.create(course=self.course, content='Note')
+        Video.objects.create(course=self.course, title='Intro', url='https://example.com/intro')
+        self.client.force_authenticate(self.staff)
+
+    def export(self):
+        response = self.client.get(f'/api/courses/{self.course.id}/export/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def import_(self, data):
+        return self.client.post(
+            '/api/courses/import/', {'file': SimpleUploadedFile('course.zip', data)}, format='multipart',
+        )
+
+    def snapshot(self):
+        return {
+            'lessons': list(Lesson.objects.filter(course=self.course).order_by('ordinal').values_list('id', 'ordinal', 'title')),
+            'questions': list(Question.objects.filter(quiz__course=self.course).order_by('id').values_list('id', 'question_text')),
+            'choices': Choice.objects.filter(question__quiz__course=self.course).count(),
+        }
+
+    def test_round_trip_is_idempotent(self):
+        data = self.export()
+        before = self.snapshot()
+        counts = {'lessons': 3, 'quizzes': 1, 'questions': 2, 'choices': 4, 'assignments': 1, 'notes': 1, 'videos': 1}
+        for _ in range(2):
+            response = self.import_(data)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['counts'], counts)
+            self.assertFalse(response.data['created'])
+            self.assertEqual(self.snapshot(), before)
+
+    def test_reimport_completes_a_partial_course_and_creates_a_missing_one(self):
+        data = self.export()
+        before = self.snapshot()
+        # As if an earlier import stopped after the lessons
+        Choice.objects.filter(question__quiz__course=self.course).last().delete()
+        Note.objects.create(course=self.course, content='Left over')
+        self.assertEqual(self.import_(data).status_code, 200)
+        self.assertEqual(self.snapshot()['lessons'], before['lessons'])
+        self.assertEqual(self.snapshot()['choices'], 4)
+        self.assertEqual(Note.objects.filter(course=self.course).count(), 1)
+
+        self.course.delete()
+        response = self.import_(data)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['created'])
+        course = Course.objects.get(id=response.data['id'])
+        self.assertEqual(
+            list(course.lessons.order_by('ordinal').values_list('ordinal', 'title')),
+            [(ordinal, title) for _, ordinal, title in before['lessons']],
+        )
+        self.assertGreater(course.next_lesson_ordinal, 2)
+
+    def test_invalid_archives_are_rejected(self):
+        self.assertEqual(self.import_(b'not a zip').status_code, 400)
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as package:
+            package.writestr('lessons.jsonl', '{}')
+        response = self.import_(archive.getvalue())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('manifest.json', response.data['error'])
+
+        # A lesson row with a bad ordinal fails cleanly instead of with a 500
+        source = zipfile.ZipFile(io.BytesIO(self.export()))
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as package:
+            for name in source.namelist():
+                if name != 'lessons.jsonl':
+                    package.writestr(name, source.read(name))
+            package.writestr('lessons.jsonl', json.dumps({
+                'ordinal': '1', 'title': 'T', 'content': 'c', 'duration': '', 'order': 0,
+            }))
+        response = self.import_(archive.getvalue())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordinal', response.data['error'])
+
+
+@override_settings(DELETION_BACKGROUND_THREAD=False, DELETION_BATCH_SIZE=2)
+class BackgroundDeletionTests(APITestCase):
+    """Soft-deleting a course and removing its rows in resumable batches."""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor)
+        lessons = [Lesson.objects.create(course=self.course, title=f'L{n}', content='Body') for n in range(3)]
+        for n in range(5):
+            learner = User.objects.create_user(username=f'l{n}', email=f'l{n}@example.com', password='x')
+            enrollment = Enrollment.objects.create(user=learner, course=self.course)
+            Progress.objects.create(enrollment=enrollment, lesson=lessons[n % 3])
+            CourseReview.objects.create(enrollment=enrollment, course=self.course, user=learner, rating=5)
+
+    def remaining(self):
+        return (
+            Enrollment.objects.filter(course_id=self.course.id).count()
+            + Progress.objects.filter(enrollment__course_id=self.course.id).count()
+            + CourseReview.objects.filter(course_id=self.course.id).count()
+            + Lesson.objects.filter(course_id=self.course.id).count()
+        )
+
+    def test_course_is_hidden_at_once_and_removed_by_the_job(self):
+        job = schedule_deletion(self.course, requested_by=self.instructor)
+        self.assertFalse(Course.objects.filter(id=self.course.id).exists())
+        self.assertEqual(Course.all_objects.get(id=self.course.id).slug, f'deleted-{self.course.id}')
+        # The slug is free for a new course straight away
+        create_course(self.instructor)
+
+        raw_deleted = []
+        original = deletion._raw_delete
+
+        def record(model, pks, using):
+            raw_deleted.append(model)
+            return original(model, pks, using)
+
+        with mock.patch('courses.deletion._raw_delete', record):
+            job = deletion.run_job(job.id)
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(Course.all_objects.filter(id=self.course.id).exists())
+        self.assertEqual(self.remaining(), 0)
+        self.assertEqual(job.progress['courses.CourseReview via enrollment__course'], 5)
+        # Reviews have delete receivers (rating counters), so they go through the ORM
+        self.assertIn(Progress, raw_deleted)
+        self.assertNotIn(CourseReview, raw_deleted)
+
+    def test_failed_job_resumes_by_step_label_after_the_plan_changes(self):
+        job = schedule_deletion(self.course)
+        full_plan = deletion.plan(Course)
+        # An older deploy whose plan lacked the review steps fails partway
+        old_plan = [step for step in full_plan if step[1] is not CourseReview]
+        calls = {'batches': 0}
+        original = deletion._run_batch
+
+        def flaky(*args):
+            calls['batches'] += 1
+            if calls['batches'] == 7:
+                raise RuntimeError('worker lost')
+            return original(*args)
+
+        with mock.patch('courses.deletion.plan', return_value=old_plan), \
+                mock.patch('courses.deletion._run_batch', flaky):
+            job = deletion.run_job(job.id)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('worker lost', job.error)
+        finished = list(job.completed_steps)
+        self.assertTrue(finished)
+
+        job = deletion.run_job(job.id)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(self.remaining(), 0)
+        self.assertEqual(job.completed_steps[:len(finished)], finished)
+        self.assertCountEqual(job.completed_steps, [deletion._label(step) for step in full_plan])
+        self.assertEqual(job.steps_total, len(full_plan))
+
+    def test_delete_endpoint_permissions(self):
+        url = f'/api/courses/api/viewset/{self.course.id}/'
+        learner = User.objects.get(username='l0')
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        create_course(other, 'other')
+        self.assertEqual(self.client.delete(url).status_code, 401)
+        for user in (learner, other):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.delete(url).status_code, 403)
+        self.client.force_authenticate(self.instructor)
+        self.assertEqual(self.client.delete(url).status_code, 202)
+
+
+class InstructorPermissionTests(APITestCase):
+
+    def test_members_of_the_instructors_group_can_create_their_first_course(self):
+        user = User.objects.create_user(username='new', email='new@example.com', password='x', first_name='Ada')
+        self.client.force_authenticate(user)
+        data = {'title': 'First course', 'description': 'd', 'duration': '1h', 'price': '0.00', 'level': 'beginner'}
+        self.assertEqual(self.client.post('/api/courses/api/viewset/', data).status_code, 403)
+
+        user.groups.add(Group.objects.get(name=INSTRUCTOR_GROUP))
+        response = self.client.post('/api/courses/api/viewset/', data)
+        self.assertEqual(response.status_code, 201)
+        course = Course.objects.get(id=response.data['id'])
+        self.assertEqual((course.instructor, course.instructor_name, course.slug), (user, 'Ada', 'first-course'))
+
+
+class CourseCloneTests(APITestCase):
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor, 'intro', published=True)
+        lessons = [Lesson.objects.create(course=self.course, title=f'L{n}', content='Body', order=n) for n in range(3)]
+        lessons[0].delete()
+        quiz = Quiz.objects.create(course=self.course, title='Quiz')
+        question = Question.objects.create(quiz=quiz, question_text='Why?')
+        Choice.objects.create(question=question, choice_text='Because', is_correct=True)
+        Enrollment.objects.create(user=self.instructor, course=self.course)
+        self.client.force_authenticate(self.instructor)
+
+    def clone(self, **data):
+        return self.client.post(f'/api/courses/{self.course.id}/clone/', data, format='json')
+
+    def test_copies_content_but_not_learner_data(self):
+        response = self.clone(published='false')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['copied'], {
+            'lessons': 2, 'quizzes': 1, 'questions': 1, 'choices': 1, 'assignments': 0, 'notes': 0, 'videos': 0,
+        })
+        copy = Course.objects.get(id=response.data['id'])
+        self.assertEqual((copy.title, copy.slug, copy.published), ('Intro (copy)', 'intro-copy', False))
+        self.assertEqual(list(copy.lessons.order_by('ordinal').values_list('ordinal', 'title')), [(0, 'L1'), (1, 'L2')])
+        self.assertEqual(Choice.objects.get(question__quiz__course=copy).choice_text, 'Because')
+        self.assertFalse(copy.enrollments.exists())
+        self.assertEqual(self.clone().data['slug'], 'intro-copy-2')
+
+    def test_a_slug_taken_concurrently_is_retried(self):
+        # Another clone inserted this slug after unique_slug looked
+        create_course(self.instructor, 'intro-copy')
+        with mock.patch('courses.cloning.unique_slug', return_value='intro-copy'):
+            response = self.clone()
+        self.assertEqual(response.status_code, 201)
+        self.assertRegex(response.data['slug'], r'^intro-copy-[0-9a-f]{6}$')
+        self.assertEqual(Lesson.objects.filter(course_id=response.data['id']).count(), 2)
+
+    def test_only_the_instructor_may_clone(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.clone().status_code, 403)
+
+
+class LessonOrderTests(APITestCase):
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor)
+        self.client.force_authenticate(self.instructor)
+
+    def lessons(self, *orders):
+        return [Lesson.objects.create(course=self.course, title=f'L{n}', content='c', order=order)
+                for n, order in enumerate(orders)]
+
+    def move(self, lesson, after=None):
+        return self.client.post(
+            f'/api/courses/{self.course.id}/lessons/{lesson.id}/move/', {'after': after and after.id}, format='json',
+        )
+
+    def orders(self):
+        return list(self.course.lessons.order_by('order', 'id').values_list('title', 'order'))
+
+    def test_move_takes_the_midpoint_and_updates_one_row(self):
+        first, second, third = self.lessons(1024, 2048, 3072)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.move(third, after=first).status_code, 200)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(self.orders(), [('L0', 1024), ('L2', 1536), ('L1', 2048)])
+
+        self.move(second)
+        self.assertEqual(self.orders()[0], ('L1', 512))
+        self.move(first, after=second)
+        self.assertEqual(self.orders(), [('L1', 512), ('L0', 1024), ('L2', 1536)])
+
+    def test_neighbours_without_room_force_a_renumber(self):
+        first, second, third = self.lessons(5, 6, 7)
+        response = self.move(third, after=first)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(lesson['title'], lesson['order']) for lesson in response.data['lessons']],
+            [('L0', 1024), ('L2', 2048), ('L1', 3072)],
+        )
+        # Moving to the front of a lesson at order 1 leaves no room above zero either
+        Lesson.objects.filter(id=first.id).update(order=1)
+        self.move(second)
+        self.assertEqual(self.orders(), [('L1', 1024), ('L0', 2048), ('L2', 3072)])
+
+    def test_reorder_needs_every_lesson_once(self):
+        first, second, third = self.lessons(1024, 2048, 3072)
+        url = f'/api/courses/{self.course.id}/lessons/reorder/'
+        for lessons in ([first.id, second.id], [first.id, first.id, second.id, third.id], [first.id, second.id, 999]):
+            self.assertEqual(self.client.post(url, {'lessons': lessons}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'lessons': [third.id, first.id, second.id]}, format='json').status_code, 200)
+        self.assertEqual(self.orders(), [('L2', 1024), ('L0', 2048), ('L1', 3072)])
+
+    def test_errors_and_permissions(self):
+        first, second = self.lessons(1024, 2048)
+        other_course = create_course(self.instructor, 'other')
+        stranger = Lesson.objects.create(course=other_course, title='X', content='c', order=1024)
+        self.assertEqual(self.move(first, after=stranger).status_code, 400)
+        self.assertEqual(self.move(first, after=first).status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(username='other', email='o@example.com', password='x'))
+        self.assertEqual(self.move(second).status_code, 403)
+
+
+@override_settings(ROLLUP_LAG_SECONDS=900)
+class CourseRollupTests(TestCase):
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor)
+        self.now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def enroll(self, username, enrolled_at, **fields):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='x')
+        enrollment = Enrollment.objects.create(user=user, course=self.course, **fields)
+        Enrollment.objects.filter(id=enrollment.id).update(enrolled_at=enrolled_at)
+        return enrollment
+
+    def stats(self):
+        return list(CourseDailyStats.objects.values_list('date', 'enrollments', 'completions', 'quiz_attempts', 'quiz_passes'))
+
+    def test_rerunning_gives_the_same_rows(self):
+        yesterday = self.now - timedelta(days=1)
+        self.enroll('ada', yesterday, completed_at=self.now)
+        self.enroll('bob', self.now)
+        quiz = Quiz.objects.create(course=self.course, title='Quiz')
+        QuizResult.objects.create(quiz=quiz, user=self.instructor, score=90, passed=True)
+        QuizResult.objects.create(quiz=quiz, user=self.instructor, score=10, passed=False)
+
+        rollups.run_rollup(now=self.now)
+        expected = [
+            (timezone.localdate(yesterday), 1, 0, 0, 0),
+            (timezone.localdate(self.now), 1, 1, 2, 1),
+        ]
+        self.assertEqual(self.stats(), expected)
+        rollups.run_rollup(since=yesterday, now=self.now)
+        rollups.run_rollup(now=self.now)
+        self.assertEqual(self.stats(), expected)
+
+    def test_rows_committed_late_inside_the_lag_window_are_counted(self):
+        just_after_midnight = self.now.replace(hour=0, minute=5)
+        self.enroll('ada', just_after_midnight)
+        rollups.run_rollup(now=just_after_midnight)
+        # Stamped the previous day, but its transaction committed after the run
+        self.enroll('bob', just_after_midnight - timedelta(minutes=7))
+        rollups.run_rollup(now=just_after_midnight + timedelta(minutes=5))
+        self.assertEqual(self.stats(), [
+            (timezone.localdate(just_after_midnight) - timedelta(days=1), 1, 0, 0, 0),
+            (timezone.localdate(just_after_midnight), 1, 0, 0, 0),
+        ])
+
+    def test_backfill_uses_certificates_then_progress(self):
+        migration = importlib.import_module('courses.migrations.0015_backfill_enrollment_completed_at')
+        lessons = [Lesson.objects.create(course=self.course, title=f'L{n}', content='c') for n in range(2)]
+        certified = self.enroll('ada', self.now)
+        certificate = Certificate.objects.create(user=certified.user, course=self.course, verification_id='v1')
+        finished = self.enroll('bob', self.now)
+        for lesson, completed_at in zip(lessons, [self.now - timedelta(days=2), None]):
+            Progress.objects.create(enrollment=finished, lesson=lesson, completed=True, completed_at=completed_at)
+        halfway = self.enroll('cy', self.now)
+        Progress.objects.create(enrollment=halfway, lesson=lessons[0], completed=True, completed_at=self.now)
+
+        migration.backfill_completed_at(apps, None)
+        completed = dict(Enrollment.objects.values_list('user__username', 'completed_at'))
+        self.assertEqual(completed['ada'], certificate.issued_date)
+        self.assertEqual(completed['bob'], self.now - timedelta(days=2))
+        self.assertIsNone(completed['cy'])
+
+
+class QuizItemAnalyticsTests(APITestCase):
+
+    # Correctness per attempt (rows) and question (columns)
+    MATRIX = [[1, 1, 1], [1, 1, 0], [1, 0, 0], [0, 0, 0]]
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.quiz = Quiz.objects.create(course=create_course(self.instructor), title='Quiz')
+        questions = [Question.objects.create(quiz=self.quiz, question_text=f'Q{n}') for n in range(3)]
+        self.choices = [
+            (Choice.objects.create(question=question, choice_text='right', is_correct=True),
+             Choice.objects.create(question=question, choice_text='wrong'))
+            for question in questions
+        ]
+        # Another quiz's attempt interleaves with this quiz's ids
+        other_quiz = Quiz.objects.create(course=self.quiz.course, title='Other')
+        for n, row in enumerate(self.MATRIX):
+            learner = User.objects.create_user(username=f'learner{n}', email=f'l{n}@example.com', password='x')
+            result = QuizResult.objects.create(quiz=self.quiz, user=learner, score=sum(row), passed=sum(row) > 1)
+            for question, (right, wrong), correct in zip(questions, self.choices, row):
+                QuizResponse.objects.create(
+                    result=result, question=question, choice=right if correct else wrong, is_correct=correct,
+                )
+            QuizResult.objects.create(quiz=other_quiz, user=learner, score=0)
+
+    def test_statistics_match_the_full_matrix_for_any_chunk_size(self):
+        matrix = np.array(self.MATRIX, dtype=float)
+        totals = matrix.sum(axis=1)
+        p = matrix.mean(axis=0)
+        kr20 = 3 / 2 * (1 - (p * (1 - p)).sum() / totals.var())
+        for chunk_size in (1, 3, DEFAULT_CHUNK_SIZE):
+            analytics = compute_quiz_analytics(self.quiz, chunk_size=chunk_size)
+            self.assertEqual(analytics.attempts, 4)
+            self.assertAlmostEqual(analytics.mean_score, 1.5)
+            self.assertAlmostEqual(analytics.reliability, kr20)
+            rows = QuestionAnalytics.objects.filter(question__quiz=self.quiz).order_by('question_id')
+            for n, row in enumerate(rows):
+                self.assertAlmostEqual(row.difficulty, p[n])
+                rest = totals - matrix[:, n]
+                self.assertAlmostEqual(row.discrimination, np.corrcoef(matrix[:, n], rest)[0, 1])
+                right, wrong = self.choices[n]
+                self.assertEqual(row.choice_rates, {str(right.id): p[n], str(wrong.id): 1 - p[n]})
+        self.assertEqual(QuestionAnalytics.objects.count(), 3)
+
+    def test_analytics_are_for_the_instructor(self):
+        url = f'/api/courses/api/quizzes/{self.quiz.id}/analytics/'
+        self.client.force_authenticate(self.instructor)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        compute_quiz_analytics(self.quiz)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_authenticate(User.objects.get(username='learner0'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class ActivityEventTests(APITransactionTestCase):
+    """Partition tables are created outside a transaction, so no TestCase here."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='x')
+        self.client.force_authenticate(self.user)
+        # No writer thread; the test flushes by hand
+        patcher = mock.patch.object(activity.activity_buffer, '_pid', os.getpid())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.drop_partitions)
+
+    def drop_partitions(self):
+        activity.activity_buffer.flush()
+        for month in activity.stored_months():
+            activity.drop_partition(month)
+
+    def stored(self):
+        now = timezone.now()
+        events = []
+        for queryset in activity.event_querysets(now - timedelta(days=400), now + timedelta(days=1)):
+            events += queryset.values_list('event_type', 'occurred_at', 'user_id')
+        return sorted(events, key=lambda event: event[1])
+
+    def test_events_are_buffered_then_written_per_month(self):
+        now = timezone.now()
+        last_month = activity.month_start(activity.month_of(now)) - timedelta(days=3)
+        events = [
+            {'event_type': 'lesson_opened', 'lesson_id': 1},
+            {'event_type': 'video_played', 'occurred_at': last_month.isoformat()},
+            # Future times are clamped, expired months are dropped
+            {'event_type': 'quiz_started', 'occurred_at': (now + timedelta(days=3)).isoformat()},
+            {'event_type': 'article_read', 'occurred_at': (now - timedelta(days=600)).isoformat()},
+        ]
+        response = self.client.post('/api/courses/activity/', {'events': events}, format='json')
+        self.assertEqual((response.status_code, response.data), (202, {'accepted': 3, 'rejected': 1}))
+        self.assertEqual(self.stored(), [])
+
+        self.assertEqual(activity.activity_buffer.flush(), 3)
+        stored = self.stored()
+        self.assertEqual([event[0] for event in stored], ['video_played', 'lesson_opened', 'quiz_started'])
+        self.assertLessEqual(stored[-1][1], timezone.now())
+        self.assertEqual({event[2] for event in stored}, {self.user.id})
+        self.assertEqual(activity.stored_months(), sorted({activity.month_of(last_month), activity.month_of(now)}))
+
+    def test_invalid_batches_are_rejected_whole(self):
+        url = '/api/courses/activity/'
+        self.assertEqual(self.client.post(url, [], format='json').status_code, 400)
+        response = self.client.post(url, [{'event_type': 'lesson_opened'}, {'event_type': 'napped'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(activity.activity_buffer.stats()['pending'], 0)
+
+
+class ActivityBufferTests(TestCase):
+
+    def setUp(self):
+        self.buffer = activity.ActivityBuffer(size=100, interval=60, max_pending=3)
+        self.buffer._pid = os.getpid()
+
+    def test_overflow_is_dropped_and_counted(self):
+        self.buffer.add([{'n': n} for n in range(5)])
+        self.assertEqual(self.buffer.stats(), {
+            'accepted': 3, 'written': 0, 'dropped': 2, 'flushes': 0, 'failed_flushes': 0, 'pending': 3,
+        })
+
+    def test_database_errors_keep_the_batch_and_other_errors_drop_it(self):
+        self.buffer.add([{'n': 0}, {'n': 1}])
+        with mock.patch.object(activity, 'write_events', side_effect=DatabaseError('locked')), \
+                self.assertLogs('courses.activity', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.buffer.add([{'n': 2}, {'n': 3}])
+        # Retried oldest first; the newest no longer fits
+        self.assertEqual(self.buffer._pending, [{'n': 0}, {'n': 1}, {'n': 2}])
+
+        with mock.patch.object(activity, 'write_events', return_value=3) as write:
+            self.assertEqual(self.buffer.flush(), 3)
+        write.assert_called_once_with([{'n': 0}, {'n': 1}, {'n': 2}])
+
+        self.buffer.add([{'n': 4}])
+        with mock.patch.object(activity, 'write_events', side_effect=TypeError('bad event')), \
+                self.assertLogs('courses.activity', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats(), {
+            'accepted': 4, 'written': 3, 'dropped': 2, 'flushes': 1, 'failed_flushes': 2, 'pending': 0,
+        })
+
+
+class CourseRecommendationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        recommendation_cache.local.clear()
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.a, self.b, self.c, self.d = (create_course(self.instructor, slug, published=True) for slug in 'abcd')
+        self.learners = [
+            User.objects.create_user(username=f'learner{n}', email=f'l{n}@example.com', password='x') for n in range(5)
+        ]
+        self.enroll({0: 'ab', 1: 'abc', 2: 'ac', 3: 'ab'})
+
+    def enroll(self, plan):
+        courses = {'a': self.a, 'b': self.b, 'c': self.c, 'd': self.d}
+        for learner, slugs in plan.items():
+            for slug in slugs:
+                Enrollment.objects.create(user=self.learners[learner], course=courses[slug])
+
+    def test_incremental_updates_match_a_full_rebuild(self):
+        state = CoEnrollmentState.build(chunk_size=2)
+        # A learner with earlier enrollments, a new learner and a new course
+        self.enroll({2: 'bd', 4: 'ad'})
+        self.assertEqual(state.update(chunk_size=2), 4)
+        path = os.path.join(tempfile.mkdtemp(), 'state.npz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        state.save(path)
+        state = CoEnrollmentState.load(path)
+
+        rebuilt = CoEnrollmentState.build()
+        self.assertEqual(state.course_ids.tolist(), rebuilt.course_ids.tolist())
+        self.assertEqual(state.matrix.toarray().tolist(), rebuilt.matrix.toarray().tolist())
+        self.assertEqual(state.last_id, Enrollment.objects.latest('id').id)
+        self.assertEqual(state.update(), 0)
+
+    def test_neighbours_are_ranked_by_cosine_similarity(self):
+        self.assertEqual(store_neighbours(CoEnrollmentState.build(), k=2, min_support=1), 6)
+        row = CourseSimilarity.objects.get(course=self.a, similar_course=self.b)
+        # 3 shared learners of 4 and 3
+        self.assertEqual(row.co_enrollments, 3)
+        self.assertAlmostEqual(row.score, 3 / 12 ** 0.5)
+
+        url = f'/api/courses/{self.a.id}/recommendations/'
+        self.client.force_authenticate(self.learners[0])
+        self.assertEqual([course['id'] for course in self.client.get(url).data['results']], [self.b.id, self.c.id])
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).data['results']), 1)
+        Course.objects.filter(id=self.b.id).update(published=False)
+        store_neighbours(CoEnrollmentState.build(), k=2, min_support=2)
+        self.assertEqual([course['id'] for course in self.client.get(url).data['results']], [self.c.id])
+
+
+@override_settings(RELATED_ARTICLES_TOP_N=2)
+class RelatedArticleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        related_cache.local.clear()
+        self.author = User.objects.create_user(username='writer', email='writer@example.com', password='x')
+        self.python = self.article('Python packaging', 'python, packaging', 'Wheels and virtualenvs for python code')
+        self.django = self.article('Django with python', 'python, django', 'Views, models and python packaging')
+        self.bread = self.article('Sourdough bread', 'baking', 'Starter, flour and a hot oven')
+        self.draft = self.article('Python drafts', 'python', 'Unfinished python packaging notes', status='draft')
+
+    def article(self, title, tags, content, status='published'):
+        return Article.objects.create(
+            title=title, tags=tags, excerpt=content, content=content, status=status, author=self.author,
+        )
+
+    def related(self, article):
+        return list(ArticleSimilarity.objects.filter(article=article).order_by('-score').values_list('related', flat=True))
+
+    def test_tokenize_drops_markup_links_and_stop_words(self):
+        self.assertEqual(
+            tokenize('<p>The <b>C++</b> guide &amp; https://example.com/x for them</p>'), ['c++', 'guide'],
+        )
+
+    def test_rebuild_ranks_published_articles_by_shared_terms(self):
+        rebuild_related()
+        self.assertFalse(ArticleVector.objects.filter(article=self.draft).exists())
+        self.assertEqual(self.related(self.python), [self.django.id])
+        self.assertEqual(self.related(self.bread), [])
+        score = ArticleSimilarity.objects.get(article=self.python).score
+        self.assertTrue(0 < score < 1)
+
+        response = self.client.get(f'/api/courses/articles/{self.python.slug}/')
+        self.assertEqual([row['id'] for row in response.data['related_articles']], [self.django.id])
+
+    def test_refresh_slots_an_article_into_lists_and_removes_unpublished_ones(self):
+        rebuild_related()
+        self.draft.status = 'published'
+        self.draft.save()
+        refresh_article(self.draft)
+        self.assertEqual(set(self.related(self.draft)), {self.python.id, self.django.id})
+        self.assertIn(self.draft.id, self.related(self.python))
+        self.assertEqual(self.related(self.bread), [])
+
+        # Same lists as a rebuild; scores differ until then, as IDF weights drift
+        articles = (self.python, self.django, self.draft)
+        incremental = {article.id: set(self.related(article)) for article in articles}
+        rebuild_related()
+        self.assertEqual({article.id: set(self.related(article)) for article in articles}, incremental)
+
+        self.django.status = 'archived'
+        self.django.save()
+        refresh_article(self.django)
+        self.assertNotIn(self.django.id, self.related(self.python))
+        self.assertFalse(ArticleVector.objects.filter(article=self.django).exists())
+
+
+class CourseRatingTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.course = create_course(self.instructor, published=True)
+        self.learners = []
+        for n in range(3):
+            learner = User.objects.create_user(username=f'learner{n}', email=f'l{n}@example.com', password='x')
+            Enrollment.objects.create(user=learner, course=self.course)
+            self.learners.append(learner)
+
+    def review(self, learner, rating):
+        self.client.force_authenticate(learner)
+        return self.client.post(f'/api/courses/{self.course.id}/reviews/', {'rating': rating}, format='json')
+
+    def aggregates(self):
+        self.course.refresh_from_db()
+        return self.course.rating, self.course.rating_count, self.course.rating_histogram
+
+    def test_creates_edits_and_deletes_move_the_aggregates(self):
+        self.assertEqual(self.review(self.learners[0], 5).status_code, 201)
+        review_id = self.review(self.learners[1], 2).data['id']
+        self.assertEqual(self.aggregates(), (3.5, 2, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}))
+
+        self.client.patch(f'/api/courses/reviews/{review_id}/', {'rating': 4}, format='json')
+        self.assertEqual(self.aggregates(), (4.5, 2, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}))
+        self.client.delete(f'/api/courses/reviews/{review_id}/')
+        self.assertEqual(self.aggregates(), (5.0, 1, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}))
+        # Unenrolling cascades to the review
+        Enrollment.objects.filter(user=self.learners[0]).delete()
+        self.assertEqual(self.aggregates(), (0.0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}))
+
+    def test_only_one_review_per_learner_even_when_racing(self):
+        self.assertEqual(self.review(self.learners[0], 5).status_code, 201)
+        self.assertEqual(self.review(self.learners[0], 1).status_code, 400)
+        # The duplicate check passed, as for a concurrent post; the constraint catches it
+        with mock.patch.object(CourseReview.objects, 'filter', return_value=CourseReview.objects.none()):
+            self.assertEqual(self.review(self.learners[0], 1).status_code, 400)
+        self.assertEqual(self.aggregates()[:2], (5.0, 1))
+        stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='x')
+        self.assertEqual(self.review(stranger, 3).status_code, 403)
+
+    def test_reconcile_repairs_drift(self):
+        self.review(self.learners[0], 5)
+        self.review(self.learners[1], 3)
+        Course.objects.filter(id=self.course.id).update(rating=1.0, rating_count=7, ratings_5=0)
+        out = io.StringIO()
+        call_command('reconcile_course_ratings', stdout=out)
+        self.assertIn('Checked 1 courses, 1 fixed', out.getvalue())
+        self.assertEqual(self.aggregates(), (4.0, 2, {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}))
+
+
+class RenderedContentTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        content_cache.local.clear()
+        self.instructor = User.objects.create_user(username='teacher', email='teacher@example.com', password='x')
+        self.learner = User.objects.create_user(username='ada', email='ada@example.com', password='x')
+        self.course = create_course(self.instructor, published=True)
+        Enrollment.objects.create(user=self.learner, course=self.course)
+        self.lesson = Lesson.objects.create(
+            course=self.course, title='L', content='# Hi\n\n<script>x()</script> [go](javascript:alert(1))',
+        )
+        self.url = f'/api/courses/api/lessons/{self.lesson.id}/content/'
+        self.client.force_authenticate(self.learner)
+
+    def test_html_is_escaped_and_served_with_the_content_hash_as_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<h1>Hi</h1>', response.data['html'])
+        self.assertIn('&lt;script&gt;', response.data['html'])
+        self.assertNotIn('href="javascript:', response.data['html'])
+        etag = response['ETag']
+        self.assertEqual(etag, f'"{content_hash(self.lesson.content)}"')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.lesson.content = 'Changed'
+        self.lesson.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_identical_content_renders_once_and_unhashed_rows_are_hashed_on_read(self):
+        self.client.get(self.url)
+        copy = Lesson.objects.create(course=self.course, title='Copy', content=self.lesson.content)
+        Lesson.objects.filter(id=copy.id).update(content_hash='')
+        with mock.patch('courses.rendering.render_markdown') as render:
+            response = self.client.get(f'/api/courses/api/lessons/{copy.id}/content/')
+        render.assert_not_called()
+        self.assertEqual(response.data['content_hash'], content_hash(self.lesson.content))
+        self.assertEqual(Lesson.objects.get(id=copy.id).content_hash, content_hash(self.lesson.content))
+
+    def test_lessons_are_for_enrolled_learners_the_instructor_and_staff(self):
+        self.client.force_authenticate(User.objects.create_user(username='bob', email='bob@example.com', password='x'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_authenticate(self.instructor)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        Course.objects.filter(id=self.course.id).update(published=False)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_authenticate(self.learner)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_published_article_bodies_are_public(self):
+        article = Article.objects.create(
+            title='Post', excerpt='e', content='*hello*', status='published', author=self.instructor,
+        )
+        self.client.force_authenticate(None)
+        response = self.client.get(f'/api/courses/articles/{article.slug}/content/')
+        self.assertEqual(response.data['html'], '<p><em>hello</em></p>\n')
@@ -0,0 +1,6 @@
+from rest_framework.throttling import UserRateThrottle
+
+
+class ActivityRateThrottle(UserRateThrottle):
+    """Per-user cap on activity event batches (``activity`` rate)."""
+    scope = 'activity'
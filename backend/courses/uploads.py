@@ -0,0 +1,190 @@
+"""
+Resumable chunked uploads for assignment submissions.
+
+Each chunk is streamed from the request into a small spooled buffer while
+its SHA-256 is computed, then written to the configured storage backend
+as its own object. Completing a session streams the chunk objects back out
+of storage, in order, into the final file, so a worker never holds more
+than one read block of the upload in memory whether storage is the local
+filesystem or GCS.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import AssignmentSubmission, UploadChunk
+
+READ_BLOCK_SIZE = 256 * 1024
+# Chunk bodies above this size spill from memory to a temporary file
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+def missing_ranges(total_chunks, received):
+    """
+    The chunk indexes below ``total_chunks`` absent from the sorted iterable
+    ``received``, as inclusive ``[first, last]`` ranges.
+    """
+    ranges = []
+    expected = 0
+    for index in received:
+        if index > expected:
+            ranges.append([expected, index - 1])
+        expected = index + 1
+    if expected < total_chunks:
+        ranges.append([expected, total_chunks - 1])
+    return ranges
+
+
+def store_chunk(session, index, stream, expected_sha256=None):
+    """
+    Persist chunk ``index`` of ``session`` from the file-like ``stream``.
+    Re-sending a chunk that was already stored with the same checksum is a
+    no-op, which lets clients retry blindly after a dropped connection.
+    """
+    if session.status != 'pending':
+        raise UploadError('Upload session is no longer accepting chunks')
+    if index >= session.total_chunks:
+        raise UploadError('Chunk index out of range')
+
+    last = index == session.total_chunks - 1
+    expected_size = session.total_size - index * session.chunk_size if last else session.chunk_size
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as buffer:
+        while True:
+            block = stream.read(READ_BLOCK_SIZE) if stream is not None else b''
+            if not block:
+                break
+            size += len(block)
+            if size > expected_size:
+                raise UploadError(f'Chunk exceeds the expected size of {expected_size} bytes')
+            digest.update(block)
+            buffer.write(block)
+
+        if size != expected_size:
+            raise UploadError(f'Chunk is {size} bytes, expected {expected_size}')
+        checksum = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != checksum:
+            raise UploadError('Chunk checksum mismatch')
+
+        existing = UploadChunk.objects.filter(session=session, index=index).first()
+        if existing and existing.sha256 == checksum:
+            return existing
+
+        name = session.chunk_name(index)
+        buffer.seek(0)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, File(buffer, name=name))
+
+    chunk, _ = UploadChunk.objects.update_or_create(
+        session=session, index=index,
+        defaults={'size': size, 'sha256': checksum},
+    )
+    return chunk
+
+
+class ChunkedStorageFile:
+    """
+    Read-only, forward-streaming view over a session's chunk objects. It
+    supports ``seek(0)`` so storage backends that rewind before uploading
+    (GCS) can consume it.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.size = session.total_size
+        self.name = session.filename
+        self._reset()
+
+    def _reset(self):
+        self._index = 0
+        self._current = None
+        self._position = 0
+        self.digest = hashlib.sha256()
+
+    def _close_current(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = READ_BLOCK_SIZE
+        while self._index < self.session.total_chunks:
+            if self._current is None:
+                self._current = default_storage.open(self.session.chunk_name(self._index), 'rb')
+            data = self._current.read(size)
+            if data:
+                self._position += len(data)
+                self.digest.update(data)
+                return data
+            self._close_current()
+            self._index += 1
+        return b''
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if offset != 0 or whence != os.SEEK_SET:
+            raise OSError('ChunkedStorageFile can only be rewound to the start')
+        self._close_current()
+        self._reset()
+        return 0
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._close_current()
+
+
+def complete_session(session):
+    """Assemble the chunks into the final file and attach it to a submission."""
+    missing = missing_ranges(session.total_chunks, session.chunks.order_by('index').values_list('index', flat=True))
+    if missing:
+        raise UploadError(f'Missing chunks: {missing[:20]}')
+
+    source = ChunkedStorageFile(session)
+    filename = get_valid_filename(os.path.basename(session.filename)) or 'upload'
+    target = f'{AssignmentSubmission.file.field.upload_to}{session.assignment_id}/{session.id}/{filename}'
+    try:
+        stored_name = default_storage.save(target, File(source, name=filename))
+    finally:
+        source.close()
+
+    if session.sha256 and session.sha256.lower() != source.digest.hexdigest():
+        default_storage.delete(stored_name)
+        raise UploadError('File checksum mismatch')
+
+    with transaction.atomic():
+        submission = session.submission
+        if submission is None:
+            submission = AssignmentSubmission(assignment=session.assignment, user=session.user)
+        submission.file = stored_name
+        submission.save()
+        session.submission = submission
+        session.status = 'complete'
+        session.completed_at = timezone.now()
+        session.save(update_fields=['submission', 'status', 'completed_at', 'updated_at'])
+
+    discard_chunks(session)
+    return submission
+
+
+def discard_chunks(session):
+    for index in session.chunks.values_list('index', flat=True):
+        name = session.chunk_name(index)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+    session.chunks.all().delete()
+
@@ -3,7 +3,7 @@ from . import views
 from .views import (
     CourseViewSet, EnrollView, MyEnrollmentsView,
     CourseEnrolledUsersView, UnenrollView, LessonViewSet,
-    AssignmentViewSet, AssignmentSubmissionViewSet, QuizViewSet, QuizResultViewSet
+    AssignmentViewSet, AssignmentSubmissionViewSet, UploadSessionViewSet, QuizViewSet, QuizResultViewSet
 )
 from rest_framework.routers import DefaultRouter
 
@@ -13,6 +13,7 @@ router.register(r'lessons', LessonViewSet, basename='lesson')
 router.register(r'viewset', CourseViewSet, basename='course')
 router.register(r'assignments', AssignmentViewSet, basename='assignment')
 router.register(r'assignment-submissions', AssignmentSubmissionViewSet, basename='assignment-submission')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 router.register(r'quizzes', QuizViewSet, basename='quiz')
 router.register(r'quiz-results', QuizResultViewSet, basename='quiz-result')
 
@@ -31,7 +32,17 @@ urlpatterns = [
     path('', views.CourseListView.as_view(), name='course_list'),
     path('<int:pk>/', views.CourseDetailView.as_view(), name='course_detail'),
     path('<int:course_id>/enroll/', views.enroll_course, name='enroll_course'),
+    path('<int:course_id>/bulk-enroll/', views.BulkEnrollView.as_view(), name='bulk_enroll'),
     path('<int:course_id>/progress/', views.update_progress, name='update_progress'),
+    path('<int:course_id>/export/', views.export_course_package, name='export_course'),
+    path('import/', views.import_course_package, name='import_course'),
+    path('<int:course_id>/clone/', views.clone_course_view, name='clone_course'),
+    path('deletions/<int:pk>/', views.deletion_job_status, name='deletion_job_status'),
+    path('<int:course_id>/lessons/reorder/', views.reorder_course_lessons, name='reorder_lessons'),
+    path('<int:course_id>/lessons/<int:lesson_id>/move/', views.move_course_lesson, name='move_lesson'),
+    path('<int:course_id>/reviews/', views.CourseReviewListCreateView.as_view(), name='course_reviews'),
+    path('reviews/<int:pk>/', views.CourseReviewDetailView.as_view(), name='course_review_detail'),
+    path('<int:course_id>/recommendations/', views.course_recommendations, name='course_recommendations'),
     
     # User courses and certificates
     path('user/courses/', views.user_courses, name='user_courses'),
@@ -41,6 +52,7 @@ urlpatterns = [
     # Articles
     path('articles/', views.ArticleListCreateView.as_view(), name='article-list'),
     path('articles/<slug:slug>/', views.ArticleDetailView.as_view(), name='article-detail'),
+    path('articles/<slug:slug>/content/', views.article_content, name='article-content'),
     path('articles/<slug:slug>/like/', views.like_article, name='like-article'),
     
     # Webinars
@@ -48,5 +60,11 @@ urlpatterns = [
     path('webinars/<slug:slug>/', views.WebinarDetailView.as_view(), name='webinar-detail'),
     path('webinars/<slug:slug>/register/', views.register_webinar, name='register-webinar'),
     path('webinars/<slug:slug>/unregister/', views.unregister_webinar, name='unregister-webinar'),
+
+    # Instructor analytics (daily rollups)
+    path('instructor/analytics/', views.instructor_analytics, name='instructor-analytics'),
+
+    # Learning activity telemetry
+    path('activity/', views.record_activity, name='record-activity'),
 ]
 
@@ -1,27 +1,58 @@
-from rest_framework import viewsets, generics, permissions, status, filters
+from rest_framework import viewsets, generics, mixins, permissions, status, filters
 from django.contrib.auth import get_user_model
-from .models import Course, Enrollment, Lesson, Assignment, AssignmentSubmission, Quiz, Question, QuizResult, Progress, Certificate, Article, Webinar, WebinarRegistration, ArticleLike
-from .serializers import CourseSerializer, EnrollmentSerializer, LessonSerializer, AssignmentSerializer, AssignmentSubmissionSerializer, QuizSerializer, QuizResultSerializer, CourseListSerializer, CourseDetailSerializer, CertificateSerializer, ArticleSerializer, WebinarSerializer, WebinarRegistrationSerializer
+from .models import Course, DeletionJob, Enrollment, Lesson, Assignment, AssignmentSubmission, UploadSession, Quiz, Question, QuizResult, QuizAnalytics, Progress, Certificate, Article, Webinar, WebinarRegistration, ArticleLike, ArticleSimilarity, CourseDailyStats, CourseReview, RollupWatermark, lesson_ordinals
+from .serializers import CourseSerializer, EnrollmentSerializer, LessonSerializer, AssignmentSerializer, AssignmentSubmissionSerializer, GradingQueueSerializer, BulkGradeSerializer, UploadSessionSerializer, QuizSerializer, QuizResultSerializer, QuizAnalyticsSerializer, CourseListSerializer, CourseDetailSerializer, ProgressUpdateSerializer, CourseCloneSerializer, CertificateSerializer, BulkEnrollSerializer, CourseReviewSerializer, ArticleSerializer, ArticleListSerializer, WebinarSerializer, WebinarRegistrationSerializer, ActivityEventSerializer
 from users.serializers import UserSerializer
 from rest_framework.response import Response
-from .permissions import IsInstructorOrAdmin
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from .permissions import IsInstructorOrAdmin, IsCourseInstructorOrAdmin
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes, throttle_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from thinktank.cache import cached
+from .caching import catalog_cache
+from .cohorts import bulk_enroll, read_emails
+from .deletion import schedule_deletion
+from .pagination import GradingQueuePagination, ReviewPagination
+from .uploads import UploadError, complete_session, discard_chunks, store_chunk
+from .activity import activity_buffer, retention_cutoff
+from .cloning import clone_course
+from .packages import PackageError, export_package, import_package
+from .lesson_order import LessonOrderError, move_lesson, reorder_lessons
+from .recommendations import recommended_courses
+from .rendering import rendered_content
+from .rollups import COUNTERS, WATERMARK as ROLLUP_WATERMARK
+from .throttling import ActivityRateThrottle
+from django.conf import settings
 from django.utils import timezone
+from datetime import date, timedelta
 
 User = get_user_model()
 
 class CourseViewSet(viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    replica_reads = True
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [IsInstructorOrAdmin()]
         return [permissions.IsAuthenticatedOrReadOnly()]
 
+    def perform_create(self, serializer):
+        user = self.request.user
+        serializer.save(instructor=user, instructor_name=user.get_full_name() or user.username)
+
+    def destroy(self, request, *args, **kwargs):
+        # The course disappears at once; its rows are removed in the background
+        job = schedule_deletion(self.get_object(), requested_by=request.user)
+        return Response({'deletion_job': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
 class EnrollView(generics.CreateAPIView):
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -55,8 +86,17 @@ class UnenrollView(generics.DestroyAPIView):
             return Response({'detail': 'Unenrolled successfully.'}, status=status.HTTP_204_NO_CONTENT)
         return Response({'detail': 'Enrollment not found.'}, status=status.HTTP_404_NOT_FOUND)
 
+def content_response(request, instance):
+    """Rendered HTML of a Lesson or Article, with the content hash as its ETag."""
+    digest, html = rendered_content(instance)
+    etag = f'"{digest}"'
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response({'id': instance.pk, 'content_hash': digest, 'html': html}, headers={'ETag': etag})
+
 class LessonViewSet(viewsets.ModelViewSet):
-    queryset = Lesson.objects.all()
+    # content is only read through the content action, and only on a cache miss
+    queryset = Lesson.objects.defer('content')
     serializer_class = LessonSerializer
 
     def get_permissions(self):
@@ -64,29 +104,173 @@ class LessonViewSet(viewsets.ModelViewSet):
             return [IsInstructorOrAdmin()]
         return [permissions.IsAuthenticatedOrReadOnly()]
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def content(self, request, pk=None):
+        # Lesson bodies are course material: only enrolled learners of a
+        # published course, its instructor and staff may read them
+        lesson = get_object_or_404(self.get_queryset().select_related('course'), pk=pk)
+        course = lesson.course
+        if not (request.user.is_staff or course.instructor_id == request.user.id or (
+            course.published and Enrollment.objects.filter(user=request.user, course=course).exists()
+        )):
+            return Response({'error': 'Enroll in this course to read its lessons'}, status=status.HTTP_403_FORBIDDEN)
+        return content_response(request, lesson)
+
 class AssignmentViewSet(viewsets.ModelViewSet):
     queryset = Assignment.objects.all()
     serializer_class = AssignmentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 class AssignmentSubmissionViewSet(viewsets.ModelViewSet):
-    queryset = AssignmentSubmission.objects.all()
     serializer_class = AssignmentSubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        user = self.request.user
+        queryset = AssignmentSubmission.objects.all()
+        if self.action == 'list':
+            # Students see their own work; served by the (user, assignment) index
+            queryset = queryset.filter(user=user)
+            assignment = self.request.query_params.get('assignment')
+            if assignment:
+                if not assignment.isdigit():
+                    raise ValidationError({'assignment': 'must be an assignment id'})
+                queryset = queryset.filter(assignment_id=assignment)
+        elif not user.is_staff:
+            queryset = queryset.filter(
+                Q(user=user) | Q(assignment__course__instructor=user)
+            )
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def _graded_assignments(self, user):
+        assignments = Assignment.objects.all()
+        if not user.is_staff:
+            assignments = assignments.filter(course__instructor=user)
+        return assignments
+
+    @action(detail=False, methods=['get'], url_path='grading-queue',
+            serializer_class=GradingQueueSerializer, pagination_class=GradingQueuePagination)
+    def grading_queue(self, request):
+        """Ungraded submissions for the instructor's courses, oldest first."""
+        assignments = self._graded_assignments(request.user)
+        try:
+            if request.query_params.get('course'):
+                assignments = assignments.filter(course_id=int(request.query_params['course']))
+            if request.query_params.get('assignment'):
+                assignments = assignments.filter(id=int(request.query_params['assignment']))
+        except ValueError:
+            return Response({'error': 'course and assignment must be ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = AssignmentSubmission.objects.filter(
+            grade__isnull=True,
+            assignment_id__in=assignments.values('id'),
+        ).select_related('assignment', 'user')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='bulk-grade', serializer_class=BulkGradeSerializer)
+    def bulk_grade(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entries = {entry['id']: entry for entry in serializer.validated_data['grades']}
+
+        with transaction.atomic():
+            submissions = list(
+                AssignmentSubmission.objects.select_for_update()
+                .filter(id__in=entries, assignment_id__in=self._graded_assignments(request.user).values('id'))
+            )
+            found = {submission.id for submission in submissions}
+            missing = sorted(set(entries) - found)
+            if missing:
+                return Response(
+                    {'error': 'Submissions not found or not gradable by you', 'ids': missing},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            for submission in submissions:
+                entry = entries[submission.id]
+                submission.grade = entry['grade']
+                if 'feedback' in entry:
+                    submission.feedback = entry['feedback']
+            AssignmentSubmission.objects.bulk_update(submissions, ['grade', 'feedback'], batch_size=500)
+
+        return Response({'graded': len(submissions)})
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked upload of an assignment submission file.
+
+    POST creates a session, PUT ``chunks/<index>/`` sends raw chunk bytes
+    (with an optional ``X-Chunk-SHA256`` header), GET reports which chunks
+    are still missing as inclusive ``[first, last]`` ranges, and POST
+    ``complete/`` assembles the file.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_chunks(instance)
+        if instance.status == 'pending':
+            instance.status = 'aborted'
+            instance.save(update_fields=['status', 'updated_at'])
+
+    @action(detail=True, methods=['put'], url_path=r'chunks/(?P<index>\d+)')
+    def chunk(self, request, pk=None, index=None):
+        session = self.get_object()
+        try:
+            chunk = store_chunk(session, int(index), request.stream, request.headers.get('X-Chunk-SHA256'))
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'index': chunk.index, 'size': chunk.size, 'sha256': chunk.sha256})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        if session.status != 'pending':
+            return Response({'error': 'Upload session is not pending'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            submission = complete_session(session)
+        except UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(AssignmentSubmissionSerializer(submission, context={'request': request}).data)
+
 class QuizViewSet(viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsCourseInstructorOrAdmin])
+    def analytics(self, request, pk=None):
+        quiz = self.get_object()
+        try:
+            analytics = QuizAnalytics.objects.get(quiz=quiz)
+        except QuizAnalytics.DoesNotExist:
+            return Response({'error': 'Analytics have not been computed for this quiz yet'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(QuizAnalyticsSerializer(analytics).data)
+
 class QuizResultViewSet(viewsets.ModelViewSet):
     queryset = QuizResult.objects.all()
     serializer_class = QuizResultSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
 class CourseListView(generics.ListAPIView):
     serializer_class = CourseListSerializer
     permission_classes = [IsAuthenticated]
+    trust_token_claims = True
+    replica_reads = True
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'description', 'instructor_name']
     
@@ -102,10 +286,28 @@ class CourseListView(generics.ListAPIView):
         
         return queryset
 
+    @cached(catalog_cache, key=lambda self: self.request.get_full_path(), namespace='courses')
+    def get_catalog(self):
+        """The page without per-user fields, shared by every learner."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return list(self.get_serializer_class()(queryset, many=True).data)
+
+    def list(self, request, *args, **kwargs):
+        courses = self.get_catalog()
+        enrolled = set(
+            Enrollment.objects.filter(user_id=request.user.id, course_id__in=[c['id'] for c in courses])
+            .values_list('course_id', flat=True)
+        )
+        return Response([{**course, 'is_enrolled': course['id'] in enrolled} for course in courses])
+
 class CourseDetailView(generics.RetrieveAPIView):
-    queryset = Course.objects.filter(published=True)
+    queryset = Course.objects.filter(published=True).prefetch_related(
+        Prefetch('lessons', queryset=Lesson.objects.defer('content'))
+    )
     serializer_class = CourseDetailSerializer
     permission_classes = [IsAuthenticated]
+    trust_token_claims = True
+    replica_reads = True
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -121,8 +323,7 @@ def enroll_course(request, course_id):
     )
     
     if created:
-        course.students_count += 1
-        course.save()
+        Course.objects.filter(pk=course.pk).update(students_count=F('students_count') + 1)
         
         return Response({
             'message': 'Successfully enrolled in course',
@@ -137,48 +338,74 @@ def enroll_course(request, course_id):
     else:
         return Response({'error': 'Already enrolled'}, status=status.HTTP_400_BAD_REQUEST)
 
+class BulkEnrollView(generics.GenericAPIView):
+    """Enroll a CSV cohort of learners into a course in one request."""
+    serializer_class = BulkEnrollSerializer
+    permission_classes = [IsAuthenticated, IsCourseInstructorOrAdmin]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, course_id):
+        course = get_object_or_404(Course, pk=course_id)
+        self.check_object_permissions(request, course)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report = bulk_enroll(
+            course,
+            read_emails(serializer.validated_data['file']),
+            create_missing=serializer.validated_data['create_missing'],
+            send_invites=serializer.validated_data['send_invites'],
+        )
+        return Response(report, status=status.HTTP_200_OK)
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_progress(request, course_id):
     try:
         course = Course.objects.get(id=course_id, published=True)
-        enrollment = Enrollment.objects.get(user=request.user, course=course)
-    except (Course.DoesNotExist, Enrollment.DoesNotExist):
+    except Course.DoesNotExist:
         return Response({'error': 'Course or enrollment not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    lesson_id = request.data.get('lesson_id')
-    completed = request.data.get('completed', True)
+    serializer = ProgressUpdateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    lesson_id = serializer.validated_data['lesson_id']
+    completed = serializer.validated_data['completed']
     
     try:
-        lesson = Lesson.objects.get(id=lesson_id, course=course)
+        lesson = Lesson.objects.defer('content').get(id=lesson_id, course=course)
     except Lesson.DoesNotExist:
         return Response({'error': 'Lesson not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    progress, created = Progress.objects.get_or_create(
-        enrollment=enrollment,
-        lesson=lesson,
-        defaults={'completed': completed}
-    )
-    
-    if not created:
-        progress.completed = completed
-        if completed:
-            progress.completed_at = timezone.now()
-        progress.save()
-    
-    # Update enrollment last_accessed
-    enrollment.last_accessed = timezone.now()
-    enrollment.save()
+    with transaction.atomic():
+        # Locked so concurrent updates for other lessons don't drop each other's bits
+        enrollment = Enrollment.objects.select_for_update().filter(user=request.user, course=course).first()
+        if enrollment is None:
+            return Response({'error': 'Course or enrollment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Progress rows are kept as the audit trail
+        progress, created = Progress.objects.get_or_create(
+            enrollment=enrollment,
+            lesson=lesson,
+            defaults={'completed': completed}
+        )
+        
+        if not created:
+            progress.completed = completed
+            if completed:
+                progress.completed_at = timezone.now()
+            progress.save()
+        
+        # Update the completion bitmap and last_accessed
+        enrollment.mark_lesson(lesson, completed)
+        enrollment.last_accessed = timezone.now()
+        enrollment.save()
     
     # Calculate overall course progress
-    total_lessons = course.lessons.count()
-    completed_lessons = Progress.objects.filter(
-        enrollment=enrollment, completed=True
-    ).count()
-    course_progress = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+    course_progress = enrollment.progress_percent(lesson_ordinals([course.id])[course.id])
     
     # Check if course is completed and issue certificate
     if course_progress == 100:
+        Enrollment.objects.filter(pk=enrollment.pk, completed_at__isnull=True).update(completed_at=timezone.now())
         certificate, cert_created = Certificate.objects.get_or_create(
             user=request.user,
             course=course,
@@ -197,18 +424,15 @@ def update_progress(request, course_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_courses(request):
-    enrollments = Enrollment.objects.filter(user=request.user).select_related('course')
+    enrollments = list(Enrollment.objects.filter(user=request.user).select_related('course'))
+    ordinals = lesson_ordinals([enrollment.course_id for enrollment in enrollments])
     
     enrolled = []
     completed = []
     
     for enrollment in enrollments:
         course = enrollment.course
-        total_lessons = course.lessons.count()
-        completed_lessons = Progress.objects.filter(
-            enrollment=enrollment, completed=True
-        ).count()
-        progress = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+        progress = enrollment.progress_percent(ordinals[course.id])
         
         course_data = {
             'id': course.id,
@@ -259,27 +483,63 @@ class ArticleListCreateView(generics.ListCreateAPIView):
     queryset = Article.objects.filter(status='published')
     serializer_class = ArticleSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    replica_reads = True
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'author']
     search_fields = ['title', 'excerpt', 'content', 'tags']
     ordering_fields = ['created_at', 'views_count', 'likes_count']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in permissions.SAFE_METHODS:
+            # Bodies come from articles/<slug>/content/
+            queryset = queryset.defer('content').select_related('author')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method in permissions.SAFE_METHODS:
+            return ArticleListSerializer
+        return ArticleSerializer
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+RELATED_ARTICLE_FIELDS = ('id', 'title', 'slug', 'excerpt', 'category', 'featured_image', 'published_at')
+
 class ArticleDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Article.objects.all()
     serializer_class = ArticleSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    replica_reads = True
     lookup_field = 'slug'
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
+        # Increment view count on the primary; the instance may come from a
+        # lagging replica, so saving its value back would lose views
+        Article.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
         instance.views_count += 1
-        instance.save(update_fields=['views_count'])
-        return super().retrieve(request, *args, **kwargs)
+        data = self.get_serializer(instance).data
+        related = (
+            ArticleSimilarity.objects.filter(article=instance, related__status='published')
+            .select_related('related')
+            .only('score', *('related__' + field for field in RELATED_ARTICLE_FIELDS))
+            .order_by('-score')
+        )
+        data['related_articles'] = [
+            {**{field: getattr(row.related, field) for field in RELATED_ARTICLE_FIELDS}, 'score': round(row.score, 4)}
+            for row in related
+        ]
+        return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def article_content(request, slug):
+    article = get_object_or_404(Article.objects.only('id', 'content_hash'), slug=slug)
+    return content_response(request, article)
+
+article_content.replica_reads = True
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -312,6 +572,7 @@ class WebinarListCreateView(generics.ListCreateAPIView):
     queryset = Webinar.objects.all()
     serializer_class = WebinarSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    replica_reads = True
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'category', 'presenter']
     search_fields = ['title', 'description', 'tags']
@@ -325,6 +586,7 @@ class WebinarDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Webinar.objects.all()
     serializer_class = WebinarSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    replica_reads = True
     lookup_field = 'slug'
 
 @api_view(['POST'])
@@ -366,3 +628,252 @@ def unregister_webinar(request, slug):
         
     except (Webinar.DoesNotExist, WebinarRegistration.DoesNotExist):
         return Response({'error': 'Registration not found'}, status=404)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ActivityRateThrottle])
+def record_activity(request):
+    """
+    Accept a batch of learning activity events, either a list or
+    ``{"events": [...]}``. Events are buffered and written asynchronously.
+    """
+    events = request.data.get('events') if isinstance(request.data, dict) else request.data
+    if not isinstance(events, list) or not events:
+        return Response({'error': 'Expected a non-empty list of events'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(events) > settings.ACTIVITY_MAX_BATCH:
+        return Response(
+            {'error': f'At most {settings.ACTIVITY_MAX_BATCH} events per request'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    serializer = ActivityEventSerializer(data=events, many=True)
+    serializer.is_valid(raise_exception=True)
+
+    now = timezone.now()
+    oldest = retention_cutoff(now)
+    accepted = []
+    for event in serializer.validated_data:
+        # Client clocks can't place events in the future or in dropped months
+        occurred_at = min(event.get('occurred_at') or now, now)
+        if occurred_at < oldest:
+            continue
+        accepted.append({
+            'user_id': request.user.id,
+            'course_id': event.get('course_id'),
+            'lesson_id': event.get('lesson_id'),
+            'event_type': event['event_type'],
+            'occurred_at': occurred_at,
+            'received_at': now,
+            'metadata': event['metadata'],
+        })
+    activity_buffer.add(accepted)
+    return Response(
+        {'accepted': len(accepted), 'rejected': len(events) - len(accepted)},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+# Nobody reads these back, so posting them shouldn't pin reads to the primary
+record_activity.replica_pin = False
+
+def _lesson_order_response(course_id):
+    return Response({'lessons': list(
+        Lesson.objects.filter(course_id=course_id).order_by('order', 'id').values('id', 'title', 'order')
+    )})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def reorder_course_lessons(request, course_id):
+    """Set the order of every lesson in a course from ``{"lessons": [id, ...]}``."""
+    course = get_object_or_404(Course.objects.only('id', 'instructor_id'), id=course_id)
+    if not (request.user.is_staff or course.instructor_id == request.user.id):
+        return Response({'error': 'Only the course instructor can reorder lessons'}, status=status.HTTP_403_FORBIDDEN)
+    lesson_ids = request.data.get('lessons')
+    if not isinstance(lesson_ids, list) or not all(isinstance(lesson_id, int) for lesson_id in lesson_ids):
+        return Response({'error': 'lessons must be a list of lesson ids'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        reorder_lessons(course_id, lesson_ids)
+    except LessonOrderError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return _lesson_order_response(course_id)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def move_course_lesson(request, course_id, lesson_id):
+    """Move one lesson to just after ``{"after": id}``, or to the start when after is null."""
+    course = get_object_or_404(Course.objects.only('id', 'instructor_id'), id=course_id)
+    if not (request.user.is_staff or course.instructor_id == request.user.id):
+        return Response({'error': 'Only the course instructor can reorder lessons'}, status=status.HTTP_403_FORBIDDEN)
+    after_id = request.data.get('after')
+    if after_id is not None and not isinstance(after_id, int):
+        return Response({'error': 'after must be a lesson id or null'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        move_lesson(course_id, lesson_id, after_id)
+    except LessonOrderError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return _lesson_order_response(course_id)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def clone_course_view(request, course_id):
+    """
+    Copy a course with all of its content for a new term. Accepts an optional
+    ``title`` and ``published`` (default false, so the copy starts as a draft).
+    """
+    course = get_object_or_404(Course, id=course_id)
+    if not (request.user.is_staff or course.instructor_id == request.user.id):
+        return Response({'error': 'Only the course instructor can copy this course'}, status=status.HTTP_403_FORBIDDEN)
+    serializer = CourseCloneSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    copy, copied = clone_course(
+        course, title=serializer.validated_data.get('title') or None, published=serializer.validated_data['published'],
+    )
+    return Response({'id': copy.id, 'slug': copy.slug, 'title': copy.title, 'copied': copied}, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def deletion_job_status(request, pk):
+    """Progress of a background course or user deletion."""
+    job = get_object_or_404(DeletionJob, pk=pk)
+    if not (request.user.is_staff or job.requested_by_id == request.user.id):
+        return Response({'error': 'Not allowed to view this deletion'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({
+        'id': job.id, 'model': job.model_label, 'object_id': job.object_id, 'object': job.object_repr,
+        'status': job.status, 'step': job.step, 'steps_total': job.steps_total, 'deleted': job.progress,
+        'error': job.error, 'created_at': job.created_at, 'updated_at': job.updated_at,
+        'finished_at': job.finished_at,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_course_package(request, course_id):
+    """Download a course and its content as a package zip, streamed as it is built."""
+    course = get_object_or_404(Course, id=course_id)
+    if not (request.user.is_staff or course.instructor_id == request.user.id):
+        return Response({'error': 'Only the course instructor can export this course'}, status=status.HTTP_403_FORBIDDEN)
+    response = StreamingHttpResponse(export_package(course), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{course.slug}.zip"'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def import_course_package(request):
+    """Create or update (matched on slug) the course in an uploaded package."""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        course, created, counts = import_package(upload, instructor=request.user)
+    except PackageError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(
+        {'id': course.id, 'slug': course.slug, 'created': created, 'counts': counts},
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+    )
+
+class CourseReviewListCreateView(generics.ListCreateAPIView):
+    """Reviews of one course, newest first; enrolled learners may post one each."""
+    serializer_class = CourseReviewSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewPagination
+    replica_reads = True
+
+    def get_queryset(self):
+        return CourseReview.objects.filter(course_id=self.kwargs['course_id']).select_related('user')
+
+    def create(self, request, *args, **kwargs):
+        enrollment = Enrollment.objects.filter(user=request.user, course_id=self.kwargs['course_id']).first()
+        if enrollment is None:
+            return Response({'error': 'Only enrolled learners can review this course'}, status=status.HTTP_403_FORBIDDEN)
+        if CourseReview.objects.filter(enrollment=enrollment).exists():
+            return Response({'error': 'You have already reviewed this course'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.save(enrollment=enrollment, course_id=enrollment.course_id, user=request.user)
+        except IntegrityError:
+            # A concurrent post for the same enrollment won the unique constraint
+            return Response({'error': 'You have already reviewed this course'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class CourseReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """A single review; only its author (or staff) may edit or delete it."""
+    serializer_class = CourseReviewSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_queryset(self):
+        reviews = CourseReview.objects.select_related('user')
+        if self.request.method in permissions.SAFE_METHODS or self.request.user.is_staff:
+            return reviews
+        return reviews.filter(user=self.request.user)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def course_recommendations(request, course_id):
+    """
+    Published courses most often taken alongside this one, best first, as
+    computed by ``manage.py build_course_recommendations``.
+    """
+    get_object_or_404(Course, id=course_id, published=True)
+    try:
+        limit = min(int(request.query_params.get('limit', 10)), settings.RECOMMENDATION_TOP_K)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'course_id': course_id, 'results': recommended_courses(course_id)[:max(limit, 0)]})
+
+course_recommendations.replica_reads = True
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def instructor_analytics(request):
+    """
+    Daily enrollments, completions, certificates and quiz pass rates for
+    the instructor's courses (any course for staff), read from the rollups
+    maintained by ``manage.py rollup_course_stats``.
+    """
+    try:
+        end = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+        start = date.fromisoformat(request.query_params['from']) if 'from' in request.query_params else end - timedelta(days=89)
+    except ValueError:
+        return Response({'error': 'from and to must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        course_id = int(request.query_params['course']) if request.query_params.get('course') else None
+    except ValueError:
+        return Response({'error': 'course must be a course id'}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end or (end - start).days >= settings.ANALYTICS_MAX_DAYS:
+        return Response(
+            {'error': f'Date range must be ascending and at most {settings.ANALYTICS_MAX_DAYS} days'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    courses = Course.objects.all() if request.user.is_staff else Course.objects.filter(instructor=request.user)
+    if not request.user.is_staff and not courses.exists():
+        return Response({'error': 'Instructor access required'}, status=status.HTTP_403_FORBIDDEN)
+    if course_id is not None:
+        courses = courses.filter(id=course_id)
+    courses = {course.id: course for course in courses.only('id', 'title')}
+
+    series = {course_id: [] for course_id in courses}
+    for row in CourseDailyStats.objects.filter(course_id__in=courses, date__gte=start, date__lte=end).values(
+        'course_id', 'date', *COUNTERS
+    ):
+        series[row.pop('course_id')].append(row)
+
+    def with_pass_rate(counts):
+        attempts = counts['quiz_attempts']
+        return {**counts, 'quiz_pass_rate': counts['quiz_passes'] / attempts if attempts else None}
+
+    watermark = RollupWatermark.objects.filter(name=ROLLUP_WATERMARK).values_list('processed_until', flat=True).first()
+    return Response({
+        'from': start,
+        'to': end,
+        'updated_until': watermark,
+        'courses': [
+            {
+                'id': course_id,
+                'title': courses[course_id].title,
+                'totals': with_pass_rate({counter: sum(day[counter] for day in days) for counter in COUNTERS}),
+                'daily': [with_pass_rate(day) for day in days],
+            }
+            for course_id, days in series.items()
+        ],
+    })
@@ -0,0 +1,276 @@
+"""
+Two-tier caching: a bounded in-process LRU in front of the shared Django
+cache (``CACHES['default']``).
+
+* Shared TTLs are jittered by ``CACHE_TTL_JITTER`` so keys written together
+  don't all expire together.
+* ``get_or_set`` recomputes a missing key at most once per process (a
+  per-key lock) and, across processes, once per ``CACHE_LOCK_TIMEOUT``
+  (an ``add``-based lock in the shared cache); other callers wait for the
+  winner's value instead of hitting the database.
+* Namespaces are versioned: ``bump()`` invalidates every key in one without
+  enumerating them. Other processes see a bump once their local copy of the
+  version expires (``CACHE_LOCAL_TTL``).
+* Every cache keeps hit/miss/compute counters and latency totals; see
+  ``stats()`` and ``all_stats()``.
+
+``cached`` and ``cache_response`` wrap plain functions and DRF views.
+"""
+import functools
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache:
+
+    def __init__(self, prefix, ttl=300, local_ttl=None, local_size=None, alias='default'):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.alias = alias
+        self.local = LocalLRU(
+            settings.CACHE_LOCAL_MAXSIZE if local_size is None else local_size,
+            settings.CACHE_LOCAL_TTL if local_ttl is None else local_ttl,
+        )
+        self._key_locks = defaultdict(threading.Lock)
+        self._key_locks_guard = threading.Lock()
+        self._counters = defaultdict(float)
+        self._counters_lock = threading.Lock()
+        _registry[prefix] = self
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def _count(self, **values):
+        with self._counters_lock:
+            for name, value in values.items():
+                self._counters[name] += value
+
+    def _jitter(self, ttl):
+        spread = settings.CACHE_TTL_JITTER
+        return max(1, int(ttl * random.uniform(1 - spread, 1 + spread)))
+
+    # Namespaces
+
+    def _version_key(self, namespace):
+        return f'{self.prefix}:ns:{namespace}'
+
+    def version(self, namespace):
+        key = self._version_key(namespace)
+        version = self.local.get(key)
+        if version is None:
+            version = self.shared.get(key)
+            if version is None:
+                self.shared.add(key, 0, None)
+                version = self.shared.get(key, 0)
+            self.local.set(key, version)
+        return version
+
+    def bump(self, namespace):
+        """Invalidate every key stored under ``namespace``."""
+        key = self._version_key(namespace)
+        self.shared.set(key, time.time_ns(), None)
+        self.local.delete(key)
+
+    def make_key(self, key, namespace=None):
+        if namespace is None:
+            return f'{self.prefix}:{key}'
+        return f'{self.prefix}:{namespace}:{self.version(namespace)}:{key}'
+
+    # Values
+
+    def get(self, key, default=None, namespace=None):
+        started = time.perf_counter()
+        full_key = self.make_key(key, namespace)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self._count(local_hits=1, get_seconds=time.perf_counter() - started)
+            return value
+        value = self.shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self.local.set(full_key, value)
+            self._count(shared_hits=1, get_seconds=time.perf_counter() - started)
+            return value
+        self._count(misses=1, get_seconds=time.perf_counter() - started)
+        return default
+
+    def set(self, key, value, ttl=None, namespace=None):
+        full_key = self.make_key(key, namespace)
+        self.shared.set(full_key, value, self._jitter(self.ttl if ttl is None else ttl))
+        self.local.set(full_key, value)
+
+    def delete(self, key, namespace=None):
+        full_key = self.make_key(key, namespace)
+        self.local.delete(full_key)
+        self.shared.delete(full_key)
+
+    def get_or_set(self, key, compute, ttl=None, namespace=None):
+        """
+        Return the cached value for ``key``, computing and storing it with
+        single-flight protection on a miss. ``None`` results are not cached.
+        """
+        value = self.get(key, _MISSING, namespace)
+        if value is not _MISSING:
+            return value
+
+        full_key = self.make_key(key, namespace)
+        with self._key_locks_guard:
+            key_lock = self._key_locks[full_key]
+        with key_lock:
+            try:
+                # Another thread may have filled it while we waited
+                value = self.local.get(full_key, _MISSING)
+                if value is _MISSING:
+                    value = self._compute_shared(full_key, compute, ttl)
+                return value
+            finally:
+                with self._key_locks_guard:
+                    self._key_locks.pop(full_key, None)
+
+    def _compute_shared(self, full_key, compute, ttl):
+        lock_key = f'{full_key}:lock'
+        timeout = settings.CACHE_LOCK_TIMEOUT
+        owned = self.shared.add(lock_key, 1, timeout)
+        if not owned:
+            # Someone else is computing it; wait for their result
+            self._count(lock_waits=1)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self.shared.get(full_key, _MISSING)
+                if value is not _MISSING:
+                    self.local.set(full_key, value)
+                    return value
+                if self.shared.get(lock_key) is None:
+                    break
+        try:
+            started = time.perf_counter()
+            value = compute()
+            self._count(computes=1, compute_seconds=time.perf_counter() - started)
+            if value is not None:
+                self.shared.set(full_key, value, self._jitter(self.ttl if ttl is None else ttl))
+                self.local.set(full_key, value)
+            return value
+        finally:
+            if owned:
+                self.shared.delete(lock_key)
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters.get('local_hits', 0) + counters.get('shared_hits', 0) + counters.get('misses', 0)
+        hits = counters.get('local_hits', 0) + counters.get('shared_hits', 0)
+        counters['hit_rate'] = hits / lookups if lookups else None
+        counters['mean_get_ms'] = counters.get('get_seconds', 0) * 1000 / lookups if lookups else None
+        computes = counters.get('computes', 0)
+        counters['mean_compute_ms'] = counters.get('compute_seconds', 0) * 1000 / computes if computes else None
+        return counters
+
+
+_registry = {}
+
+
+def all_stats():
+    return {prefix: tiered.stats() for prefix, tiered in _registry.items()}
+
+
+def cached(tiered, key, ttl=None, namespace=None):
+    """
+    Cache a function's result in ``tiered``. ``key`` and ``namespace`` are
+    strings or callables receiving the function's arguments.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return tiered.get_or_set(
+                key(*args, **kwargs) if callable(key) else key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                namespace=namespace(*args, **kwargs) if callable(namespace) else namespace,
+            )
+        return wrapper
+    return decorator
+
+
+def cache_response(tiered, ttl=None, namespace=None, vary_on_user=False):
+    """
+    Cache successful GET responses of a DRF function view or view method,
+    keyed by full path (and user, with ``vary_on_user``). ``namespace`` may
+    be a callable receiving the request.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            request = args[0] if hasattr(args[0], 'method') else args[1]
+            if request.method != 'GET':
+                return func(*args, **kwargs)
+
+            key = request.get_full_path()
+            if vary_on_user:
+                key = f'{request.user.pk}:{key}'
+
+            uncached = []
+
+            def compute():
+                response = func(*args, **kwargs)
+                if response.status_code != 200 or response.data is None:
+                    uncached.append(response)
+                    return None
+                return response.data
+
+            data = tiered.get_or_set(
+                key, compute, ttl=ttl,
+                namespace=namespace(request) if callable(namespace) else namespace,
+            )
+            if uncached:
+                return uncached[0]
+            if data is None:
+                return func(*args, **kwargs)
+            return Response(data)
+        return wrapper
+    return decorator
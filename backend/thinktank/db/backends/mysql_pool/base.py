@@ -0,0 +1,75 @@
+"""
+MySQL backend whose connections come from a per-process ``ConnectionPool``.
+
+Configure like the stock backend, plus ``OPTIONS['pool']`` (``True`` or a
+dict of ``ConnectionPool`` arguments), and keep ``CONN_MAX_AGE`` at 0 so
+Django hands the connection back at the end of every request.
+"""
+import threading
+
+try:
+    import MySQLdb  # noqa: F401
+except ImportError:  # pragma: no cover - depends on the installed driver
+    import pymysql
+
+    pymysql.install_as_MySQLdb()
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql import base as mysql
+
+from thinktank.db.pool import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        if self.settings_dict['CONN_MAX_AGE']:
+            raise ImproperlyConfigured("Pooling doesn't support persistent connections.")
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is None:
+                params = self.get_connection_params()
+                connect = super().get_new_connection
+                pool = _pools[self.alias] = ConnectionPool(
+                    lambda: connect(params),
+                    **({} if options is True else options),
+                )
+        return pool
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # The stock backend forwards every OPTIONS key to the driver
+        kwargs.pop('pool', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.getconn()
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        discard = self.errors_occurred
+        if not discard:
+            try:
+                connection.rollback()
+            except mysql.Database.Error:
+                discard = True
+        pool.putconn(connection, discard=discard)
+
+    def close_pool(self):
+        with _pools_lock:
+            pool = _pools.pop(self.alias, None)
+        if pool is not None:
+            pool.close()
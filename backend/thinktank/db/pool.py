@@ -0,0 +1,137 @@
+"""
+Connection pooling helpers.
+
+Postgres uses Django's built-in psycopg pool (``OPTIONS['pool']``). MySQL
+has no native pool, so ``thinktank.db.backends.mysql_pool`` wraps the stock
+backend around ``ConnectionPool`` below. Both take the same options
+(``min_size``, ``max_size``, ``timeout``, ``max_idle``, ``max_lifetime``)
+and report comparable counters through ``pool_stats()``.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.db import OperationalError, connections
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections. Idle connections beyond
+    ``min_size`` are closed after ``max_idle`` seconds and every connection
+    is retired after ``max_lifetime`` seconds; callers wait up to
+    ``timeout`` seconds when ``max_size`` connections are checked out.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, timeout=30.0, max_idle=600.0, max_lifetime=3600.0):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._idle = deque()  # (connection, created, returned)
+        self._created = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = defaultdict(float)
+
+    def _retire(self, conn):
+        self._created.pop(id(conn), None)
+        self._size -= 1
+        self._stats['connections_closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap(self, now):
+        # Oldest-returned connections sit at the left of the deque
+        while self._idle and self._size > self.min_size:
+            conn, created, returned = self._idle[0]
+            if now - returned < self.max_idle and now - created < self.max_lifetime:
+                break
+            self._idle.popleft()
+            self._retire(conn)
+            self._stats['connections_reaped'] += 1
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            self._stats['requests'] += 1
+            while True:
+                now = time.monotonic()
+                self._reap(now)
+                while self._idle:
+                    # Most recently returned first, so surplus connections go idle and get reaped
+                    conn, created, _ = self._idle.pop()
+                    if now - created >= self.max_lifetime:
+                        self._retire(conn)
+                        continue
+                    self._stats['wait_seconds'] += now - started
+                    return conn
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'Could not get a connection within {self.timeout}s')
+                self._stats['waits'] += 1
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self._stats['connections_opened'] += 1
+            self._stats['wait_seconds'] += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn, discard=False):
+        with self._cond:
+            created = self._created.get(id(conn))
+            if discard or created is None:
+                if created is not None:
+                    self._retire(conn)
+            else:
+                self._idle.append((conn, created, time.monotonic()))
+            self._stats['returns'] += 1
+            self._reap(time.monotonic())
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._retire(self._idle.popleft()[0])
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                pool_min=self.min_size,
+                pool_max=self.max_size,
+                pool_size=self._size,
+                pool_available=len(self._idle),
+            )
+        return stats
+
+
+def pool_stats():
+    """Counters for every pooled database alias in this process."""
+    result = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        pool = getattr(wrapper, 'pool', None)
+        if pool is not None:
+            result[alias] = {'vendor': wrapper.vendor, **pool.get_stats()}
+    return result
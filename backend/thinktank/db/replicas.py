@@ -0,0 +1,118 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+``ReplicaRoutingMiddleware`` marks GET/HEAD requests to views that set
+``replica_reads = True`` as eligible for replica reads. ``ReplicaRouter``
+sends reads made during such a request to one alias from
+``DATABASE_REPLICAS``, picked at random on the request's first replica read
+and kept for the rest of it, so a response never mixes replicas that lag by
+different amounts; everything else, all writes and anything inside a
+transaction on the primary go to ``default``.
+
+After a successful unsafe request (POST/PUT/PATCH/DELETE) the user is
+pinned to the primary for ``REPLICA_PIN_SECONDS`` through a key in the
+shared cache, so they read their own writes even while replicas lag.
+Views whose writes nobody reads back (telemetry) set ``replica_pin = False``.
+Queries made before DRF has authenticated the request (i.e. the user
+lookup itself) also use the primary, since the pin can't be checked yet.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+
+PIN_KEY = 'replica:pin:%s'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('replica_state', default=None)
+
+
+class _RequestState:
+
+    def __init__(self, request):
+        self.request = request
+        self.eligible = False
+        self.pinned = None
+        self.replica = None
+        self.pin_after_write = True
+
+
+def pin_to_primary(user_id):
+    cache.set(PIN_KEY % user_id, True, settings.REPLICA_PIN_SECONDS)
+
+
+def _authenticated_user(request):
+    # Only look at a user DRF has already resolved; touching the lazy
+    # session user here would run a query from inside the router.
+    user = request.__dict__.get('user')
+    if user is None or isinstance(user, SimpleLazyObject):
+        return None
+    return user
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.eligible or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        # DatabaseCache's table lives on the primary, and the pin lookup
+        # below may itself read from it.
+        if model._meta.app_label == 'django_cache':
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.pinned is None:
+            user = _authenticated_user(state.request)
+            if user is None:
+                return DEFAULT_DB_ALIAS
+            state.pinned = bool(user.is_authenticated and cache.get(PIN_KEY % user.pk))
+        if state.pinned:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _RequestState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and state.pin_after_write:
+            user = _authenticated_user(request)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        state = _state.get()
+        if state is None:
+            return None
+        if request.method in SAFE_METHODS:
+            state.eligible = bool(
+                getattr(view_class, 'replica_reads', False) or getattr(view_func, 'replica_reads', False)
+            )
+        else:
+            state.pin_after_write = getattr(view_class, 'replica_pin', getattr(view_func, 'replica_pin', True))
+        return None
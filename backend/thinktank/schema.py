@@ -0,0 +1,146 @@
+"""
+Pre-rendered OpenAPI schema.
+
+``manage.py build_openapi_schema`` renders the schema once, as YAML and
+JSON plus gzipped copies, into ``SCHEMA_ARTIFACT_DIR`` together with a
+manifest recording the code version it was built from. ``CachedSchemaView``
+serves those bytes with a strong ETag. If the artifact is missing or was
+built from other code, the schema is generated on first request and
+memoised in-process for the same code version.
+
+The code version is a digest of the project's Python sources, the
+drf-spectacular version and ``SPECTACULAR_SETTINGS``, so it is identical
+at build time and at runtime without any deploy metadata.
+"""
+import functools
+import gzip
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import drf_spectacular
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.views import SpectacularAPIView
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+MANIFEST = 'manifest.json'
+SKIP_DIRS = {'__pycache__', 'media', 'staticfiles', 'node_modules', '.git', '.venv', 'venv'}
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    digest = hashlib.sha256()
+    digest.update(drf_spectacular.__version__.encode())
+    digest.update(json.dumps(getattr(settings, 'SPECTACULAR_SETTINGS', {}), sort_keys=True, default=str).encode())
+    base = Path(settings.BASE_DIR)
+    for path in sorted(base.rglob('*.py')):
+        if SKIP_DIRS.intersection(path.relative_to(base).parts):
+            continue
+        digest.update(str(path.relative_to(base)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class SchemaArtifact:
+
+    def __init__(self, body, gzipped=None):
+        self.body = body
+        self.gzipped = gzipped if gzipped is not None else gzip.compress(body, 9, mtime=0)
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def render_schema():
+    """Generate the schema and render every format. Returns {kind: SchemaArtifact}."""
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return {
+        kind: SchemaArtifact(renderer().render(schema, renderer_context={}))
+        for kind, renderer in RENDERERS.items()
+    }
+
+
+def write_artifacts(directory=None):
+    directory = Path(directory or settings.SCHEMA_ARTIFACT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    artifacts = render_schema()
+    for kind, artifact in artifacts.items():
+        (directory / f'openapi.{kind}').write_bytes(artifact.body)
+        (directory / f'openapi.{kind}.gz').write_bytes(artifact.gzipped)
+    (directory / MANIFEST).write_text(json.dumps({
+        'version': code_version(),
+        'etags': {kind: artifact.etag for kind, artifact in artifacts.items()},
+    }))
+    return directory, artifacts
+
+
+def _read_artifacts():
+    directory = Path(settings.SCHEMA_ARTIFACT_DIR)
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+        if manifest.get('version') != code_version():
+            return None
+        return {
+            kind: SchemaArtifact(
+                (directory / f'openapi.{kind}').read_bytes(),
+                (directory / f'openapi.{kind}.gz').read_bytes(),
+            )
+            for kind in RENDERERS
+        }
+    except (OSError, ValueError):
+        return None
+
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def get_artifacts():
+    version = code_version()
+    artifacts = _memo.get(version)
+    if artifacts is None:
+        with _memo_lock:
+            artifacts = _memo.get(version)
+            if artifacts is None:
+                artifacts = _read_artifacts() or render_schema()
+                _memo.clear()
+                _memo[version] = artifacts
+    return artifacts
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """``SpectacularAPIView`` serving pre-rendered bytes instead of introspecting per request."""
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('lang') or request.GET.get('version') or self.custom_settings or self.patterns:
+            return super().get(request, *args, **kwargs)
+
+        renderer, _ = self.perform_content_negotiation(request)
+        kind = 'json' if isinstance(renderer, OpenApiJsonRenderer) else 'yaml'
+        artifact = get_artifacts()[kind]
+
+        # Each encoding is a different representation, so gets its own ETag
+        gzipped = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = artifact.etag[:-1] + '-gzip"' if gzipped else artifact.etag
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                artifact.gzipped if gzipped else artifact.body,
+                content_type=renderer.media_type,
+            )
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_SECONDS)
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
@@ -1,4 +1,5 @@
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -84,6 +85,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "thinktank.db.replicas.ReplicaRoutingMiddleware",
     "allauth.account.middleware.AccountMiddleware",  # ADD THIS LINE
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
@@ -111,7 +113,29 @@ WSGI_APPLICATION = "thinktank.wsgi.application"
 
 # Update your database configuration
 # For local development, use SQLite if PostgreSQL isn't available
-if os.getenv("DATABASE_URL"):
+# Connection pooling (DB_POOL=True): Django's psycopg pool on Postgres, the
+# thinktank.db.backends.mysql_pool wrapper on MySQL. Size it so that
+# instances x workers x DB_POOL_MAX_SIZE stays under the server's limit.
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+DB_POOL_OPTIONS = {
+    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    # Idle connections above min_size are closed after this many seconds
+    "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+}
+
+if os.getenv("DATABASE_URL") and DB_POOL:
+    # Pooled connections are returned at the end of each request instead of
+    # being kept per thread, so persistent connections and health checks are off.
+    DATABASES = {
+        "default": dj_database_url.parse(os.getenv("DATABASE_URL"), conn_max_age=0)
+    }
+    if DATABASES["default"]["ENGINE"] == "django.db.backends.mysql":
+        DATABASES["default"]["ENGINE"] = "thinktank.db.backends.mysql_pool"
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = DB_POOL_OPTIONS
+elif os.getenv("DATABASE_URL"):
     # Production: Use the DATABASE_URL from environment
     DATABASES = {
         "default": dj_database_url.parse(
@@ -129,8 +153,108 @@ else:
         }
     }
 
+# Read replicas. List/detail views marked ``replica_reads`` read from one of
+# these; writes and everything else use "default". DATABASE_REPLICA_URLS is a
+# comma-separated list; SQLITE_REPLICAS=N adds local SQLite copies for
+# development (populate them with ``migrate --database replica_N``).
+for _index, _url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    if DB_POOL:
+        DATABASES[f"replica_{_index}"] = dj_database_url.parse(_url.strip(), conn_max_age=0)
+        if DATABASES[f"replica_{_index}"]["ENGINE"] == "django.db.backends.mysql":
+            DATABASES[f"replica_{_index}"]["ENGINE"] = "thinktank.db.backends.mysql_pool"
+        DATABASES[f"replica_{_index}"].setdefault("OPTIONS", {})["pool"] = DB_POOL_OPTIONS
+    else:
+        DATABASES[f"replica_{_index}"] = dj_database_url.parse(
+            _url.strip(), conn_max_age=600, conn_health_checks=True
+        )
+for _index in range(1, int(os.getenv("SQLITE_REPLICAS", "0")) + 1):
+    DATABASES[f"replica_{_index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / f"db_replica_{_index}.sqlite3",
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica_")]
+for _alias in DATABASE_REPLICAS:
+    # Tests run against the primary only
+    DATABASES[_alias]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["thinktank.db.replicas.ReplicaRouter"]
+# How long a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "15"))
+
+# SQLite performance mode for single-server deployments: WAL lets readers
+# run alongside the writer, and BEGIN IMMEDIATE takes the write lock up front
+# so two read-then-write transactions can't deadlock upgrading their locks
+# (which SQLite reports immediately as "database is locked"). Writers queue
+# for up to SQLITE_BUSY_TIMEOUT seconds. Run ``manage.py sqlite_maintenance``
+# periodically to checkpoint the WAL and refresh planner statistics.
+SQLITE_PERFORMANCE_MODE = os.getenv("SQLITE_PERFORMANCE_MODE", "True") == "True"
+SQLITE_OPTIONS = {
+    "init_command": "; ".join([
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 2**20)))}",
+        # Negative values are KiB rather than pages
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))}",
+        "PRAGMA temp_store=MEMORY",
+    ]),
+    "transaction_mode": "IMMEDIATE",
+    "timeout": float(os.getenv("SQLITE_BUSY_TIMEOUT", "20")),
+}
+if SQLITE_PERFORMANCE_MODE:
+    for _database in DATABASES.values():
+        if _database["ENGINE"] == "django.db.backends.sqlite3":
+            _database["OPTIONS"] = {**SQLITE_OPTIONS, **_database.get("OPTIONS", {})}
+
+# Shared cache. Redis when configured; otherwise the database cache table
+# (created by ``createcachetable``) in deployments, and process-local memory
+# in dev and under ``manage.py test``. thinktank.cache puts an in-process LRU
+# in front. The database cache culls a third of its entries once it holds
+# CACHE_MAX_ENTRIES; Django's default of 300 lets a burst of login attempts
+# for random emails evict the per-IP throttle history.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+TESTING = sys.argv[1:2] == ["test"]
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+elif os.getenv("DATABASE_URL") and not TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+            "OPTIONS": {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+CACHE_LOCAL_MAXSIZE = int(os.getenv("CACHE_LOCAL_MAXSIZE", "1024"))
+CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "5"))
+# Shared TTLs are spread by +/- this fraction
+CACHE_TTL_JITTER = float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+# Longest a recomputation may hold the cross-process single-flight lock
+CACHE_LOCK_TIMEOUT = int(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+
 AUTH_USER_MODEL = "users.User"
 
+# PBKDF2 work factor, tunable per deployment. Stored hashes are upgraded or
+# downgraded to the configured cost on the user's next successful login.
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "870000"))
+
+PASSWORD_HASHERS = [
+    "users.hashers.ConfigurablePBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -156,13 +280,21 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Resumable submission uploads: chunks are stored individually and assembled
+# server-side, so these bound per-request memory rather than file size.
+UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", 8 * 1024 * 1024))
+# Only a single-chunk upload may use a smaller chunk_size; this keeps the
+# number of chunks per session (and the work to track them) bounded.
+UPLOAD_MIN_CHUNK_SIZE = int(os.getenv("UPLOAD_MIN_CHUNK_SIZE", 256 * 1024))
+UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", 2 * 1024 * 1024 * 1024))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # REST Framework configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.CachedJWTAuthentication",
+        "users.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -172,15 +304,92 @@ REST_FRAMEWORK = {
         "rest_framework.renderers.BrowsableAPIRenderer",  # ADD THIS LINE
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.getenv("LOGIN_RATE_PER_IP", "30/min"),
+        "login_email": os.getenv("LOGIN_RATE_PER_EMAIL", "10/min"),
+        "activity": os.getenv("ACTIVITY_RATE", "120/min"),
+    },
+    # Proxies in front of the app that append to X-Forwarded-For. Throttles
+    # take the client address that many hops from the right, so a
+    # client-supplied header can't pick its own throttle bucket. Cloud Run
+    # (K_SERVICE is set there) has one front end; 0 uses REMOTE_ADDR.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1" if os.getenv("K_SERVICE") else "0")),
 }
 
+# Learning activity events (courses.activity). Each worker buffers events and
+# bulk-inserts them when ACTIVITY_BUFFER_SIZE are waiting or every
+# ACTIVITY_FLUSH_SECONDS; beyond ACTIVITY_BUFFER_MAX pending events new ones
+# are dropped. Months older than ACTIVITY_RETENTION_MONTHS are dropped by
+# ``manage.py prune_activity_events``.
+ACTIVITY_BUFFER_SIZE = int(os.getenv("ACTIVITY_BUFFER_SIZE", "500"))
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "2"))
+ACTIVITY_BUFFER_MAX = int(os.getenv("ACTIVITY_BUFFER_MAX", "50000"))
+ACTIVITY_INSERT_BATCH_SIZE = int(os.getenv("ACTIVITY_INSERT_BATCH_SIZE", "1000"))
+ACTIVITY_MAX_BATCH = int(os.getenv("ACTIVITY_MAX_BATCH", "200"))
+ACTIVITY_RETENTION_MONTHS = int(os.getenv("ACTIVITY_RETENTION_MONTHS", "13"))
+
+# Instructor analytics rollups (courses.rollups). Each run re-reads this much
+# before the previous watermark to pick up rows from slow transactions.
+ROLLUP_LAG_SECONDS = int(os.getenv("ROLLUP_LAG_SECONDS", "900"))
+# Longest date range one analytics request may ask for
+ANALYTICS_MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "731"))
+
+# Co-enrollment recommendations (courses.recommendations). Neighbours per
+# course, the co-enrollment count below which a pair is ignored, and where the
+# matrix is kept between incremental runs.
+RECOMMENDATION_TOP_K = int(os.getenv("RECOMMENDATION_TOP_K", "20"))
+RECOMMENDATION_MIN_SUPPORT = int(os.getenv("RECOMMENDATION_MIN_SUPPORT", "2"))
+RECOMMENDATION_STATE_PATH = os.getenv(
+    "RECOMMENDATION_STATE_PATH", str(BASE_DIR / "var" / "recommendations.npz")
+)
+
+# Related articles stored per published article (courses.related_articles)
+RELATED_ARTICLES_TOP_N = int(os.getenv("RELATED_ARTICLES_TOP_N", "6"))
+
+# Background deletion of courses and users (courses.deletion). Rows removed
+# per transaction, how long a running job may go without progress before
+# another worker takes it over, and whether a job starts on a thread right
+# after the request; otherwise ``manage.py run_deletion_jobs`` picks it up.
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "1000"))
+DELETION_STALE_SECONDS = int(os.getenv("DELETION_STALE_SECONDS", "300"))
+DELETION_BACKGROUND_THREAD = os.getenv("DELETION_BACKGROUND_THREAD", "True") == "True"
+
+# Authenticated user resolution (users.authentication)
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+AUTH_USER_LOCAL_CACHE_TTL = int(os.getenv("AUTH_USER_LOCAL_CACHE_TTL", "5"))
+AUTH_USER_LOCAL_CACHE_SIZE = int(os.getenv("AUTH_USER_LOCAL_CACHE_SIZE", "2048"))
+# Let views marked ``trust_token_claims`` skip the user lookup on reads
+JWT_TRUST_CLAIMS_ON_SAFE_METHODS = (
+    os.getenv("JWT_TRUST_CLAIMS_ON_SAFE_METHODS", "False") == "True"
+)
+
+# Login throttling (users.throttling)
+LOGIN_THROTTLE_CACHE = os.getenv("LOGIN_THROTTLE_CACHE", "default")
+# Consecutive failures per account before lockouts start, then the lockout
+# doubles with each further failure up to the maximum.
+LOGIN_BACKOFF_THRESHOLD = int(os.getenv("LOGIN_BACKOFF_THRESHOLD", "5"))
+LOGIN_BACKOFF_BASE_SECONDS = int(os.getenv("LOGIN_BACKOFF_BASE_SECONDS", "2"))
+LOGIN_BACKOFF_MAX_SECONDS = int(os.getenv("LOGIN_BACKOFF_MAX_SECONDS", "900"))
+
 # JWT Configuration
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.RevokingTokenRefreshSerializer",
 }
 
+# Refresh-token revocation (users.revocation): one Bloom filter per bucket of
+# token expiry times, sized for REVOCATION_BUCKET_CAPACITY revocations.
+REVOCATION_BUCKET_SECONDS = int(os.getenv("REVOCATION_BUCKET_SECONDS", "86400"))
+REVOCATION_BUCKET_CAPACITY = int(os.getenv("REVOCATION_BUCKET_CAPACITY", "100000"))
+REVOCATION_ERROR_RATE = float(os.getenv("REVOCATION_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+# Each sync re-reads rows revoked this long before the previous one, to catch
+# transactions that committed late and clock skew between servers. Expired
+# rows are deleted by ``manage.py purge_revoked_tokens`` (run it periodically).
+REVOCATION_SYNC_LAG_SECONDS = int(os.getenv("REVOCATION_SYNC_LAG_SECONDS", "300"))
+
 EMAIL_BACKEND = os.getenv(
     "EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend"
 )
@@ -191,6 +400,11 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
+# Frontend page that completes the password setup for bulk-created accounts
+PASSWORD_SETUP_URL = os.getenv(
+    "PASSWORD_SETUP_URL", "http://localhost:5173/setup-password"
+)
+
 # Google Cloud Storage Configuration
 import os
 
@@ -200,8 +414,6 @@ if os.getenv("GAE_ENV", "").startswith("standard") or os.getenv("GOOGLE_CLOUD_PR
     try:
         import json
 
-        from google.oauth2 import service_account
-
         # Default file storage
         DEFAULT_FILE_STORAGE = "storages.backends.gcloud.GoogleCloudStorage"
         STATICFILES_STORAGE = "storages.backends.gcloud.GoogleCloudStorage"
@@ -213,6 +425,10 @@ if os.getenv("GAE_ENV", "").startswith("standard") or os.getenv("GOOGLE_CLOUD_PR
         # Credentials handling
         GS_CREDENTIALS_JSON = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
         if GS_CREDENTIALS_JSON:
+            # Only pulled in when explicit credentials are supplied; ADC
+            # workers never pay for importing google.oauth2 at startup.
+            from google.oauth2 import service_account
+
             try:
                 credentials_info = json.loads(GS_CREDENTIALS_JSON)
                 GS_CREDENTIALS = service_account.Credentials.from_service_account_info(
@@ -228,8 +444,10 @@ if os.getenv("GAE_ENV", "").startswith("standard") or os.getenv("GOOGLE_CLOUD_PR
         # GCS Storage settings
         GS_DEFAULT_ACL = "publicRead"
         GS_FILE_OVERWRITE = False
-        GS_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
-        GS_BLOB_CHUNK_SIZE = 1024 * 1024  # 1MB chunks
+        # Files opened from the bucket spill to disk above this size; uploads
+        # stream in resumable GS_BLOB_CHUNK_SIZE pieces (multiple of 256KB).
+        GS_MAX_MEMORY_SIZE = int(os.getenv("GS_MAX_MEMORY_SIZE", 1024 * 1024))
+        GS_BLOB_CHUNK_SIZE = int(os.getenv("GS_BLOB_CHUNK_SIZE", 1024 * 1024))
 
         # URLs
         GS_CUSTOM_ENDPOINT = None
@@ -330,3 +548,7 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
     "DISABLE_ERRORS_AND_WARNINGS": True,
 }
+
+# Pre-rendered schema (thinktank.schema); written by build_openapi_schema
+SCHEMA_ARTIFACT_DIR = os.getenv("SCHEMA_ARTIFACT_DIR", str(BASE_DIR / "openapi"))
+SCHEMA_CACHE_SECONDS = int(os.getenv("SCHEMA_CACHE_SECONDS", "3600"))
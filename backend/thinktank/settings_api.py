@@ -0,0 +1,45 @@
+"""
+Lean settings for workers that only serve ``/api/``.
+
+Select with ``DJANGO_SETTINGS_MODULE=thinktank.settings_api``. The admin,
+sessions, messages, static files, allauth, dj_rest_auth, social_django,
+storages' app config and drf_spectacular are not loaded, and only the
+middleware a stateless JSON API needs is kept. Run migrations, collectstatic
+and the admin with the full ``thinktank.settings`` profile; this one shares
+the same database. Measure with ``manage.py profile_startup``.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "rest_framework.authtoken",
+    "rest_framework_simplejwt",
+    "corsheaders",
+    "django_filters",
+    "users",
+    "courses",
+]
+
+MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "thinktank.db.replicas.ReplicaRoutingMiddleware",
+]
+
+ROOT_URLCONF = "thinktank.urls_api"
+
+# Password logins only; social sign-in is served by the full profile
+AUTHENTICATION_BACKENDS = [
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+    ],
+    "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.openapi.AutoSchema",
+}
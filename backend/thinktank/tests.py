@@ -0,0 +1,306 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITransactionTestCase
+
+from courses.management.commands.sqlite_maintenance import Command as SQLiteMaintenance
+from courses.models import Course, Enrollment
+from users.models import User
+
+from . import schema
+from .db import pool, replicas
+
+REPLICAS = ['replica_1', 'replica_2', 'replica_3']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    Routing decisions of ReplicaRouter and ReplicaRoutingMiddleware. The
+    router's choices are recorded and every query is then sent to the primary,
+    since replica aliases only mirror it under test (SQLITE_REPLICAS). No
+    test transaction wraps the requests: reads inside one stay on the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='x')
+        self.course = Course.objects.create(
+            title='Course', slug='course', description='d', instructor=self.user, instructor_name='Teacher',
+            price=0, duration='1h',
+        )
+        Enrollment.objects.create(user=self.user, course=self.course)
+        self.client.force_authenticate(self.user)
+        self.reads = []
+        original = replicas.ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = original(router, model, **hints)
+            self.reads.append(alias)
+            return DEFAULT_DB_ALIAS
+
+        patcher = mock.patch.object(replicas.ReplicaRouter, 'db_for_read', record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_reviews(self):
+        self.reads.clear()
+        response = self.client.get(f'/api/courses/{self.course.id}/reviews/')
+        self.assertEqual(response.status_code, 200)
+        return [alias for alias in self.reads if alias != DEFAULT_DB_ALIAS]
+
+    def test_one_replica_per_request(self):
+        chosen = set()
+        for _ in range(30):
+            aliases = self.get_reviews()
+            self.assertTrue(aliases)
+            self.assertEqual(len(set(aliases)), 1)
+            chosen |= set(aliases)
+        # Each request picks afresh
+        self.assertGreater(len(chosen), 1)
+        self.assertLessEqual(chosen, set(REPLICAS))
+
+    def test_writes_go_to_the_primary_and_pin_the_user(self):
+        self.reads.clear()
+        response = self.client.post(f'/api/courses/{self.course.id}/reviews/', {'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(self.reads), {DEFAULT_DB_ALIAS})
+        self.assertEqual(replicas.ReplicaRouter().db_for_write(Course), DEFAULT_DB_ALIAS)
+
+        # The author reads their own write from the primary while pinned
+        self.assertEqual(self.get_reviews(), [])
+        cache.delete(replicas.PIN_KEY % self.user.pk)
+        self.assertTrue(self.get_reviews())
+
+    def test_views_without_replica_reads_and_code_outside_requests_use_the_primary(self):
+        self.reads.clear()
+        self.assertEqual(self.client.get('/api/courses/my-enrollments/').status_code, 200)
+        self.assertEqual(set(self.reads), {DEFAULT_DB_ALIAS})
+        self.assertEqual(replicas.ReplicaRouter().db_for_read(Course), DEFAULT_DB_ALIAS)
+
+
+class ApiSettingsProfileTests(SimpleTestCase):
+
+    PROBE = """
+import sys
+import django
+django.setup()
+from django.conf import settings
+from django.urls import Resolver404, resolve
+assert resolve('/api/token/').url_name == 'token_obtain_pair'
+try:
+    resolve('/admin/')
+except Resolver404:
+    pass
+else:
+    raise AssertionError('admin is routed')
+print(sorted(set(settings.INSTALLED_APPS) & {'django.contrib.admin', 'django.contrib.sessions'}))
+print(sorted(name for name in ('allauth', 'dj_rest_auth', 'drf_spectacular', 'social_django') if name in sys.modules))
+"""
+
+    def test_api_profile_serves_the_api_without_the_admin_stack(self):
+        # A fresh interpreter: settings can't be swapped inside this one
+        proc = subprocess.run(
+            [sys.executable, '-c', self.PROBE], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='thinktank.settings_api'),
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.splitlines()[-2:], ['[]', '[]'])
+
+
+class CachedSchemaTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.directory)
+        schema.write_artifacts(cls.directory)
+
+    def setUp(self):
+        schema._memo.clear()
+        self.addCleanup(schema._memo.clear)
+        overrides = override_settings(SCHEMA_ARTIFACT_DIR=str(self.directory))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def fetch(self, **headers):
+        return self.client.get('/api/schema/', HTTP_ACCEPT='application/vnd.oai.openapi+json', **headers)
+
+    def test_built_artifact_is_served_with_etags_per_encoding(self):
+        body = (self.directory / 'openapi.json').read_bytes()
+        response = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, body)
+        self.assertIn('paths', json.loads(body))
+        etag = response['ETag']
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        zipped = self.fetch(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(zipped.content), body)
+        self.assertNotEqual(zipped['ETag'], etag)
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING='gzip').status_code, 200)
+
+    def test_requests_do_not_regenerate_the_schema(self):
+        with mock.patch.object(schema, 'render_schema') as render:
+            for _ in range(3):
+                self.assertEqual(self.fetch().status_code, 200)
+        render.assert_not_called()
+
+    def test_an_artifact_from_other_code_is_ignored(self):
+        manifest = self.directory / schema.MANIFEST
+        original = manifest.read_text()
+        self.addCleanup(manifest.write_text, original)
+        manifest.write_text(json.dumps({**json.loads(original), 'version': 'older'}))
+        rendered = {'json': schema.SchemaArtifact(b'{"openapi": "rendered"}'), 'yaml': schema.SchemaArtifact(b'')}
+        with mock.patch.object(schema, 'render_schema', return_value=rendered) as render:
+            self.assertEqual(self.fetch().content, b'{"openapi": "rendered"}')
+            self.fetch()
+        render.assert_called_once()
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = [0.0]
+        patcher = mock.patch.object(pool, 'time', mock.Mock(monotonic=lambda: self.clock[0]))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.opened = []
+
+    def make_pool(self, **options):
+        def connect():
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+        return pool.ConnectionPool(connect, **options)
+
+    def test_connections_are_reused_most_recent_first(self):
+        connections = self.make_pool(max_size=3)
+        first, second = connections.getconn(), connections.getconn()
+        connections.putconn(first)
+        connections.putconn(second)
+        self.assertIs(connections.getconn(), second)
+        self.assertEqual(len(self.opened), 2)
+        stats = connections.get_stats()
+        self.assertEqual((stats['pool_size'], stats['pool_available'], stats['requests']), (2, 1, 3))
+
+    def test_a_full_pool_times_out_or_hands_over_a_returned_connection(self):
+        connections = self.make_pool(max_size=1, timeout=0)
+        held = connections.getconn()
+        with self.assertRaises(pool.PoolTimeout):
+            connections.getconn()
+
+        connections.timeout = 5
+        received = []
+        waiter = threading.Thread(target=lambda: received.append(connections.getconn()))
+        waiter.start()
+        while not connections.get_stats().get('waits'):
+            time.sleep(0.01)
+        connections.putconn(held)
+        waiter.join(5)
+        self.assertEqual(received, [held])
+        self.assertEqual(connections.get_stats()['timeouts'], 1)
+
+    def test_idle_and_old_connections_are_closed(self):
+        connections = self.make_pool(min_size=1, max_size=3, max_idle=10, max_lifetime=100)
+        checked_out = [connections.getconn() for _ in range(3)]
+        for conn in checked_out:
+            connections.putconn(conn)
+        self.clock[0] = 11
+        # The surplus idle connections go, min_size stays
+        self.assertIs(connections.getconn(), checked_out[2])
+        self.assertEqual([conn.closed for conn in checked_out], [True, True, False])
+
+        connections.putconn(checked_out[2])
+        self.clock[0] = 101
+        fresh = connections.getconn()
+        self.assertIsNot(fresh, checked_out[2])
+        self.assertTrue(checked_out[2].closed)
+
+    def test_discarded_connections_and_failed_connects_free_their_slot(self):
+        connections = self.make_pool(max_size=1, timeout=0)
+        broken = connections.getconn()
+        connections.putconn(broken, discard=True)
+        self.assertTrue(broken.closed)
+        connections._connect = mock.Mock(side_effect=OSError('refused'))
+        with self.assertRaises(OSError):
+            connections.getconn()
+        self.assertEqual(connections.get_stats()['pool_size'], 0)
+
+
+class SQLitePerformanceModeTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'embedded.sqlite3')
+
+    def connect(self, alias):
+        wrapper = DatabaseWrapper(
+            {**connections[DEFAULT_DB_ALIAS].settings_dict, 'NAME': self.path, 'OPTIONS': settings.SQLITE_OPTIONS},
+            alias,
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_databases_get_the_options(self):
+        self.assertTrue(settings.SQLITE_PERFORMANCE_MODE)
+        for database in settings.DATABASES.values():
+            if database['ENGINE'] == 'django.db.backends.sqlite3':
+                self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_readers_are_not_blocked_by_an_open_write(self):
+        writer, reader = self.connect('writer'), self.connect('reader')
+        self.assertEqual(self.pragma(writer, 'journal_mode'), 'wal')
+        self.assertEqual((self.pragma(writer, 'synchronous'), self.pragma(writer, 'temp_store')), (1, 2))
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        writer.set_autocommit(False)
+        with writer.cursor() as cursor:
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+        # Uncommitted, so invisible but not in the way
+        with reader.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        writer.commit()
+        writer.set_autocommit(True)
+
+    def test_maintenance_checkpoints_the_wal(self):
+        wrapper = self.connect('embedded')
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            cursor.executemany('INSERT INTO item DEFAULT VALUES', [()] * 100)
+        self.assertGreater(os.path.getsize(self.path + '-wal'), 0)
+        connections['embedded'] = wrapper
+        self.addCleanup(delattr, connections._connections, 'embedded')
+        self.assertRegex(SQLiteMaintenance().maintain('embedded', 'TRUNCATE'), r'^embedded: optimized, checkpointed \d+/\d+')
+        self.assertEqual(os.path.getsize(self.path + '-wal'), 0)
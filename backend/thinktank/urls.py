@@ -1,21 +1,29 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from django.views.decorators.cache import cache_control
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+from . import views
+from .schema import CachedSchemaView
+
+docs_cache = cache_control(public=True, max_age=settings.SCHEMA_CACHE_SECONDS)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("users.urls")),
     path("api/courses/", include("courses.urls")),
     path("auth/", include("social_django.urls", namespace="social")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/schema/", CachedSchemaView.as_view(), name="schema"),
+    path("api/ops/metrics/", views.runtime_metrics, name="runtime_metrics"),
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        docs_cache(SpectacularSwaggerView.as_view(url_name="schema")),
         name="swagger-ui",
     ),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path(
+        "api/redoc/",
+        docs_cache(SpectacularRedocView.as_view(url_name="schema")),
+        name="redoc",
+    ),
 ]
@@ -0,0 +1,10 @@
+from django.urls import include, path
+
+from . import views
+
+# URLconf for the API-only settings profile (thinktank.settings_api)
+urlpatterns = [
+    path("api/", include("users.urls")),
+    path("api/courses/", include("courses.urls")),
+    path("api/ops/metrics/", views.runtime_metrics, name="runtime_metrics"),
+]
@@ -0,0 +1,19 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from courses.activity import activity_buffer
+
+from .cache import all_stats
+from .db.pool import pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def runtime_metrics(request):
+    """Connection pool, cache and activity buffer counters for the worker serving the request."""
+    return Response({
+        'database_pools': pool_stats(),
+        'caches': all_stats(),
+        'activity_buffer': activity_buffer.stats(),
+    })
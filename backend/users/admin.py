@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from courses.admin_tools import BackgroundDeleteAdminMixin
+
 from .models import User
 
 @admin.register(User)
-class UserAdmin(DjangoUserAdmin):
+class UserAdmin(BackgroundDeleteAdminMixin, DjangoUserAdmin):
     fieldsets = DjangoUserAdmin.fieldsets + (
         ("Additional", {
             'fields': ('bio', 'avatar_url', 'is_email_verified')  # removed 'role'
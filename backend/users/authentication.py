@@ -0,0 +1,184 @@
+"""
+Authentication classes that resolve ``request.user`` without a query per call.
+
+Users are cached as plain field dicts in a ``TieredCache``: a small
+per-process LRU (a few seconds) in front of the shared cache (minutes).
+Each user has its own cache namespace, and ``invalidate_user`` bumps it on
+every ``User`` save or delete (profile edits, password changes,
+deactivation), again once the transaction commits, and for every row
+changed by ``User.objects...update()``. A load stores its result under the
+generation it started with, so a slow load that read the old row can't
+overwrite a newer invalidation. Other processes see the change once their
+local entry expires. Raw SQL updates of the users table must call
+``invalidate_user`` themselves. A fresh model instance is built per request, so views may mutate
+``request.user`` freely.
+
+Views that set ``trust_token_claims = True`` can, when
+``JWT_TRUST_CLAIMS_ON_SAFE_METHODS`` is enabled, skip user resolution
+entirely on GET/HEAD/OPTIONS and get a ``ClaimsUser`` built from the access
+token. Those views must only rely on the claims issued by ``issue_tokens``.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from thinktank.cache import TieredCache
+
+# Claims copied into every token so trusted views can skip the user lookup
+TRUSTED_CLAIMS = ('username', 'email', 'is_staff', 'is_superuser')
+
+user_cache = TieredCache(
+    'auth:user',
+    ttl=settings.AUTH_USER_CACHE_TTL,
+    local_ttl=settings.AUTH_USER_LOCAL_CACHE_TTL,
+    local_size=settings.AUTH_USER_LOCAL_CACHE_SIZE,
+)
+token_cache = TieredCache(
+    'auth:token',
+    ttl=settings.AUTH_USER_CACHE_TTL,
+    local_ttl=settings.AUTH_USER_LOCAL_CACHE_TTL,
+    local_size=settings.AUTH_USER_LOCAL_CACHE_SIZE,
+)
+
+
+def _user_fields(user_model):
+    # The password hash never leaves the database; a digest of it is kept for
+    # simplejwt's CHECK_REVOKE_TOKEN comparison instead.
+    return [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.attname != 'password'
+    ]
+
+
+def _snapshot(user):
+    user_model = type(user)
+    data = {name: getattr(user, name) for name in _user_fields(user_model)}
+    data['_password_md5'] = get_md5_hash_password(user.password)
+    return data
+
+
+def _build(user_model, data):
+    names = _user_fields(user_model)
+    user = user_model.from_db(router.db_for_read(user_model), names, [data[name] for name in names])
+    user._password_md5 = data['_password_md5']
+    return user
+
+
+def get_cached_user(user_id):
+    """Return the user with primary key ``user_id`` or ``None``."""
+    user_model = get_user_model()
+
+    def load():
+        user = user_model._default_manager.filter(pk=user_id).first()
+        return None if user is None else _snapshot(user)
+
+    data = user_cache.get_or_set('fields', load, namespace=_user_namespace(user_id))
+    return None if data is None else _build(user_model, data)
+
+
+def _user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def _token_digest(token_key):
+    return hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def invalidate_user(user_id):
+    namespace = _user_namespace(user_id)
+    user_cache.bump(namespace)
+    # Readers on other connections see the old row until commit and may
+    # cache it under the new generation; retire that one too.
+    transaction.on_commit(lambda: user_cache.bump(namespace))
+
+
+def invalidate_token(token_key):
+    token_cache.delete(_token_digest(token_key))
+
+
+def issue_tokens(user):
+    """Return a ``RefreshToken`` for ``user`` carrying the trusted claims."""
+    refresh = RefreshToken.for_user(user)
+    for claim in TRUSTED_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+
+class ClaimsUser(TokenUser):
+    """Stateless user built from access token claims."""
+
+    @property
+    def email(self):
+        return self.token.get('email', '')
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if self._trusts_claims(request, validated_token):
+            return ClaimsUser(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def _trusts_claims(self, request, validated_token):
+        if not settings.JWT_TRUST_CLAIMS_ON_SAFE_METHODS or request.method not in SAFE_METHODS:
+            return False
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        if not getattr(view, 'trust_token_claims', False):
+            return False
+        return all(claim in validated_token for claim in TRUSTED_CLAIMS)
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user._password_md5:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        user_id = token_cache.get_or_set(
+            _token_digest(key),
+            lambda: self.get_model().objects.filter(key=key).values_list('user_id', flat=True).first(),
+        )
+        if user_id is None:
+            raise AuthenticationFailed(_('Invalid token.'))
+
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, self.get_model()(key=key, user_id=user_id)
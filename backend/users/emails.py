@@ -0,0 +1,57 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, transaction
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+logger = logging.getLogger(__name__)
+
+
+def password_setup_link(user):
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    return f'{settings.PASSWORD_SETUP_URL}?uid={uid}&token={token}'
+
+
+def send_password_setup_emails(users):
+    """Send account invitations over a single mail connection."""
+    messages = [
+        EmailMessage(
+            subject='Set up your Thinktank LMS account',
+            body=(
+                'An account has been created for you on Thinktank LMS.\n\n'
+                f'Choose a password to get started: {password_setup_link(user)}\n'
+            ),
+            to=[user.email],
+        )
+        for user in users
+    ]
+    if not messages:
+        return 0
+    with get_connection() as connection:
+        return connection.send_messages(messages)
+
+
+def queue_password_setup_emails(emails):
+    """
+    Send invitations to the accounts for ``emails`` on a background thread
+    once the current transaction commits, so the request doesn't wait on SMTP.
+    """
+    emails = list(emails)
+
+    def send():
+        try:
+            send_password_setup_emails(get_user_model().objects.filter(email__in=emails))
+        except Exception:
+            logger.exception('Sending %d password setup emails failed', len(emails))
+        finally:
+            connections.close_all()
+
+    if emails:
+        transaction.on_commit(lambda: threading.Thread(target=send, name='password-setup-emails', daemon=True).start())
+    return len(emails)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    ``pbkdf2_sha256`` with the iteration count taken from
+    ``PASSWORD_HASH_ITERATIONS``. The algorithm name is unchanged, so
+    existing hashes keep verifying and are re-encoded at the configured cost
+    on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
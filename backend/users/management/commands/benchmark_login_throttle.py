@@ -0,0 +1,111 @@
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIRequestFactory
+
+from users.views import login
+
+PASSWORD = 'Benchmark-login-1'
+
+
+class Command(BaseCommand):
+    help = 'Measure legitimate login latency while other threads run a credential-stuffing attack'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attackers', type=int, default=8, help='Attacking threads')
+        parser.add_argument('--seconds', type=float, default=30.0,
+                            help='Duration of each run; the per-IP window is a minute')
+        parser.add_argument('--interval', type=float, default=0.25,
+                            help='Pause between legitimate logins, in seconds')
+        parser.add_argument('--spoof-forwarded-for', action='store_true',
+                            help='Attackers send a new X-Forwarded-For on every request')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also run with the login throttles disabled')
+
+    def _login(self, factory, email, password, address, forwarded_for=None):
+        headers = {'REMOTE_ADDR': address}
+        if forwarded_for:
+            headers['HTTP_X_FORWARDED_FOR'] = forwarded_for
+        request = factory.post('/api/user/login/', {'email': email, 'password': password}, format='json', **headers)
+        started = time.perf_counter()
+        response = login(request)
+        return response.status_code, time.perf_counter() - started
+
+    def _attacker(self, factory, number, stop, statuses, spoof):
+        # One address, a new victim every request; TEST-NET-3 addresses
+        address = f'203.0.113.{number + 1}'
+        while not stop.is_set():
+            forwarded_for = f'198.51.100.{uuid.uuid4().int % 250 + 1}' if spoof else None
+            code, _ = self._login(factory, f'{uuid.uuid4().hex[:12]}@example.invalid', 'guess', address, forwarded_for)
+            statuses[code] += 1
+        connections.close_all()
+
+    def _run(self, emails, options, run_id):
+        factory = APIRequestFactory()
+        stop = threading.Event()
+        statuses = Counter()
+        attackers = [
+            threading.Thread(target=self._attacker,
+                             args=(factory, number, stop, statuses, options['spoof_forwarded_for']))
+            for number in range(options['attackers'])
+        ]
+        for attacker in attackers:
+            attacker.start()
+        latencies, failures = [], 0
+        deadline = time.perf_counter() + options['seconds']
+        for number, email in enumerate(emails):
+            if time.perf_counter() >= deadline:
+                break
+            # Each learner logs in once from their own address, well within every limit
+            code, elapsed = self._login(factory, email, PASSWORD, f'10.{run_id}.{number // 250}.{number % 250 + 1}')
+            if code == 200:
+                latencies.append(elapsed * 1000)
+            else:
+                failures += 1
+            time.sleep(options['interval'])
+        stop.set()
+        for attacker in attackers:
+            attacker.join()
+        return latencies, failures, statuses
+
+    def _report(self, label, latencies, failures, statuses, seconds):
+        if len(latencies) < 2:
+            raise CommandError(f'{label}: too few successful legitimate logins to report ({failures} failed)')
+        quantiles = statistics.quantiles(latencies, n=20)
+        attempts = sum(statuses.values())
+        self.stdout.write(
+            f'{label:<12} legit p50 {statistics.median(latencies):7.1f} ms  p95 {quantiles[18]:7.1f} ms  '
+            f'failed {failures:>3}  attack {attempts / seconds:8.0f} req/s  '
+            f'hashed {statuses[400]:>6}  throttled {statuses[429]:>7}'
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        logins = int(options['seconds'] / options['interval']) + 1
+        prefix = f'benchmark-{uuid.uuid4().hex[:8]}'
+        # One hash shared by every benchmark account; hashing each would take minutes
+        template = User()
+        template.set_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-{number}', email=f'{prefix}-{number}@example.invalid', password=template.password)
+            for number in range(2 * logins)
+        ])
+        emails = [user.email for user in users]
+        throttle_classes = login.cls.throttle_classes
+        try:
+            self.stdout.write(f'{options["attackers"]} attackers, {options["seconds"]:.0f}s per run'
+                              + (', spoofing X-Forwarded-For' if options['spoof_forwarded_for'] else ''))
+            self._report('throttled', *self._run(emails[:logins], options, 1), options['seconds'])
+            if options['compare']:
+                login.cls.throttle_classes = []
+                self._report('unthrottled', *self._run(emails[logins:], options, 2), options['seconds'])
+        finally:
+            login.cls.throttle_classes = throttle_classes
+            User.objects.filter(username__startswith=f'{prefix}-').delete()
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from users.revocation import purge_expired
+
+class Command(BaseCommand):
+    help = 'Delete revocation records for refresh tokens that have already expired'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired revocation records'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:44
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.UserManager()),
+            ],
+        ),
+    ]
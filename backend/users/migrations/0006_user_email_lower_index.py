@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 14:54
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_user_queryset'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+    ]
@@ -1,12 +1,53 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
+
+
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # QuerySet.update() sends no post_save, so drop the cached copies of
+        # the affected users here (e.g. bulk deactivation)
+        from .authentication import invalidate_user
+        user_ids = list(self.values_list('pk', flat=True))
+        updated = super().update(**kwargs)
+        for user_id in user_ids:
+            invalidate_user(user_id)
+        return updated
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     is_email_verified = models.BooleanField(default=False)  # Add this field
+
+    objects = UserManager()
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive email lookups (cohort imports)
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
     
     def __str__(self):
         return self.email
+
+
+class RevokedToken(models.Model):
+    """
+    Exact record of a revoked refresh token. ``users.revocation`` keeps a
+    Bloom filter of these in memory and only reads this table to confirm a
+    positive; rows are purged once the token would have expired anyway.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
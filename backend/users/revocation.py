@@ -0,0 +1,132 @@
+"""
+Refresh-token revocation.
+
+Revoked JTIs are recorded in ``RevokedToken`` and mirrored in memory as one
+Bloom filter per expiry bucket (``REVOCATION_BUCKET_SECONDS`` wide). A
+lookup hashes the JTI into the bucket for its ``exp`` claim; a negative
+answer needs no I/O and a positive is confirmed against the table, so false
+positives never reject a valid token.
+
+Every process folds new rows into its filters at most every
+``REVOCATION_SYNC_SECONDS``, reading by ``revoked_at`` from its previous
+sync less ``REVOCATION_SYNC_LAG_SECONDS``. Ids and timestamps are assigned
+before commit, so a plain watermark would skip a row whose transaction
+committed after a later one; re-adding a JTI to a filter is harmless.
+Rotation does not depend on that window: the old token's row is inserted
+before a new pair is issued, and the unique constraint on ``jti`` rejects a
+concurrent reuse. Once a bucket's tokens are past their ``exp`` the bucket
+is dropped from memory; the rows are deleted by ``manage.py
+purge_revoked_tokens``, off the request path.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationStore:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._watermark = None
+        self._synced_at = 0.0
+
+    def _bucket(self, exp):
+        return int(exp) // settings.REVOCATION_BUCKET_SECONDS
+
+    def _add(self, jti, exp):
+        bucket = self._bucket(exp)
+        bloom = self._buckets.get(bucket)
+        if bloom is None:
+            bloom = self._buckets[bucket] = BloomFilter(
+                settings.REVOCATION_BUCKET_CAPACITY, settings.REVOCATION_ERROR_RATE
+            )
+        bloom.add(jti)
+
+    def sync(self, force=False):
+        """Fold rows revoked by other processes into the filters."""
+        if not force and time.monotonic() - self._synced_at < settings.REVOCATION_SYNC_SECONDS:
+            return
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            rows = RevokedToken.objects.filter(expires_at__gt=now)
+            if self._watermark is not None:
+                rows = rows.filter(
+                    revoked_at__gte=self._watermark - timedelta(seconds=settings.REVOCATION_SYNC_LAG_SECONDS)
+                )
+            for jti, expires_at in rows.values_list('jti', 'expires_at').iterator(chunk_size=5000):
+                self._add(jti, expires_at.timestamp())
+            self._watermark = now
+
+            current = self._bucket(now.timestamp())
+            for bucket in [bucket for bucket in self._buckets if bucket < current]:
+                del self._buckets[bucket]
+            self._synced_at = time.monotonic()
+
+    def is_revoked(self, jti, exp):
+        self.sync()
+        bloom = self._buckets.get(self._bucket(exp))
+        if bloom is None or jti not in bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, exp):
+        """Record ``jti`` as revoked. Returns ``False`` if it already was."""
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(
+                    jti=jti, expires_at=datetime.fromtimestamp(exp, timezone.utc)
+                )
+        except IntegrityError:
+            return False
+        with self._lock:
+            self._add(jti, exp)
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self._watermark = None
+            self._synced_at = 0.0
+
+
+def purge_expired(batch_size=10000):
+    """Delete revocation rows whose tokens have expired. Returns the count."""
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    while True:
+        ids = list(RevokedToken.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += RevokedToken.objects.filter(id__in=ids).delete()[0]
+
+
+revocation_store = RevocationStore()
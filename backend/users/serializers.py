@@ -1,6 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .revocation import revocation_store
 
 User = get_user_model()
 
@@ -45,3 +54,45 @@ class LoginSerializer(serializers.Serializer):
 class PasswordChangeSerializer(serializers.Serializer):
     old_password = serializers.CharField()
     new_password = serializers.CharField(validators=[validate_password])
+
+class PasswordSetupSerializer(serializers.Serializer):
+    uid = serializers.CharField()
+    token = serializers.CharField()
+    new_password = serializers.CharField(validators=[validate_password])
+    
+    def validate(self, data):
+        try:
+            user_id = force_str(urlsafe_base64_decode(data['uid']))
+            user = User.objects.get(pk=user_id)
+        except (TypeError, ValueError, OverflowError, User.DoesNotExist):
+            raise serializers.ValidationError('Invalid setup link')
+        if not default_token_generator.check_token(user, data['token']):
+            raise serializers.ValidationError('Invalid or expired setup link')
+        data['user'] = user
+        return data
+
+class RevokingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rejects revoked refresh tokens and, when rotation is on, revokes the
+    presented token before issuing its replacement.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti, exp = refresh[api_settings.JTI_CLAIM], refresh['exp']
+        if revocation_store.is_revoked(jti, exp):
+            raise InvalidToken(_('Token is revoked'))
+        if api_settings.ROTATE_REFRESH_TOKENS and not revocation_store.revoke(jti, exp):
+            raise InvalidToken(_('Token is revoked'))
+        return super().validate(attrs)
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        revocation_store.revoke(refresh[api_settings.JTI_CLAIM], refresh['exp'])
+        return attrs
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import authentication
+from .authentication import get_cached_user, issue_tokens, user_cache
+from .models import RevokedToken, User
+from .revocation import BloomFilter, RevocationStore, revocation_store
+from .throttling import LoginBackoffThrottle
+from .views import change_password
+
+
+class BloomFilterTests(TestCase):
+
+    def test_members_are_found_and_false_positives_stay_near_the_target(self):
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        members = [f'jti-{n}' for n in range(5000)]
+        for member in members:
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(f'other-{n}' in bloom for n in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+
+@override_settings(REVOCATION_SYNC_SECONDS=0, REVOCATION_SYNC_LAG_SECONDS=300)
+class RevocationStoreTests(TestCase):
+
+    def setUp(self):
+        self.store = RevocationStore()
+        self.exp = (datetime.now(timezone.utc) + timedelta(days=1)).timestamp()
+
+    def test_revoke_is_seen_and_only_succeeds_once(self):
+        self.assertFalse(self.store.is_revoked('a', self.exp))
+        self.assertTrue(self.store.revoke('a', self.exp))
+        self.assertFalse(self.store.revoke('a', self.exp))
+        self.assertTrue(self.store.is_revoked('a', self.exp))
+        self.assertFalse(self.store.is_revoked('b', self.exp))
+
+    def test_sync_picks_up_other_processes_and_late_commits(self):
+        expires_at = datetime.fromtimestamp(self.exp, timezone.utc)
+        RevokedToken.objects.create(id=100, jti='committed-first', expires_at=expires_at)
+        self.store.sync(force=True)
+        RevocationStore().revoke('from-other-process', self.exp)
+        # Took a lower id and an earlier timestamp, but committed after our sync
+        RevokedToken.objects.create(id=50, jti='late-commit', expires_at=expires_at)
+        RevokedToken.objects.filter(id=50).update(revoked_at=self.store._watermark - timedelta(seconds=60))
+
+        self.store.sync(force=True)
+        self.assertTrue(self.store.is_revoked('from-other-process', self.exp))
+        self.assertTrue(self.store.is_revoked('late-commit', self.exp))
+
+    def test_expired_buckets_leave_memory_and_rows_are_purged_by_command(self):
+        past = (datetime.now(timezone.utc) - timedelta(days=3)).timestamp()
+        self.store.revoke('old', past)
+        self.store.revoke('current', self.exp)
+        self.store.sync(force=True)
+        self.assertNotIn(self.store._bucket(past), self.store._buckets)
+        # Syncing never deletes rows on the request path
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+        out = StringIO()
+        call_command('purge_revoked_tokens', stdout=out)
+        self.assertIn('Purged 1', out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['current'])
+
+
+class TokenRevocationApiTests(APITestCase):
+
+    def setUp(self):
+        revocation_store.reset()
+        self.addCleanup(revocation_store.reset)
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='x')
+
+    def test_revoked_refresh_token_is_rejected(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertEqual(self.client.post('/api/token/revoke/', {'refresh': refresh}).status_code, 205)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': refresh}).status_code, 200)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000, LOGIN_BACKOFF_THRESHOLD=3, LOGIN_BACKOFF_BASE_SECONDS=2)
+class LoginThrottleTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='right-password')
+
+    def login(self, password='wrong', email='ada@example.com', **extra):
+        return self.client.post('/api/token/', {'email': email, 'password': password}, **extra)
+
+    def test_consecutive_failures_lock_the_account_with_doubling_backoff(self):
+        now = [1000.0]
+        with mock.patch.object(LoginBackoffThrottle, 'timer', staticmethod(lambda: now[0])):
+            for _ in range(3):
+                self.assertEqual(self.login().status_code, 400)
+            # Locked for 2s, even with the right password, and no hash is spent on it
+            with mock.patch('users.serializers.authenticate') as authenticate:
+                response = self.login('right-password')
+            self.assertEqual(response.status_code, 429)
+            authenticate.assert_not_called()
+
+            now[0] += 2.5
+            self.assertEqual(self.login().status_code, 400)
+            now[0] += 2.5
+            self.assertEqual(self.login('right-password').status_code, 429)
+            now[0] += 2
+            self.assertEqual(self.login('right-password').status_code, 200)
+            # Success clears the count
+            self.assertEqual(self.login().status_code, 400)
+            self.assertEqual(self.login().status_code, 400)
+
+    @override_settings(LOGIN_BACKOFF_THRESHOLD=100)
+    def test_email_window_applies_whatever_the_letter_case(self):
+        for n in range(10):
+            email = 'Ada@Example.com' if n % 2 else 'ada@example.com'
+            self.assertEqual(self.login(email=email).status_code, 400)
+        self.assertEqual(self.login(email=' ADA@example.com').status_code, 429)
+        self.assertEqual(self.login(email='grace@example.com').status_code, 400)
+
+    def test_forwarded_for_header_does_not_pick_the_ip_bucket(self):
+        for n in range(30):
+            self.login(email=f'user{n}@example.com', HTTP_X_FORWARDED_FOR=f'10.0.0.{n}')
+        response = self.login(email='new@example.com', HTTP_X_FORWARDED_FOR='10.0.1.1')
+        self.assertEqual(response.status_code, 429)
+
+
+class CachedUserTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        user_cache.local.clear()
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='x', first_name='Ada')
+
+    def test_repeat_lookups_skip_the_database(self):
+        with self.assertNumQueries(1):
+            get_cached_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_user(self.user.pk).first_name, 'Ada')
+        # Another process: nothing local, served from the shared cache
+        user_cache.local.clear()
+        with self.assertNumQueries(0):
+            user = get_cached_user(self.user.pk)
+        self.assertEqual((user.pk, user.email, user.first_name), (self.user.pk, 'ada@example.com', 'Ada'))
+
+    def test_saves_and_queryset_updates_invalidate(self):
+        access = str(issue_tokens(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get('/api/user/profile/').data['first_name'], 'Ada')
+
+        self.user.first_name = 'Grace'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/user/profile/').data['first_name'], 'Grace')
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/user/profile/').status_code, 401)
+
+    def test_a_load_overtaken_by_an_update_is_not_served(self):
+        snapshot = authentication._snapshot
+
+        def slow_snapshot(user):
+            data = snapshot(user)
+            # Committed by another request after this load read the row
+            User.objects.filter(pk=user.pk).update(first_name='Grace')
+            return data
+
+        with mock.patch.object(authentication, '_snapshot', side_effect=slow_snapshot):
+            self.assertEqual(get_cached_user(self.user.pk).first_name, 'Ada')
+        self.assertEqual(get_cached_user(self.user.pk).first_name, 'Grace')
+
+
+class PasswordChangeTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ada', email='ada@example.com', password='old-password')
+        self.data = {'old_password': 'old-password', 'new_password': 'A-much-longer-one-9'}
+
+    def test_wrong_old_password_is_rejected(self):
+        self.client.force_authenticate(self.user)
+        data = {**self.data, 'old_password': 'guess'}
+        self.assertEqual(self.client.post('/api/user/change-password/', data).status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('old-password'))
+
+    def test_change_works_without_sessions(self):
+        # As under settings_api, which has no session middleware
+        request = APIRequestFactory().post('/api/user/change-password/', self.data)
+        force_authenticate(request, self.user)
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertEqual(change_password(request).status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('A-much-longer-one-9'))
@@ -0,0 +1,100 @@
+"""
+Login throttles.
+
+All state lives in the cache configured by ``LOGIN_THROTTLE_CACHE`` so that
+every worker and instance shares it. The throttles run in DRF's
+``initial()`` step, i.e. before ``LoginSerializer.validate`` gets a chance
+to spend a full password hash on the request.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def _email_ident(request):
+    try:
+        email = request.data.get('email')
+    except AttributeError:
+        return None
+    if not email or not isinstance(email, str):
+        return None
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    """Sliding-window log throttle backed by the shared login throttle cache."""
+
+    @property
+    def cache(self):
+        return caches[settings.LOGIN_THROTTLE_CACHE]
+
+
+class LoginIPThrottle(LoginRateThrottle):
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailThrottle(LoginRateThrottle):
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        ident = _email_ident(request)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginBackoffThrottle(LoginRateThrottle):
+    """
+    Progressive lockout per account: after ``LOGIN_BACKOFF_THRESHOLD``
+    consecutive failures each further failure doubles the lockout, up to
+    ``LOGIN_BACKOFF_MAX_SECONDS``. A successful login clears it.
+    """
+    rate = None  # not window based; see allow_request
+    key_format = 'login_backoff_%s'
+
+    def __init__(self):
+        self.num_requests = self.duration = None
+        self.remaining = None
+
+    def allow_request(self, request, view):
+        ident = _email_ident(request)
+        if ident is None:
+            return True
+        locked_until = (self.cache.get(self.key_format % ident) or {}).get('locked_until')
+        now = self.timer()
+        if locked_until and locked_until > now:
+            self.remaining = locked_until - now
+            return False
+        return True
+
+    def wait(self):
+        return self.remaining
+
+    @classmethod
+    def register_failure(cls, request):
+        ident = _email_ident(request)
+        if ident is None:
+            return
+        cache = caches[settings.LOGIN_THROTTLE_CACHE]
+        key = cls.key_format % ident
+        state = cache.get(key) or {'failures': 0}
+        state['failures'] += 1
+        over = state['failures'] - settings.LOGIN_BACKOFF_THRESHOLD
+        if over >= 0:
+            lockout = min(
+                settings.LOGIN_BACKOFF_BASE_SECONDS * (2 ** over),
+                settings.LOGIN_BACKOFF_MAX_SECONDS,
+            )
+            state['locked_until'] = cls.timer() + lockout
+        cache.set(key, state, settings.LOGIN_BACKOFF_MAX_SECONDS * 2)
+
+    @classmethod
+    def clear(cls, request):
+        ident = _email_ident(request)
+        if ident is not None:
+            caches[settings.LOGIN_THROTTLE_CACHE].delete(cls.key_format % ident)
@@ -7,9 +7,11 @@ urlpatterns = [
     path('register/', views.RegisterView.as_view(), name='register'),
     path('token/', views.login, name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', views.revoke_token, name='token_revoke'),
     
     # User Profile - RESTful design
     path('user/profile/', views.UserProfileView.as_view(), name='user_profile'),  # GET and PUT
     path('user/change-password/', views.change_password, name='change_password'),
+    path('user/setup-password/', views.setup_password, name='setup_password'),
     path('user/dashboard/', views.user_dashboard, name='user_dashboard'),
 ]
@@ -1,13 +1,17 @@
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import update_session_auth_hash, get_user_model
-from courses.models import Enrollment, Progress, Certificate
+from courses.caching import dashboard_cache
+from courses.models import Enrollment, Certificate, lesson_ordinals
+from thinktank.cache import cache_response
+from .authentication import issue_tokens
+from .throttling import LoginBackoffThrottle, LoginEmailThrottle, LoginIPThrottle
 from .serializers import (
     RegisterSerializer, UserSerializer, UserProfileSerializer, 
-    LoginSerializer, PasswordChangeSerializer
+    LoginSerializer, PasswordChangeSerializer, PasswordSetupSerializer,
+    TokenRevokeSerializer
 )
 
 User = get_user_model()
@@ -29,16 +33,19 @@ class RegisterView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle, LoginBackoffThrottle])
 def login(request):
     serializer = LoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        LoginBackoffThrottle.clear(request)
+        refresh = issue_tokens(user)
         return Response({
             'access': str(refresh.access_token),
             'refresh': str(refresh),
             'user': UserSerializer(user).data
         })
+    LoginBackoffThrottle.register_failure(request)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -71,26 +78,51 @@ def change_password(request):
         if user.check_password(serializer.validated_data['old_password']):
             user.set_password(serializer.validated_data['new_password'])
             user.save()
-            update_session_auth_hash(request, user)
+            # The API-only profile (settings_api) runs without sessions
+            if hasattr(request, 'session'):
+                update_session_auth_hash(request, user)
             return Response({'message': 'Password changed successfully'})
         return Response({'error': 'Invalid old password'}, status=status.HTTP_400_BAD_REQUEST)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def setup_password(request):
+    """Completes the deferred password setup for accounts created in bulk."""
+    serializer = PasswordSetupSerializer(data=request.data)
+    if serializer.is_valid():
+        user = serializer.validated_data['user']
+        user.set_password(serializer.validated_data['new_password'])
+        user.save()
+        return Response({'message': 'Password set successfully'})
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def revoke_token(request):
+    """Revokes a refresh token, e.g. on logout."""
+    serializer = TokenRevokeSerializer(data=request.data)
+    if serializer.is_valid():
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_response(dashboard_cache, namespace=lambda request: f'user:{request.user.pk}', vary_on_user=True)
 def user_dashboard(request):
-    enrollments = Enrollment.objects.filter(user=request.user)
-    enrolled_courses = enrollments.count()
+    enrollments = list(
+        Enrollment.objects.filter(user=request.user).select_related('course').order_by('-last_accessed')
+    )
+    enrolled_courses = len(enrollments)
+    ordinals = lesson_ordinals([enrollment.course_id for enrollment in enrollments])
     
     # Calculate completed courses
     completed_courses = 0
     in_progress_courses = 0
     
     for enrollment in enrollments:
-        total_lessons = enrollment.course.lessons.count()
-        completed_lessons = Progress.objects.filter(
-            enrollment=enrollment, completed=True
-        ).count()
+        total_lessons = len(ordinals[enrollment.course_id])
+        completed_lessons = enrollment.completed_count(ordinals[enrollment.course_id])
         
         if total_lessons > 0 and completed_lessons == total_lessons:
             completed_courses += 1
@@ -101,13 +133,9 @@ def user_dashboard(request):
     
     # Recent courses
     recent_courses = []
-    for enrollment in enrollments.order_by('-last_accessed')[:5]:
+    for enrollment in enrollments[:5]:
         course = enrollment.course
-        total_lessons = course.lessons.count()
-        completed_lessons = Progress.objects.filter(
-            enrollment=enrollment, completed=True
-        ).count()
-        progress = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
+        progress = enrollment.progress_percent(ordinals[course.id])
         
         recent_courses.append({
             'id': course.id,